@@ -24,6 +24,8 @@ import os                               #Folder handling for training data creat
 import shutil                           #Recursivly folder delete, copy files
 #import io
 import sys
+sys.path.append("../../Python/")        #Get shared data loading
+from designIO import loadLabelledDesign #Parallel CSV loading
 #-------------------------------#
 #--- Some global definitions ---#
 #-------------------------------#
@@ -104,16 +106,15 @@ def convertData(CNNDataMatrix, ID_test):
 #--- Load files from data generator ---#
 #--------------------------------------#
 class_names = np.genfromtxt("../../Data/classes.csv", dtype=str)                #Names of fishes
-data_file = pd.read_csv('../../GPLVM/BGPLVM_DATA.csv', header=None).as_matrix() #Read data including sample ID
 # The format is for each row: sampleID (string), label (int), data vector (double)
+sample_ID, data_file = loadLabelledDesign('../../GPLVM/BGPLVM_DATA.csv')       #Read data including sample ID
 samples_iteration  = np.genfromtxt("../../Data/NoReplace_20205809_085859.csv", 
                                     delimiter=' ',dtype=int)                    #Load data from R script
 #-------------------#
 #--- Create data ---#
 #-------------------#
-sample_ID = data_file[:,0]                      #The sample ID
-labels_raw = data_file[:,1]                     #Stored labels
-data_raw = data_file[:,1:data_file.shape[1]]    #The label followed by data (BGPLVM features)
+labels_raw = data_file[:,0].astype(int)         #Stored labels
+data_raw = data_file                            #The label followed by data (BGPLVM features)
 #------------------#
 #--- Do looping ---#
 #------------------#
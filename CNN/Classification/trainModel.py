@@ -30,6 +30,7 @@ validation_dir="./test"     #Test folder generated by test script
 image_size=224              #Image size of VGG
 train_batchsize = 8         #Used batches for training
 val_batchsize = 5           #Validation batchsize
+epochs = 70                 #Training epochs
 Augmention=sys.argv[1]=="1"    #Get augmention flag
 print("Augmention:", Augmention)
 #--------------------------#
@@ -90,7 +91,7 @@ model.compile(loss='categorical_crossentropy',
 history = model.fit_generator(
       train_generator,
       steps_per_epoch=train_generator.samples/train_generator.batch_size ,
-      epochs=70,
+      epochs=epochs,
       validation_data=validation_generator,
       validation_steps=validation_generator.samples/validation_generator.batch_size,
       verbose=1)
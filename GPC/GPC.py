@@ -16,6 +16,8 @@
 import sys                              #Use system stuff
 sys.path.append("../Python/")           #Get own GPC stuff (GPC_nfCV.py)
 from GPC_nfCV import GPC_nfCV           #Get the class
+from designIO import loadLabelledDesign #Parallel CSV loading
+from telemetry import setTelemetry      #Optimization telemetry
 import numpy as np                      #Numpy ;)
 import pandas as pd                     #We need that for novel data loading
 from sklearn.preprocessing import StandardScaler    #Scale input data
@@ -32,21 +34,18 @@ if(len(sys.argv) == 3):
 else:
     Selection_path      = "" 
 k_fold=10                   #k-fold cross validation
+setTelemetry("./GPC_telemetry.jsonl")   #JSON lines of each GPC fit (see ../GPLVM/telemetrySummary.py)
 print("Got path to data: %s" % path_data)
 print("Path to feature selection: %s" % Selection_path)
 print("Use %d for k-fold cross validation" % k_fold)
 #--------------------------------------#
 #--- Load files from data generator ---#
 #--------------------------------------#
-data_file = pd.read_csv(path_data, header=None).as_matrix()    #Read data including sample ID
 # The format is for each row: sampleID (string), label (int), data vector (double)
+# sample_ID: the sample ID, data_raw: the label followed by data (BGPLVM features)
+sample_ID, data_raw = loadLabelledDesign(path_data)     #Read data including sample ID
 samples_iteration   = np.genfromtxt("../Data/NoReplace_20205809_085859.csv", delimiter=' ',dtype=int)  #Load data from R script
 print("Do %d iterations" % samples_iteration.shape[1])
-#-------------------#
-#--- Create data ---#
-#-------------------#
-sample_ID = data_file[:,0]                      #The sample ID
-data_raw = data_file[:,1:data_file.shape[1]]    #The label followed by data (BGPLVM features)
 #------------------#
 #--- Do looping ---#
 #------------------#
@@ -11,7 +11,9 @@ from bGPLVM import bGPLVM   #GPy wrapper
 import numpy as np          #You should know that
 import matplotlib.pyplot as plt #We aim to plot something...
 image_dim = (224,224)
+precision = np.float64      #Pixel space precision (np.float32 halves memory and bandwidth)
 import os                   #For bash stuff
+nr_workers = os.cpu_count() #Parallel heatmap processes (1: sequential)
 #--------------------------------------#
 #--- Load IDP and optimal dimension ---#
 #--------------------------------------#
@@ -25,6 +27,8 @@ print("Use %d inducing points and %d latent dimensions" % (nrInd,latentDim))
 data_Model	= "./optModel_bgp_model.npy"
 data_latent	= "./optModel_bgp_features_train.csv"
 dataFolder	= "../Data/design.csv"
+if(not os.path.isfile(dataFolder)):
+    dataFolder = "../Data/design.npy"   #Design created by getDesign.py
 #--- Create bGPLVM model ---#
 model =bGPLVM(  dataFolder,         #Path to training data
                 data_latent,        #Extracted features
@@ -33,12 +37,15 @@ model =bGPLVM(  dataFolder,         #Path to training data
                 "",                 #Path to excluded featues
                 nrInd,              #Number of inducing pts
                 latentDim,          #Number of latent dimensions
-                (image_dim[1],image_dim[0]))       #Reshaping image
+                (image_dim[1],image_dim[0]),       #Reshaping image
+                path_scaler="./optModel_bgp_scaler.npz",    #Scaler stored by getGPLVM.py
+                path_mask="./optModel_bgp_mask.npy",        #Pixel mask (if used by getGPLVM.py)
+                dtype=precision)                            #Precision of images and heatmaps
 #--------------------------------------#
 #--- Estimate variance per features ---#
 #--------------------------------------#
 os.system("mkdir Heatmaps")
-model.plotVarHeatmaps(prefix="./Heatmaps/")
+model.plotVarHeatmaps(prefix="./Heatmaps/", nrWorkers=nr_workers)
 #-------------------------------#
 #--- Create summarized plots ---#
 #-------------------------------#
@@ -0,0 +1,117 @@
+# benchmarkOptimizer.py compares the optimizers of the Bayesian GP-LVM
+# training: L-BFGS-B and scaled conjugate gradients (SCG) of GPy and the
+# Adam based mini-batch training (stochasticGPLVM.py). Each optimizer
+# trains the same initialization on the real design and on synthetic
+# data (nonlinear 2D manifold). The bound is recorded during training,
+# the time till the bound is within a relative tolerance of the best
+# final bound (of all optimizers) is printed and stored in
+# optimizerBenchmark.csv.
+#
+# This code is available under a GPL v3.0 license and comes without
+# any explicit or implicit warranty.
+#
+# (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
+import sys                  #System stuff
+sys.path.append('../Python/')  #Add path to project library
+import numpy as np          #You should know that
+import os                   #For bash stuff
+import time                 #Runtime measurement
+from designIO import loadDesign
+from designScaler import getScaledDesign
+from compressedGPLVM import compressDesign, getCompressedBGPLVM
+from checkpoint import optimizeCheckpointed, optimizers
+from stochasticGPLVM import getStochasticSettings, optimizeStochastic
+nr_LD       = 5                         #Latent dimensions of the benchmark model
+nr_IDP      = 20                        #Inducing points of the benchmark model
+iterations  = 3000                      #Maximum iterations (L-BFGS-B, SCG)
+steps       = 10000                     #Maximum mini-batch steps (Adam)
+stochastic  = getStochasticSettings(batchSize=32)
+tolerances  = [1e-2, 1e-3, 1e-4]        #Relative bound tolerances
+trace_interval = 0.2                    #Seconds between bound records of the mini-batch training
+#-----------------#
+#--- Load data ---#
+#-----------------#
+path_data   = "../Data/design.csv"
+if(not os.path.isfile(path_data)):
+    path_data = "../Data/design.npy"    #Design created by getDesign.py
+design      = getScaledDesign(loadDesign(path_data), path_scaler="")
+np.random.seed(0)
+latent      = np.random.uniform(-np.pi, np.pi, (design.shape[0], 2))      #Synthetic 2D manifold, same size as the design
+features    = np.hstack((np.sin(latent), np.cos(latent), latent[:,:1]*latent[:,1:]))
+synthetic   = np.tanh(features.dot(np.random.randn(features.shape[1], 2000)))+0.1*np.random.randn(design.shape[0], 2000)
+datasets    = [("design", design), ("synthetic", synthetic)]
+#-------------------------------------------------------#
+# Function: traceOptimizer(...)                         #
+# Desct:    Trains a model and records the bound over   #
+#           the runtime.                                #
+# Param:    model           GPy model                   #
+#           optimizer       Optimizer (see optimizers)  #
+# Return:   [optimizer run, trace (seconds, bound)]     #
+#-------------------------------------------------------#
+def traceOptimizer(model, optimizer):
+    trace = []
+    if(optimizer == "adam"):
+        start = time.time()
+        model[:] = model.param_array            #Cost of the state update of each record
+        update = time.time()-start
+        overhead = [0.0]                        #Time of the records
+        def record(model, steps, seconds):
+            start = time.time()
+            overhead[0] = overhead[0]+update
+            trace.append([seconds-overhead[0], float(model.log_likelihood()[0,0])])
+            overhead[0] = overhead[0]+time.time()-start
+        model_return = optimizeStochastic(model, steps, stochastic, callback=record, interval=trace_interval)
+        trace.append([model_return.time-overhead[0], float(model.log_likelihood()[0,0])])
+        return [model_return, np.array(trace)]
+    objective = model._objective_grads
+    def objectiveTraced(x):
+        result = objective(x)
+        trace.append([time.time()-start, -float(result[0])])
+        return result
+    model._objective_grads = objectiveTraced
+    start = time.time()
+    try:
+        model_return = optimizeCheckpointed(model, iterations, optimizer=optimizer)
+    finally:
+        del model._objective_grads              #Restore the class method
+    return [model_return, np.array(trace)]
+#-------------------------------------------------------#
+# Function: getTimeToTolerance(...)                     #
+# Desct:    First time the best bound so far is within  #
+#           the relative tolerance of the reference.    #
+# Param:    trace           (seconds, bound)            #
+#           reference       Reference bound             #
+#           tolerance       Relative tolerance          #
+# Return:   seconds (nan: not reached)                  #
+#-------------------------------------------------------#
+def getTimeToTolerance(trace, reference, tolerance):
+    reached = np.where(reference-np.maximum.accumulate(trace[:,1]) <= tolerance*abs(reference))[0]
+    return trace[reached[0],0] if(len(reached) != 0) else np.nan
+#----------------------#
+#--- Run benchmarks ---#
+#----------------------#
+report = []     #data, optimizer, seconds per tolerance, log likelihood, runtime, evaluations
+for dataIndex, (name, data) in enumerate(datasets):
+    data_c, _ = compressDesign(data)
+    np.random.seed(0)
+    model_init = getCompressedBGPLVM(data_c, data.shape[1], nr_LD, nr_IDP)
+    runs = []
+    for optimizer in optimizers:
+        model_LVM = model_init.copy()
+        model_return, trace = traceOptimizer(model_LVM, optimizer)
+        runs.append([optimizer, model_return, trace, float(model_LVM.log_likelihood()[0,0])])
+        print("%-9s %-6s: log lik. %f, %8.1f s, %6d evaluations (%s)" % (name, optimizer, runs[-1][3], trace[-1,0], model_return.funct_eval, model_return.status))
+    reference = max(run[3] for run in runs)
+    for optimizerIndex, (optimizer, model_return, trace, logLik) in enumerate(runs):
+        seconds = [getTimeToTolerance(trace, reference, tolerance) for tolerance in tolerances]
+        report.append([dataIndex, optimizerIndex]+seconds+[logLik, trace[-1,0], model_return.funct_eval])
+#----------------------#
+#--- Report results ---#
+#----------------------#
+print("Seconds till the bound is within a relative tolerance of the best bound:")
+print("%-9s %-6s %s" % ("data", "opt.", " ".join("%10.0e" % tolerance for tolerance in tolerances)))
+for row in report:
+    print("%-9s %-6s %s" % (datasets[int(row[0])][0], optimizers[int(row[1])], " ".join("%10.1f" % seconds for seconds in row[2:2+len(tolerances)])))
+np.savetxt( "./optimizerBenchmark.csv", np.array(report, dtype=float),
+            header="data,optimizer,"+",".join("seconds_%g" % tolerance for tolerance in tolerances)+",loglik,runtime,evaluations",
+            delimiter=',')
@@ -0,0 +1,73 @@
+# benchmarkWarmStart.py compares cold and warm started GP-LVM sweeps.
+# The IDP sweep (step 2) and the latent dimension sweep (step 3) of
+# getGPLVM.py are trained twice: each model from its own initialization
+# (cold) and each model initialized from the previous sweep point (warm).
+# The number of function evaluations of the optimizer, the runtime and
+# the marginal log likelihood of each sweep point are printed and stored
+# in warmStartBenchmark.csv. The PCA dimension and the IDP are read from
+# the results of getGPLVM.py.
+#
+# This code is available under a GPL v3.0 license and comes without
+# any explicit or implicit warranty.
+#
+# (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
+import sys                  #System stuff
+sys.path.append('../Python/')  #Add path to project library
+import numpy as np          #You should know that
+import os                   #For bash stuff
+import time                 #Runtime measurement
+from designIO import loadDesign
+from designScaler import getScaler, scaleDesign
+from pixelMask import loadMask
+from compressedGPLVM import compressDesign
+from bGPLVMOptimizer import fitBGPLVM
+from warmStart import getWarmStart
+compress    = True          #Use the compressed model (as getGPLVM.py)
+iterations  = 10000         #Maximum iterations per model
+IDPRange    = [10,20,50,75,100, 125, 150,200]          #Inducing points to try (as getGPLVM.py)
+lDimRange   = [2,5,10,20,30,40,50,75,100,125,150]       #Latent dimensions to try (as getGPLVM.py)
+#-----------------#
+#--- Load data ---#
+#-----------------#
+path_data   = "../Data/design.csv"
+if(not os.path.isfile(path_data)):
+    path_data = "../Data/design.npy"    #Design created by getDesign.py
+data_raw    = loadDesign(path_data)
+scaler      = getScaler(data_raw, "./optModel_bgp_scaler.npz")
+design      = scaleDesign(data_raw, scaler, mask=loadMask("./optModel_bgp_mask.npy"))
+output_dim  = design.shape[1]
+if(compress):
+    design, _ = compressDesign(design)
+PCADim      = int(np.loadtxt("./step1_PCA_latentDim.csv", delimiter=',')[1])
+IDP         = int(np.loadtxt("./optModel_bgp_nrInd.csv", dtype=int))
+#---------------------------#
+#--- Cold and warm sweeps ---#
+#---------------------------#
+sweeps = [("IDP",  [(PCADim, idp) for idp in IDPRange]),           #(latent dim., inducing points)
+          ("lDim", [(latentDim, IDP) for latentDim in lDimRange])]
+report = []     #sweep (0: IDP, 1: lDim), value, warm, function evaluations, runtime, log likelihood
+for sweepIndex, (name, points) in enumerate(sweeps):
+    for warmStart in [False, True]:
+        warm = None
+        for input_dim, num_inducing in points:
+            start = time.time()
+            model_LVM = fitBGPLVM(design, output_dim, input_dim, num_inducing, iterations, compress, warm)
+            runtime = time.time()-start
+            if(warmStart):
+                warm = getWarmStart(model_LVM)
+            value = num_inducing if(name == "IDP") else input_dim
+            report.append([sweepIndex, value, warmStart, model_LVM.optimization_runs[-1].funct_eval, runtime, model_LVM.log_likelihood()[0,0]])
+            print("%s %4d %s: %5d evaluations, %8.1f s, log lik. %f" % (name, value, "warm" if(warmStart) else "cold", report[-1][3], runtime, report[-1][5]))
+#----------------------#
+#--- Report results ---#
+#----------------------#
+report = np.array(report, dtype=float)
+for sweepIndex, (name, points) in enumerate(sweeps):
+    cold = report[(report[:,0] == sweepIndex) & (report[:,2] == 0)]
+    warm = report[(report[:,0] == sweepIndex) & (report[:,2] == 1)]
+    fraction = warm[1:,3]/cold[1:,3]    #First sweep point starts cold in both runs
+    print("%s sweep: warm/cold evaluations median %.2f (%d of %d points below 0.5), runtime %.2f" % (
+            name, np.median(fraction), np.sum(fraction < 0.5), len(fraction), np.sum(warm[:,4])/np.sum(cold[:,4])))
+np.savetxt( "./warmStartBenchmark.csv", report,
+            header="sweep,value,warm,evaluations,runtime,loglik",
+            delimiter=',')
@@ -0,0 +1,69 @@
+# checkCompression.py verifies the compressed GP-LVM training mode. A
+# Bayesian GP-LVM is created on the full scaled design and a compressed
+# model (row space projection) gets the same parameters. The marginal
+# log likelihood, the gradients and the inferred latent means of both
+# models have to match up to numerical precision. This is done for the
+# initial parameters and after a short optimization of the compressed
+# model.
+#
+# This code is available under a GPL v3.0 license and comes without
+# any explicit or implicit warranty.
+#
+# (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
+import numpy as np  #Numpy :-)
+import sys
+import os
+sys.path.append("../Python/")                  #Get own stuff
+from designIO import loadDesign
+from designScaler import getScaledDesign
+from compressedGPLVM import compressDesign, getCompressedBGPLVM, inferCompressedX
+import GPy
+#--------------------#
+#--- Define paths ---#
+#--------------------#
+path_data   = "../Data/design.csv"      #Flattened image vectors
+if(not os.path.isfile(path_data)):
+    path_data = "../Data/design.npy"    #Design created by getDesign.py
+nr_LD       = 5                         #Latent dimensions of the check model
+nr_IDP      = 20                        #Inducing points of the check model
+iterations  = 50                        #Iterations of the short optimization
+relTH       = 1e-6                      #Allowed relative difference
+#-------------------------#
+#--- Create the models ---#
+#-------------------------#
+design = getScaledDesign(loadDesign(path_data), path_scaler="")
+design_c, Vt = compressDesign(design)
+np.random.seed(0)
+model_full = GPy.models.BayesianGPLVM(Y=design, input_dim=nr_LD, num_inducing=nr_IDP)
+np.random.seed(0)
+model_c = getCompressedBGPLVM(design_c, design.shape[1], nr_LD, nr_IDP)
+#-------------------------------------------------------#
+# Function: compare(...)                                #
+# Desct:    Compares both models at the parameters of   #
+#           the compressed model.                       #
+# Param:    title           Printed title               #
+# Return:   True if all values match                    #
+#-------------------------------------------------------#
+def compare(title):
+    model_full[:] = model_c.param_array
+    ll_full = float(model_full.log_likelihood()[0,0])
+    ll_c = float(model_c.log_likelihood()[0,0])
+    grad_diff = np.max(np.abs(model_full.gradient-model_c.gradient))/np.max(np.abs(model_full.gradient))
+    X_full, _ = model_full.infer_newX(design[:5,:])
+    X_c, _ = inferCompressedX(model_c, design_c[:5,:], design.shape[1])
+    X_diff = np.max(np.abs(X_full.mean-X_c.mean))/max(1e-12,np.max(np.abs(X_full.mean)))
+    ll_diff = abs(ll_full-ll_c)/abs(ll_full)
+    print("%s:" % title)
+    print("   log likelihood full:       %f" % ll_full)
+    print("   log likelihood compressed: %f (rel. diff. %e)" % (ll_c, ll_diff))
+    print("   gradient rel. diff.:       %e" % grad_diff)
+    print("   latent mean rel. diff.:    %e" % X_diff)
+    return (ll_diff < relTH) and (grad_diff < relTH) and (X_diff < 1e-2)
+#-----------------------#
+#--- Do verification ---#
+#-----------------------#
+ok = compare("Initial parameters")
+model_c.optimize(messages=False, max_iters=iterations)
+ok = compare("After %d iterations" % iterations) and ok
+print("Compression check: %s" % ("OK" if ok else "FAILED"))
+sys.exit(0 if ok else 1)
@@ -0,0 +1,63 @@
+# checkPrecision.py reports the error of the float32 precision mode. The
+# stored GP-LVM model of getGPLVM.py is loaded twice, with float64 and
+# with float32 pixel space arrays (design, reconstructions and variance
+# images). The GP algebra uses float64 in both cases. The differences of
+# the marginal log likelihood and of the variance heatmaps are printed
+# and stored in precisionReport.csv.
+#
+# This code is available under a GPL v3.0 license and comes without
+# any explicit or implicit warranty.
+#
+# (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
+import sys                  #System stuff
+sys.path.append('../Python/')  #Add path to project library
+from bGPLVM import bGPLVM   #GPy wrapper
+import numpy as np          #You should know that
+import os                   #For bash stuff
+image_dim   = (224,224)
+compress    = False         #Use the compressed model (as getGPLVM.py)
+path_report = "./PrecisionCheck/"
+#--------------------------------------#
+#--- Load IDP and optimal dimension ---#
+#--------------------------------------#
+latentDim        = np.loadtxt("./optModel_bgp_lDim.csv", dtype=int)
+nrInd            = np.loadtxt("./optModel_bgp_nrInd.csv",dtype=int)
+dataFolder       = "../Data/design.csv"
+if(not os.path.isfile(dataFolder)):
+    dataFolder = "../Data/design.npy"   #Design created by getDesign.py
+#------------------------------------#
+#--- Heatmaps for both precisions ---#
+#------------------------------------#
+logLik = {}
+for precision in [np.float64, np.float32]:
+    name = np.dtype(precision).name
+    model =bGPLVM( dataFolder, "./optModel_bgp_features_train.csv", "./optModel_bgp_model.npy", "", "",
+                    nrInd, latentDim, (image_dim[1],image_dim[0]),
+                    path_scaler="./optModel_bgp_scaler.npz",
+                    path_mask="./optModel_bgp_mask.npy",
+                    compress=compress,
+                    dtype=precision)
+    logLik[name] = float(model.model.log_likelihood()[0,0])
+    print("Design %s: %.1f MB" % (name, model.Data_full.design.nbytes/1e6))
+    if(not os.path.isdir(path_report+name)):
+        os.makedirs(path_report+name)
+    model.plotVarHeatmaps(prefix=path_report+name+"/")
+    model = None
+#-----------------------#
+#--- Compare results ---#
+#-----------------------#
+ll_diff = abs(logLik["float32"]-logLik["float64"])
+report = np.zeros((latentDim,4))    #dimension, max abs. variance error, rel. variance error, max normalized image error
+for i in range(0,latentDim):
+    var64 = np.loadtxt(path_report+"float64/"+str(i)+"_raw.csv", delimiter=',')
+    var32 = np.loadtxt(path_report+"float32/"+str(i)+"_raw.csv", delimiter=',')
+    img64 = np.loadtxt(path_report+"float64/"+str(i)+".csv", delimiter=',')
+    img32 = np.loadtxt(path_report+"float32/"+str(i)+".csv", delimiter=',')
+    err = np.max(np.abs(var64-var32))
+    report[i,:] = [i, err, err/max(1e-300,np.max(np.abs(var64))), np.max(np.abs(img64-img32))]
+print("Log likelihood float64: %f" % logLik["float64"])
+print("Log likelihood float32: %f (abs. diff. %e, rel. diff. %e)" % (logLik["float32"], ll_diff, ll_diff/abs(logLik["float64"])))
+print("Heatmaps: max rel. variance error %e, max normalized image error %e" % (np.max(report[:,2]), np.max(report[:,3])))
+np.savetxt( path_report+"precisionReport.csv", report,
+            header="dimension,maxAbsVarError,maxRelVarError,maxImageError (log lik. float64 %f, float32 %f)" % (logLik["float64"], logLik["float32"]),
+            delimiter=',')
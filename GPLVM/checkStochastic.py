@@ -0,0 +1,86 @@
+# checkStochastic.py verifies the mini-batch (stochastic variational)
+# training mode. With the optimal q(U), the bound of the mini-batch model
+# has to match the collapsed bound of GPy. Afterwards, a full batch and a
+# mini-batch model are trained from the same initialization and the
+# bounds and runtimes are compared. Finally, the runtime of one full
+# batch bound evaluation and of one mini-batch step are measured for
+# larger (replicated) collections.
+#
+# This code is available under a GPL v3.0 license and comes without
+# any explicit or implicit warranty.
+#
+# (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
+import numpy as np  #Numpy :-)
+import sys
+import os
+import time
+sys.path.append("../Python/")                  #Get own stuff
+from designIO import loadDesign
+from designScaler import getScaledDesign
+from compressedGPLVM import compressDesign, getCompressedBGPLVM
+from stochasticGPLVM import getStochasticSettings, optimizeStochastic, getState, getOptimalQU, getQU, batchGradients
+#--------------------#
+#--- Define paths ---#
+#--------------------#
+path_data   = "../Data/design.csv"      #Flattened image vectors
+if(not os.path.isfile(path_data)):
+    path_data = "../Data/design.npy"    #Design created by getDesign.py
+nr_LD       = 5                         #Latent dimensions of the check model
+nr_IDP      = 20                        #Inducing points of the check model
+iterations  = 2000                      #Iterations (full batch) and steps (mini-batch)
+stochastic  = getStochasticSettings(batchSize=32)
+replicas    = [1,4,16]                  #Collection sizes of the runtime comparison (x N)
+relTH       = 1e-4                      #Allowed relative bound difference (K_uu jitter)
+#-------------------------#
+#--- Create the models ---#
+#-------------------------#
+design = getScaledDesign(loadDesign(path_data), path_scaler="")
+design_c, _ = compressDesign(design)
+np.random.seed(0)
+model_full = getCompressedBGPLVM(design_c, design.shape[1], nr_LD, nr_IDP)
+model_svi = model_full.copy()
+#--------------------------------#
+#--- Bound at the optimal q(U) ---#
+#--------------------------------#
+state = getState(model_svi)
+mean_u, S_u = getQU(*getOptimalQU(state, design_c, stochastic["batchSize"]))
+bound = batchGradients(state, design_c, np.arange(design_c.shape[0]), design_c.shape[0], design.shape[1], mean_u, S_u)[0]
+ll_full = float(model_full.log_likelihood()[0,0])
+ll_diff = abs(bound-ll_full)/abs(ll_full)
+print("Bound at the optimal q(U):")
+print("   collapsed bound:  %f" % ll_full)
+print("   mini-batch bound: %f (rel. diff. %e)" % (bound, ll_diff))
+#-------------------------#
+#--- Compare trainings ---#
+#-------------------------#
+start = time.time()
+model_full.optimize(messages=False, max_iters=iterations)
+time_full = time.time()-start
+start = time.time()
+optimizeStochastic(model_svi, iterations, stochastic)
+time_svi = time.time()-start
+print("Training (%d iterations/steps):" % iterations)
+print("   full batch: log lik. %f, %.1f s" % (model_full.log_likelihood()[0,0], time_full))
+print("   mini-batch: log lik. %f, %.1f s" % (model_svi.log_likelihood()[0,0], time_svi))
+#--------------------------------------#
+#--- Runtime for larger collections ---#
+#--------------------------------------#
+print("Runtime per full batch evaluation / mini-batch step (%d specimens):" % stochastic["batchSize"])
+for replica in replicas:
+    design_r = np.tile(design_c, (replica,1))
+    model_r = getCompressedBGPLVM(design_r, design.shape[1], nr_LD, nr_IDP)
+    start = time.time()
+    for looper in range(0, 5):
+        model_r._objective_grads(model_r.optimizer_array)
+    time_full = (time.time()-start)/5
+    state = getState(model_r)
+    mean_u, S_u = getQU(*getOptimalQU(state, design_r, stochastic["batchSize"]))
+    start = time.time()
+    for looper in range(0, 20):
+        index = np.sort(np.random.permutation(design_r.shape[0])[:stochastic["batchSize"]])
+        batchGradients(state, design_r[index], index, design_r.shape[0], design.shape[1], mean_u, S_u)
+    time_svi = (time.time()-start)/20
+    print("   N = %d: %.3f s / %.3f s" % (design_r.shape[0], time_full, time_svi))
+ok = ll_diff < relTH
+print("Mini-batch check: %s" % ("OK" if ok else "FAILED"))
+sys.exit(0 if ok else 1)
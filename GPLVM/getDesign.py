@@ -0,0 +1,25 @@
+# getDesign.py creates the GP-LVM design matrix from the specimen
+# images. The flattened grayscale images are stored in target ID order
+# in a memory mapped *.npy file, which is used by getGPLVM.py and
+# FeatureVariance.py if no design.csv file is given. Only rows of
+# changed images are rebuilt if the script is called again.
+#
+# This code is available under a GPL v3.0 license and comes without
+# any explicit or implicit warranty.
+#
+# (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
+import sys
+sys.path.append("../Python/")                  #Get own stuff
+from designBuilder import buildDesign
+image_dim = (224,224)
+#--------------------#
+#--- Define paths ---#
+#--------------------#
+path_images     = "../Data/images/"             #Specimen images
+path_targetID   = "../Data/targetID.csv"        #Specimen order
+path_design     = "../Data/design.npy"          #Flattened image vectors
+#------------------------#
+#--- Build the design ---#
+#------------------------#
+nrRebuilt = buildDesign(path_images, path_targetID, path_design, image_dim)
+print("Rebuilt %d design rows" % nrRebuilt)
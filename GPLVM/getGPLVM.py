@@ -8,48 +8,127 @@
 # (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
 import numpy as np  #Numpy :-)
 import sys
+import os
 sys.path.append("../Python/")                  #Get own GPC stuff (GPC_nfCV.py)
 from bGPLVMOptimizer import step1_PCA
 from bGPLVMOptimizer import step2_bGPLVM_IDP
 from bGPLVMOptimizer import step3_bGPLVM_latentDim
+from bGPLVMOptimizer import fitBGPLVM, loadBGPLVM
+from checkpoint import getCheckpointPath
+from designIO import loadDesign
+from designScaler import getScaler, scaleDesign
+from pixelMask import getPixelMask, saveMask
+from resolution import getResolutionDesign, getResolutionDim
+from compressedGPLVM import compressDesign, inferCompressedX
+from telemetry import setTelemetry
+from previewGPLVM import fitPreview, getPreviewModel, savePreview, loadPreview
 import GPy
-from sklearn import preprocessing       #Data preprocessing
 #--------------------#
 #--- Define paths ---#
 #--------------------#
 path_data   = "../Data/design.csv"      #Flattened image vectors
-data_raw    = np.loadtxt(path_data,delimiter=",")           #Load data from file
+if(not os.path.isfile(path_data)):
+    path_data = "../Data/design.npy"    #Design created by getDesign.py
+precision   = np.float64                                    #Pixel space precision (np.float32 halves memory and bandwidth)
+data_raw    = loadDesign(path_data, dtype=precision)        #Load data from file (cached)
+image_dim   = (224,224)
+#------------------#
+#--- Pixel mask ---#
+#------------------#
+mask_varTH      = None      #Raw pixel variance threshold for background removal (None: no variance mask)
+path_maskImage  = ""        #Mask image, white = used pixel ("": no mask image)
+path_mask       = "./optModel_bgp_mask.npy"
+print("Standartize data...")
+scaler      = getScaler(data_raw, "./optModel_bgp_scaler.npz")  #Train scaler once, stored with the model
+mask        = getPixelMask(scaler.var_, mask_varTH, path_maskImage, image_dim)
+if(mask is not None):
+    saveMask(mask, path_mask)                                   #Used by FeatureVariance.py
+elif(os.path.isfile(path_mask)):
+    os.remove(path_mask)                                        #Remove mask of previous runs
+design      = scaleDesign(data_raw, scaler, mask=mask, dtype=precision)     #Scaled (masked) design
+#------------------------#
+#--- Sweep resolution ---#
+#------------------------#
+sweep_factor = 1            #Downsampling factor of the IDP and latent dim. sweeps (1: 224x224, 2: 112x112, 4: 56x56)
+if(sweep_factor != 1):
+    print("Sweep resolution: %s" % str(getResolutionDim(image_dim, sweep_factor)))
+    design_sweep, mask_sweep = getResolutionDesign(data_raw, image_dim, sweep_factor, mask, "./optModel_bgp_scaler_sweep.npz")
+else:
+    design_sweep = design   #Sweeps use the full resolution
+IDPRange    = [10,20,50,75,100, 125, 150,200]          #Inducing points to try
+lDimRange   = [2,5,10,20,30,40,50,75,100,125,150]       #Latent dimensions to try
+nr_workers  = os.cpu_count()                            #Parallel sweep processes (1: sequential)
+compress = False            #Train on the row space projection of the design (same bound, N instead of D outputs, see checkCompression.py)
+warm_start = False          #Initialize each sweep model from its neighbour (sequential sweeps, see benchmarkWarmStart.py)
+halving = False             #Successive halving: drop the lower half of the sweep candidates after short budgets
+idp_growth = ""             #Inducing point growth of the IDP sweep ("greedy", "kmeans" or "": independent fits)
+path_checkpoints = "./Checkpoints/"     #Fits are stored here and resumed after a restart ("": no checkpoints)
+path_preview = getCheckpointPath(path_checkpoints, "preview")  #Preview of the design, warm start of the final fit
+path_telemetry = "./optModel_telemetry.jsonl"  #JSON lines of each fit, see telemetrySummary.py ("": no telemetry)
+setTelemetry(path_telemetry)
+stochastic = None           #Mini-batch training for large collections, e.g. getStochasticSettings(batchSize=256) of stochasticGPLVM.py (None: full batch)
+optimizer = "lbfgsb"        #"lbfgsb", "scg" or "adam" (mini-batch, default settings), see benchmarkOptimizer.py
+preview = False             #Draft run: random feature GP-LVM with the PCA dimension instead of the sweeps (see previewGPLVM.py)
+preview_IDP = 50            #Inducing points of the draft model
 #---------------------#
 #--- Do processing ---#
 #---------------------#
-PCADim  =   step1_PCA(data_raw,explanationTH=0.75)  #Get initial latent Dimension from PCA
-IDP     =   step2_bGPLVM_IDP(  design_raw = data_raw,
-                            PCAdim = PCADim, 
-                            IDPRange = [10,20,50,75,100, 125, 150,200], 
-                            IDP_LL_TH = 0.95,
-                            doPlot = True)
-lDim    =   step3_bGPLVM_latentDim(data_raw, IDP, [2,5,10,20,30,40,50,75,100,125,150], doPlot=True)
+PCADim  =   step1_PCA(data_raw,explanationTH=0.75, design=design)  #Get initial latent Dimension from PCA
+if(preview):
+    IDP, lDim = preview_IDP, PCADim                                 #Draft settings, no sweeps
+    np.asarray(IDP).tofile("./optModel_bgp_nrInd.csv",sep=',',format='%d')
+    np.asarray(lDim).tofile("./optModel_bgp_lDim.csv",sep=',',format='%d')
+else:
+    IDP     =   step2_bGPLVM_IDP(  design_raw = data_raw,
+                                PCAdim = PCADim, 
+                                IDPRange = IDPRange, 
+                                IDP_LL_TH = 0.95,
+                                doPlot = True,
+                                design = design_sweep,
+                                compress = compress,
+                                nrWorkers = nr_workers,
+                                warmStart = warm_start,
+                                halving = halving,
+                                path_checkpoints = path_checkpoints,
+                                growth = idp_growth,
+                                stochastic = stochastic,
+                                optimizer = optimizer)
+    lDim    =   step3_bGPLVM_latentDim(data_raw, IDP, lDimRange, doPlot=True, design=design_sweep, compress=compress, nrWorkers=nr_workers, warmStart=warm_start, halving=halving, path_checkpoints=path_checkpoints, stochastic=stochastic, optimizer=optimizer)
+design_sweep = None         #Final model uses the full resolution (the step 3 model is reused at sweep_factor 1)
 #-----------------------------#
 #--- Train optimized model ---#
 #-----------------------------#
 iterations=10000                                            #Number of maximum iteration for modelling
-print("Train optimized model")
-print("Standartize data...")
-scaler = preprocessing.StandardScaler().fit(data_raw)     #Create and train scaler
-design = scaler.transform(data_raw)                       #Scale data
-print("Start modelling")
-while(True):
-    model_LVM = GPy.models.BayesianGPLVM(Y               = design,      #Dataset - the original dimension
-                                         input_dim       = lDim,        #Latent dimension
-                                         num_inducing    = IDP)         #Number of induction points
-    model_return = model_LVM.optimize(messages=False, max_iters   = iterations)  #Do modelling 
-    #--- We do this till convergency ---#
-    if(model_return.status!="Errorb'ABNORMAL_TERMINATION_IN_LNSRCH'"):
-        break
+final_starts = 4                                            #Parallel (perturbed) starts of the final model
+max_attempts = 12                                           #Maximum number of starts after line search failures
+if(compress or preview):
+    design_c, _ = compressDesign(design, path_svd="./step1_PCA_svd.npz")   #Gram matrix of step 1
+#--- Step 3 model, if the sweep used the same data and settings ---#
+model_LVM = None if(preview) else loadBGPLVM("./step3_bGPLVM_model.npz", design_c if(compress) else design, design.shape[1], lDim, IDP, iterations, compress, stochastic, optimizer)
+if(preview):
+    print("Fit preview model")
+    warm = fitPreview(design_c, design.shape[1], lDim)
+    savePreview(path_preview, design, warm)
+    model_LVM = getPreviewModel(design_c if(compress) else design, design.shape[1], IDP, warm, compress)   #Draft, not optimized
+elif(model_LVM is not None):
+    print("Use optimized model of step 3")
+else:
+    print("Train optimized model")
+    print("Start modelling")
+    model_LVM = fitBGPLVM(design_c if(compress) else design, design.shape[1], lDim, IDP, iterations, compress,
+                          path_checkpoint=getCheckpointPath(path_checkpoints, "final"),  #Train till convergency (resumes a killed run)
+                          warmStart=loadPreview(path_preview, design),     #Preview of a previous draft run (None: cold start)
+                          maxAttempts=max_attempts, nrStarts=final_starts, stochastic=stochastic, optimizer=optimizer)
 #--- We now have finalized model ---#
 pre_str = "optModel_"
-projection_test, projection_var = model_LVM.infer_newX(design) #Do prediction for dataset
-projection = projection_test.mean                                   #Get mean value of dataset
+if(preview):
+    projection = model_LVM.X.mean.values                            #Draft features of the preview
+else:
+    if(compress):
+        projection_test, projection_var = inferCompressedX(model_LVM, design_c, design.shape[1])
+    else:
+        projection_test, projection_var = model_LVM.infer_newX(design) #Do prediction for dataset
+    projection = projection_test.mean                               #Get mean value of dataset
 #---------------------#
 #--- Store results ---#
 #---------------------#
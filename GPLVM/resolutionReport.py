@@ -0,0 +1,75 @@
+# resolutionReport.py runs the GP-LVM IDP and latent dimension sweeps
+# (step 2 and 3 of getGPLVM.py) on reduced image resolutions and
+# reports, how much the selected hyperparameters change compared to the
+# full resolution. The sweeps of each resolution, also of the full
+# resolution, are done in their own subfolder (Resolution_<factor>), the
+# results of getGPLVM.py are not reused (its sweeps may run on reduced
+# resolutions, see sweep_factor). The compress and nr_workers settings
+# have the meaning of getGPLVM.py.
+#
+# This code is available under a GPL v3.0 license and comes without
+# any explicit or implicit warranty.
+#
+# (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
+import numpy as np  #Numpy :-)
+import sys
+import os
+import time
+sys.path.append("../Python/")                  #Get own stuff
+from bGPLVMOptimizer import step1_PCA
+from bGPLVMOptimizer import step2_bGPLVM_IDP
+from bGPLVMOptimizer import step3_bGPLVM_latentDim
+from designIO import loadDesign
+from pixelMask import loadMask
+from resolution import getResolutionDesign, getResolutionDim
+#--------------------#
+#--- Define paths ---#
+#--------------------#
+path_data   = "../Data/design.csv"      #Flattened image vectors
+if(not os.path.isfile(path_data)):
+    path_data = "../Data/design.npy"    #Design created by getDesign.py
+image_dim   = (224,224)
+factors     = [4,2,1]                   #Resolutions to compare (1 = full resolution)
+IDPRange    = [10,20,50,75,100, 125, 150,200]
+lDimRange   = [2,5,10,20,30,40,50,75,100,125,150]
+nr_workers  = os.cpu_count()            #Parallel sweep processes (1: sequential)
+compress    = False                     #Train on the row space projection of the design (as getGPLVM.py)
+data_raw    = loadDesign(path_data)                         #Load data from file (cached)
+mask        = loadMask("./optModel_bgp_mask.npy")           #Pixel mask of getGPLVM.py (if used)
+#-----------------------------#
+#--- Sweep each resolution ---#
+#-----------------------------#
+report = np.zeros((len(factors),7))     #factor, rows, cols, PCA dim, IDP, latent dim, time
+for looper, factor in enumerate(factors):
+    imgDim = getResolutionDim(image_dim, factor)
+    print("Resolution %dx%d (factor %d)" % (imgDim[0], imgDim[1], factor))
+    folder = "./Resolution_"+str(factor)
+    if(not os.path.isdir(folder)):
+        os.mkdir(folder)
+    os.chdir(folder)                    #The steps store their results in the working directory
+    start = time.time()
+    design, _ = getResolutionDesign(data_raw, image_dim, factor, mask)
+    PCADim  =   step1_PCA(data_raw, explanationTH=0.75, design=design)
+    IDP     =   step2_bGPLVM_IDP(data_raw, PCADim, IDPRange, IDP_LL_TH=0.95, doPlot=True, design=design, compress=compress, nrWorkers=nr_workers)
+    lDim    =   step3_bGPLVM_latentDim(data_raw, IDP, lDimRange, doPlot=True, design=design, compress=compress, nrWorkers=nr_workers)
+    report[looper,:] = [factor, imgDim[0], imgDim[1], PCADim, IDP, lDim, time.time()-start]
+    design = None
+    os.chdir("..")
+#---------------------#
+#--- Create report ---#
+#---------------------#
+full = np.where(report[:,0] == 1)[0]
+if(len(full) != 0):
+    ref = report[full[0],:]
+    change = np.stack((report[:,3]-ref[3], report[:,4]-ref[4], report[:,5]-ref[5],
+                      (report[:,4]-ref[4])/ref[4]*100, (report[:,5]-ref[5])/ref[5]*100), axis=1)
+else:
+    change = np.full((len(factors),5), np.nan)
+np.savetxt( "./resolutionReport.csv",
+            np.concatenate((report, change), axis=1),
+            header="factor,rows,cols,PCADim,IDP,lDim,time_s,dPCADim,dIDP,dlDim,dIDP_percent,dlDim_percent",
+            delimiter=',')
+print("factor | resolution | PCA dim | IDP (change) | latent dim (change)")
+for i in range(0,len(factors)):
+    print("%6d | %4dx%-4d  | %7d | %4d (%+d) | %4d (%+d)" % (report[i,0], report[i,1], report[i,2], report[i,3],
+                                                          report[i,4], change[i,1], report[i,5], change[i,2]))
@@ -0,0 +1,26 @@
+# telemetrySummary.py summarizes the optimization telemetry of the
+# GP-LVM fits (optModel_telemetry.jsonl, written by getGPLVM.py) or of
+# the GPC fits (GPC_telemetry.jsonl, written by GPC.py). The slowest
+# fits, the fits which reached the iteration limit and the time per
+# termination status are printed. This script is called using:
+#
+# python telemetrySummary.py <telemetry-file.jsonl>(optional) <nr. of fits>(optional)
+#
+# This code is available under a GPL v3.0 license and comes without
+# any explicit or implicit warranty.
+#
+# (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../Python/"))     #Get own stuff (also called from ../GPC)
+from telemetry import summarizeTelemetry
+#--------------------#
+#--- Define paths ---#
+#--------------------#
+path_telemetry  = sys.argv[1] if(len(sys.argv) > 1) else "./optModel_telemetry.jsonl"
+nr_fits         = int(sys.argv[2]) if(len(sys.argv) > 2) else 10    #Number of slowest fits
+if(not os.path.isfile(path_telemetry)):
+    print("No telemetry file %s" % path_telemetry)
+    sys.exit(1)
+print("Telemetry: %s" % path_telemetry)
+summarizeTelemetry(path_telemetry, nr_fits)
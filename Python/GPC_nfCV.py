@@ -16,6 +16,9 @@ from sklearn.preprocessing import StandardScaler    	#Scale input data
 from sklearn.metrics import confusion_matrix        	#Confusion matrix
 from sklearn.metrics import accuracy_score		#Classification accuracy
 import GPy		#GPy for GPC
+from multiStart import multiStart, perturbModel	#Bounded restarts
+from telemetry import optimizeWatched		#Optimization telemetry
+from checkpoint import optimizeModel		#L-BFGS-B with iteration count
 #-----------------#
 #--- The class ---#
 #-----------------#
@@ -84,7 +87,7 @@ class GPC_nfCV:
                 #print("Train size: ", X_train.shape)
                 #print("Test size: ", Y_train.shape)
                 GPC_C=GPC(X_train,Y_train,X_test,Y_test)
-                GPC_C.fit()
+                GPC_C.fit(name="%s_fold%d_class%d" % (experimentPrefix, i, k))
                 class_p[:,k]=GPC_C.prediction_label
                 ls_memory[k,:]=GPC_C.GPC_LS
             #--- Normalize probability values ---#
@@ -118,21 +121,39 @@ class GPC_nfCV:
         print("Mean accuracy: %f" % np.mean(GPC_memory_ACC))
         np.savetxt(experimentPrefix+"_AccMemory.csv",GPC_memory_ACC)
         return([np.mean(GPC_memory_ACC),SUM_PRED_Y, SUM_PRED_Y_PROB ])
+#-------------------------------------------------------#
+# Function: gpcAttempt(...)                             #
+# Desct:    One optimization attempt of GPC.fit, later  #
+#           attempts are perturbed.                     #
+# Param:    design          Not used (data in args)     #
+#           args            (X_train, Y_train, name)    #
+#           index           Attempt number              #
+# Return:   [status, log likelihood, model]             #
+#-------------------------------------------------------#
+def gpcAttempt(design, args, index):
+    X_train, Y_train, name = args
+    #--- Create GPC model ---#
+    kernel = GPy.kern.RBF(X_train.shape[1],ARD=1) +  GPy.kern.Bias(X_train.shape[1])  #Define kernel
+    m = GPy.models.GPClassification(X_train, Y_train, kernel=kernel)      #Define GPC
+    if(index != 0):
+        perturbModel(m, index)
+    #--- Optimize ---#
+    ret = optimizeWatched(m, lambda: optimizeModel(m, 1000), {"fit": name, "attempt": index})     #L-BFGS-B, 1000 iterations (GPy default)
+    return [ret.status, m.log_likelihood(), m]
 class GPC:
     def __init__(self,X_train,Y_train,X_test,Y_test):
         self.X_train=X_train    #Get design data
         self.Y_train=Y_train    #Get BINARY labels
         self.X_test=X_test      #Get design data
         self.Y_test=Y_test      #Get BINARY labels
-    def fit(self):
-        while(True):
-            #--- Create GPC model ---#
-            kernel = GPy.kern.RBF(self.X_train.shape[1],ARD=1) +  GPy.kern.Bias(self.X_train.shape[1])  #Define kernel
-            m = GPy.models.GPClassification(self.X_train, self.Y_train, kernel=kernel)      #Define GPC
-            #--- Optimize ---#
-            ret = m.optimize(optimizer='lbfgs')
-            if(ret.status!="Errorb'ABNORMAL_TERMINATION_IN_LNSRCH'"):
-                break
+    def fit(self, maxAttempts=10, nrStarts=1, name="gpc"):
+        #--- Retry line search failures (bounded) ---#
+        result = multiStart(gpcAttempt, None, (self.X_train, self.Y_train, name), maxAttempts, nrStarts)
+        m = result.get("model")
+        if(m is None):      #Attempt of a worker process
+            kernel = GPy.kern.RBF(self.X_train.shape[1],ARD=1) +  GPy.kern.Bias(self.X_train.shape[1])
+            m = GPy.models.GPClassification(self.X_train, self.Y_train, kernel=kernel)
+            m[:] = result["params"]
         #--- Get labels ---#
         self.prediction_label = m.predict(self.X_test)[0].reshape((-1,1))[:,0]
         self.GPC_LS = m.kern['sum.rbf.lengthscale'][:] 
@@ -3,6 +3,9 @@ import datetime                                         #For printing sytem time
 from sklearn import preprocessing                       #Data preprocessing
 import numpy as np			                #You should know that...
 from sklearn.model_selection import train_test_split    #Split functionality
+from designIO import loadDesign                         #Cached design loading
+from designScaler import getScaler, getScalerPath, scaleDesign     #Stored data preprocessing
+from resolution import downsampleDesign                 #Reduced image resolution
 #-------------------------------#
 #--- Class for data handling ---#
 #-------------------------------#
@@ -12,9 +15,18 @@ class GPData:
     # Descr: Inits datastructures and gives sampling    #
     #       ability.                                    #
     # Param: pathData       Path to the design data     #
+    #        dtype          Design data type (float32   #
+    #                       halves the footprint)       #
+    #        path_scaler    Stored scaler (*.npz), "" to#
+    #                       train a new one             #
+    #        mask           Pixel mask, design contains #
+    #                       masked columns only         #
+    #        imgDim         Image dimension and factor  #
+    #        factor         for downsampling (factor 1: #
+    #                       use data as is)             #
     # Return: -                                         #
     #---------------------------------------------------#
-    def __init__(self, path_Data, path_inv_Selection="", path_faulty="", name="myDataHandler", scale=True):
+    def __init__(self, path_Data, path_inv_Selection="", path_faulty="", name="myDataHandler", scale=True, dtype=np.float64, path_scaler="", mask=None, imgDim=None, factor=1):
         self.instanceName = name
         self.prefix = "GPData ["+self.instanceName+"]: "
         self.Print("Init GPData instance...")
@@ -25,15 +37,20 @@ class GPData:
         #-----------------#
         #--- Load data ---#
         #-----------------#
-        self.design_Raw	= np.loadtxt(  open(self.path_Data),delimiter=",")      #Load data from file
+        self.design_Raw	= loadDesign(self.path_Data, dtype=dtype)               #Load data from file (cached, parallel)
+        if(factor != 1):
+            self.Print("Downsample data by factor "+str(factor))
+            self.design_Raw = downsampleDesign(self.design_Raw, imgDim, factor)    #Reduced resolution
         if(scale):
-            self.Print("Train scaler...")
-            self.scaler 	= preprocessing.StandardScaler().fit(self.design_Raw)   #Train scaler
-            self.design 	= self.scaler.transform(self.design_Raw)                #Transform data
+            self.Print("Get scaler...")
+            self.scaler 	= getScaler(self.design_Raw, getScalerPath(path_scaler, factor))   #Load or train scaler (of this resolution)
+            self.design 	= scaleDesign(self.design_Raw, self.scaler, mask=mask)  #Transform data chunkwise
         else:
             self.Print("No scaler...")
             self.scaler 	= 0                 #No scaler
             self.design 	= self.design_Raw   #Use Raw data
+            if(mask is not None):
+                self.design = self.design_Raw[:,mask]   #Use masked raw data
         #-------------------------------#
         #--- Load feature exclustion ---#
         #-------------------------------#
@@ -56,6 +73,8 @@ class GPData:
         #--- Print system info ---#
         #-------------------------#
         self.Print("Loaded raw data ["+str(self.design_Raw.shape[0])+"x"+str(self.design_Raw.shape[1])+"]")
+        if(mask is not None):
+            self.Print("Use "+str(self.design.shape[1])+" masked dimensions")
         self.Print("Found "+str(len(self.index_faulty))+ " faulty elements")
         self.Print(str(self.index_selection_inv))
         self.Print("Ignore "+str(len(self.index_selection_inv)) + " dimensions")
@@ -4,7 +4,107 @@ from sklearn import preprocessing                       #Data preprocessing
 import numpy as np			                #You should know that...
 from sklearn.model_selection import train_test_split    #Split functionality
 from GPData import GPData                               #Create GP data structures
+from pixelMask import loadMask, unmask                  #Optional background mask
+from resolution import getResolutionDim, downsampleMask, upsampleImage     #Multi-resolution models
+from compressedGPLVM import compressDesign, getCompressedBGPLVM, inferCompressedX, expandMean  #Row space compression
+from sharedDesign import runPool, getWorkerDesign, getThreads   #Parallel heatmaps on a shared design
 import matplotlib.pyplot as plt                         #To plot stuff
+worker_heatmap = None                                   #Restored model of a heatmap worker
+#-------------------------------------------------------#
+# Function: loadModel(...)                              #
+# Desct:    Restores a trained Bayesian GP-LVM.         #
+# Param:    design          Scaled design               #
+#           path_Model      Path to *.npy model         #
+#           nrLD            Number of latent dimensions #
+#           nrInd           Number of inducing points   #
+#           compress        Use the row space projection#
+#           dtype           Type of V^T (pixel space)   #
+# Return:   [model, compressed design, V^T] (None if not#
+#           compressed)                                 #
+#-------------------------------------------------------#
+def loadModel(design, path_Model, nrLD, nrInd, compress=False, dtype=np.float64):
+    design_c, Vt = None, None
+    if(compress):
+        design_c, Vt = compressDesign(design, dtype=dtype)         #Predictions are mapped back with Vt
+        model = getCompressedBGPLVM(design_c, design.shape[1], nrLD, nrInd, initialize = True)
+    else:
+        model = GPy.models.BayesianGPLVM(   Y = design,                 #Used for kernel matrix
+                                            input_dim = nrLD,           #Number of latent dimensions used
+                                            num_inducing = nrInd,       #Number of used inducing pts.
+                                            initialize = True)
+    model[:] = np.load(path_Model)          #Load trained model
+    model.initialize_parameter()
+    return [model, design_c, Vt]
+#-------------------------------------------------------#
+# Function: getMeanWeights(...)                         #
+# Desct:    Returns W of the predictive mean K(F,Z) W   #
+#           (Woodbury vector) in pixel space.           #
+# Param:    model           Trained Bayesian GP-LVM     #
+#           Vt              Row space basis (None: not  #
+#                           compressed)                 #
+#           dtype           Precision of pixel space    #
+# Return:   [M x D] weights                             #
+#-------------------------------------------------------#
+def getMeanWeights(model, Vt=None, dtype=np.float64):
+    W = np.asarray(model.posterior.woodbury_vector, dtype=dtype)
+    if(Vt is not None):
+        W = expandMean(W, Vt)               #Map back to pixel space
+    return W
+#-------------------------------------------------------#
+# Function: getHeatmap(...)                             #
+# Desct:    Estimates and stores the variance heatmap of#
+#           a latent dimension. All samples are         #
+#           reprojected with the other dimensions at    #
+#           their mean, the pixel variance of the means #
+#           K W is diag(W^T cov(K) W).                  #
+# Param:    model           Trained Bayesian GP-LVM     #
+#           W               Mean weights [M x D]        #
+#           projection      Latent means [N x Q]        #
+#           feature         Mean latent point           #
+#           index           Latent dimension            #
+#           settings        dict (mask, imgDim, factor, #
+#                           prefix, pltText)            #
+# Return:   (index, variance image, normalized image)   #
+#-------------------------------------------------------#
+def getHeatmap(model, W, projection, feature, index, settings):
+    #--- reproject data: mean feature, chosen dimension of each sample ---#
+    f_vectors = np.tile(feature, (projection.shape[0],1))
+    f_vectors[:,index] = projection[:,index]
+    K = model.kern.K(f_vectors, model.Z)                    #[N x M], all samples in one call
+    K = K-np.mean(K, axis=0)
+    K_cov = K.T.dot(K)/projection.shape[0]
+    VARImg = unmask(np.sum(W*K_cov.astype(W.dtype).dot(W), axis=0), settings["mask"])  #Estimate variance for all pixels in image
+    I = upsampleImage(VARImg, settings["imgDim"], settings["factor"])   #Reshape (and upsample) variance image
+    I = (I-np.min(I))/(np.max(I)-np.min(I))                 #Normalize variance image
+    #--- Store as an image ---#
+    prefix = settings["prefix"]
+    plt.figure()
+    plt.imshow(I)               #Plot image
+    plt.axis('off')             #Remove axes
+    plt.text(5,30, settings["pltText"]+str(index),fontsize=40,color='red')
+    plt.savefig(prefix+str(index)+".png")                       #Save variance image as png file
+    plt.savefig(prefix+str(index)+"F.pdf")
+    np.savetxt( prefix+str(index)+"_raw.csv", VARImg, delimiter=',') #Save variance vector as csv file
+    np.savetxt( prefix+str(index)+".csv", I, delimiter=',') #Save variance vector as csv file
+    plt.close()
+    return (index, VARImg, I)
+#-------------------------------------------------------#
+# Function: heatmapWorker(...)                          #
+# Desct:    Worker function, restores the model once per#
+#           process from the shared design and stores   #
+#           the heatmap of a latent dimension.          #
+# Param:    task            (index, settings), settings #
+#                           of getHeatmap and loadModel #
+# Return:   (index, variance image, normalized image)   #
+#-------------------------------------------------------#
+def heatmapWorker(task):
+    global worker_heatmap
+    index, settings = task
+    if(worker_heatmap is None):
+        model, design_c, Vt = loadModel(getWorkerDesign(), settings["path_Model"], settings["nrLD"], settings["nrInd"], settings["compress"], settings["dtype"])
+        worker_heatmap = [model, getMeanWeights(model, Vt, settings["dtype"])]
+    model, W = worker_heatmap
+    return getHeatmap(model, W, settings["projection"], settings["feature"], index, settings)
 #----------------------------#
 #--- bGPLVM derived class ---#
 #----------------------------#
@@ -16,7 +116,7 @@ class bGPLVM:
     # Param: see below                                  #
     # Return: -                                         #
     #---------------------------------------------------#
-    def __init__(self, path_Data, path_latent, path_Model, path_faulty, path_inv_Selection, nrInd, nrLD, imgDim, name="mymodel"):
+    def __init__(self, path_Data, path_latent, path_Model, path_faulty, path_inv_Selection, nrInd, nrLD, imgDim, name="mymodel", path_scaler="", path_mask="", resolutionFactor=1, compress=False, dtype=np.float64):
         self.modelName=name                         #Name of this model
         self.prefix = "bGPLVM ["+name+"]: "      #Used for printing
         self.Print("Init bGPLVM datastructures...")
@@ -27,6 +127,11 @@ class bGPLVM:
         self.nr_inducingPTS = nrInd     #Number of inducing variables
         self.nr_LD = nrLD               #Number of used latent dimensions
         self.imageDimensions = imgDim   #Dimension for image reshaping
+        self.resolutionFactor = resolutionFactor                                #Model resolution (1 = full)
+        self.modelDimensions = getResolutionDim(imgDim, resolutionFactor)       #Image dimension of the model
+        self.mask = downsampleMask(loadMask(path_mask), imgDim, resolutionFactor)   #Pixel mask (None = all pixels)
+        self.compress = compress        #Use the row space projection of the data
+        self.dtype = dtype              #Precision of pixel space arrays (GP algebra uses float64)
         #------------------------------#
         #--- Set data datastructure ---#
         #------------------------------#
@@ -35,18 +140,12 @@ class bGPLVM:
             self.Data_latent    = 0
         else:
             self.Data_latent    = GPData(path_latent,   path_inv_Selection, path_faulty, "Features")
-        self.Data_full      = GPData(path_Data,     "",                 path_faulty, "Images")
+        self.Data_full      = GPData(path_Data,     "",                 path_faulty, "Images", path_scaler=path_scaler, mask=self.mask, imgDim=imgDim, factor=resolutionFactor, dtype=dtype)
         #------------------#
         #--- Load model ---#
         #------------------#
         self.Print("Load bGPLVM data")
-        self.model = GPy.models.BayesianGPLVM(  Y = self.Data_full.design,          #Used for kernel matrix
-                                                input_dim = self.nr_LD,             #Number of latent dimensions used
-                                                num_inducing = self.nr_inducingPTS, #Number of used inducing pts.
-                                                initialize = True)
-        self.Print("Initialize bGPLVM parameters")
-        self.model[:] = np.load(self.path_Model)        #Load trained model
-        self.model.initialize_parameter()
+        self.model, self.design_c, self.Vt = loadModel(self.Data_full.design, self.path_Model, self.nr_LD, self.nr_inducingPTS, self.compress, dtype)
         #---------------------#
         #--- Print summary ---#
         #---------------------#
@@ -60,6 +159,14 @@ class bGPLVM:
         print("|| #ind Pts: "           + str(self.nr_inducingPTS))
         print("|| #latent Dim: "        + str(self.nr_LD))
         print("|| Rescaling factors "   +str(self.imageDimensions))
+        if(self.resolutionFactor != 1):
+            print("|| Model resolution "+str(self.modelDimensions))
+        if(self.compress):
+            print("|| Compressed outputs: " + str(self.design_c.shape[1]))
+        if(self.dtype != np.float64):
+            print("|| Pixel precision: "  + np.dtype(self.dtype).name)
+        if(self.mask is not None):
+            print("|| Pixel mask: "     + str(np.sum(self.mask)) + " of " + str(self.mask.shape[0]))
     #---------------------------------------------------#
     # Name: print(...)                                  #
     # Descr: The print function is used to print a given#
@@ -74,53 +181,45 @@ class bGPLVM:
     #---------------------------------------------------#
     # Name: plotVarHeatmaps()                           #
     # Descr: Plots image heatmaps by re-projecting the  #
-    #       latent space into the image space.          #
-    # Param: -                                          #
+    #       latent space into the image space. The      #
+    #       predictive means of all samples are one     #
+    #       kernel evaluation per dimension. Dimensions #
+    #       are distributed over worker processes, each #
+    #       worker restores the model once.             #
+    # Param: prefix         Path prefix of the heatmaps #
+    #        pltText        Label prefix                #
+    #        nrWorkers      Parallel processes (1:      #
+    #                       sequential)                 #
+    #        nrThreads      BLAS threads per worker     #
+    #                       (None: CPUs/workers)        #
     # Return: -                                         #
     #---------------------------------------------------#
-    def plotVarHeatmaps(self, prefix="",pltText="F"):
+    def plotVarHeatmaps(self, prefix="",pltText="F", nrWorkers=1, nrThreads=None):
         self.Print("Estimating variance based heatmaps")
         #--- Get latent space data ---#
-        projection_test, projection_var = self.model.infer_newX(self.Data_full.design)
+        if(self.compress):
+            projection_test, projection_var = inferCompressedX(self.model, self.design_c, self.Data_full.design.shape[1])
+        else:
+            projection_test, projection_var = self.model.infer_newX(self.Data_full.design)
         #(We do not have to predict -> for clearity only)
-        projection = projection_test.mean #Get expectation in latent space
+        projection = np.asarray(projection_test.mean) #Get expectation in latent space
+        feature = np.mean(projection, axis=0)                   #Mean latent point
+        settings = {"mask": self.mask, "imgDim": self.imageDimensions, "factor": self.resolutionFactor, "prefix": prefix, "pltText": pltText}
         #-------------------------------------#
         #--- Start creating visualizations ---#
         #-------------------------------------#
         image_dim = self.imageDimensions                        #Get variable
         display_grid = np.zeros((projection.shape[0] * image_dim[0], image_dim[1]))            #Create Image for features
-        looper_grid=0                                           #Looper variable
-        VarMemory = np.zeros((self.nr_LD,np.prod(image_dim)))   #Memory for variance memory
-        for i in range(0,projection.shape[1]):                  #For all dimensions
-            feature = np.zeros((1,projection.shape[1]))         #Init memory
-            for k in range(0,projection.shape[1]):              #For all dimensions, estimate mean value
-                feature[0,k] = np.mean(projection[:,k])         #(get mean value)
-            mx_val = np.max(projection[:,i])                    #Get maximum of chosen dimension
-            mn_val = np.min(projection[:,i])                    #Get minimum of chosen dimension
-            #--- reproject data ---#
-            featureVar_memory = np.zeros((self.Data_full.design.shape[1], projection.shape[0]))   #Memory for variance
-            looper=0                                                    #Looper variable
-            #--- Now we use real sample data ---#
-            for k in range(0,projection.shape[0]): #For all samples
-                f_vector = feature                                      #Get mean feature
-                f_vector[0,i]=projection[k,i]                           #Replace chosen dimension with value
-                img_mean, img_var = self.model.predict(f_vector)        #Reprooject to image space
-                featureVar_memory[:,looper]=img_mean                    #Store reprojected and added value
-                looper=looper+1                                         #Increment looper
-            #--- Store variance ---#
-            VARImg = np.var(featureVar_memory, axis=1)                                  #Estimate variance for all pixels in image
+        VarMemory = np.zeros((self.nr_LD,np.prod(self.modelDimensions)), dtype=self.dtype)   #Memory for variance memory
+        if(nrWorkers > 1):
+            self.Print("Heatmaps of %d dimensions in %d processes" % (projection.shape[1], nrWorkers))
+            settings.update({"path_Model": self.path_Model, "nrLD": self.nr_LD, "nrInd": self.nr_inducingPTS, "compress": self.compress,
+                             "dtype": self.dtype, "projection": projection, "feature": feature})
+            tasks = [(i, settings) for i in range(0,projection.shape[1])]
+            heatmaps = runPool(heatmapWorker, tasks, self.Data_full.design, nrWorkers, getThreads(nrWorkers, nrThreads))
+        else:
+            W = getMeanWeights(self.model, self.Vt, self.dtype)  #Predictive mean K(F,Z) W in pixel space
+            heatmaps = (getHeatmap(self.model, W, projection, feature, i, settings) for i in range(0,projection.shape[1]))
+        for i, VARImg, I in heatmaps:                           #For all dimensions (completion order)
             VarMemory[i,:]=VARImg
-            I = np.reshape(VARImg, (image_dim[0],image_dim[1]))                         #Reshape variance image
-            I = (I-np.min(I))/(np.max(I)-np.min(I))                                     #Normalize variance image
-            display_grid[(looper_grid*image_dim[0]):((looper_grid+1)*image_dim[0]),:]=I #Plance variance image in grid
-            #--- Store as an image ---#
-            plt.figure()
-            plt.imshow(I)               #Plot image
-            plt.axis('off')             #Remove axes
-            plt.text(5,30, pltText+str(looper_grid),fontsize=40,color='red')
-            plt.savefig(prefix+str(looper_grid)+".png")                       #Save variance image as png file
-            plt.savefig(prefix+str(looper_grid)+"F.pdf")
-            np.savetxt( prefix+str(looper_grid)+"_raw.csv", VARImg, delimiter=',') #Save variance vector as csv file
-            np.savetxt( prefix+str(looper_grid)+".csv", I, delimiter=',') #Save variance vector as csv file
-            looper_grid=looper_grid+1   #Increment looper
-            plt.close()
+            display_grid[(i*image_dim[0]):((i+1)*image_dim[0]),:]=I #Plance variance image in grid
@@ -15,9 +15,307 @@
 # (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
 import numpy as np                      #You should know that
 from sklearn.decomposition import PCA   #PCA decomposition module
-from sklearn import preprocessing       #Data preprocessing
+from designScaler import getScaledDesign #Stored data preprocessing
+from compressedGPLVM import compressDesign, getCompressedBGPLVM   #Row space compression
+from gramPCA import getGramPCA          #PCA of wide designs
+from sharedDesign import runPool, getWorkerDesign, getThreads   #Parallel sweeps on a shared design
+from warmStart import getWarmStart, applyWarmStart, getGrowthStart    #Warm started sweeps
+from checkpoint import getCheckpointKey, getCheckpointPath, loadCheckpoint, saveCheckpoint, optimizeCheckpointed, status_running  #Resumable fits
+from multiStart import multiStart, perturbModel, isConverged   #Bounded restarts
+from stochasticGPLVM import getBatchSize    #Mini-batch training
+from telemetry import optimizeWatched   #Optimization telemetry
+import os                               #Fit names
 import matplotlib.pyplot as plt         #Plot function
 import GPy                              #GPy python library
+status_selected = "Selected"            #Status of the stored step 3 model
+#------------------------------#
+#--- Model training helpers ---#
+#------------------------------#
+#-------------------------------------------------------#
+# Function: buildBGPLVM(...)                            #
+# Desct:    Creates an untrained Bayesian GP-LVM.       #
+# Param:    design          Scaled (or compressed) data #
+#           output_dim      Output dimension of the data#
+#           input_dim       Latent dimension            #
+#           num_inducing    Number of inducing points   #
+#           compress        design is compressed        #
+# Return:   model                                       #
+#-------------------------------------------------------#
+def buildBGPLVM(design, output_dim, input_dim, num_inducing, compress=False):
+    if(compress):
+        return getCompressedBGPLVM(design, output_dim, input_dim, num_inducing)
+    return GPy.models.BayesianGPLVM(Y               = design,           #Dataset - the original dimension
+                                    input_dim       = input_dim,        #Latent dimension
+                                    num_inducing    = num_inducing)     #Number of induction points
+#-------------------------------------------------------#
+# Function: restoreBGPLVM(...)                          #
+# Desct:    Creates a Bayesian GP-LVM with given        #
+#           parameters.                                 #
+# Param:    design          Scaled (or compressed) data #
+#           output_dim      Output dimension of the data#
+#           input_dim       Latent dimension            #
+#           num_inducing    Number of inducing points   #
+#           compress        design is compressed        #
+#           params          param_array                 #
+# Return:   model                                       #
+#-------------------------------------------------------#
+def restoreBGPLVM(design, output_dim, input_dim, num_inducing, compress, params):
+    model_LVM = buildBGPLVM(design, output_dim, input_dim, num_inducing, compress)
+    model_LVM[:] = params
+    return model_LVM
+#-------------------------------------------------------#
+# Function: loadBGPLVM(...)                             #
+# Desct:    Loads a stored model (checkpoint format) if #
+#           it was trained on the design with the same  #
+#           settings.                                   #
+# Param:    path_model      Path to the *.npz file      #
+#           design          Scaled (or compressed) data #
+#           output_dim      Output dimension of the data#
+#           input_dim       Latent dimension            #
+#           num_inducing    Number of inducing points   #
+#           iterations      Maximum iterations          #
+#           compress        design is compressed        #
+#           stochastic      Mini-batch settings (None:  #
+#                           full batch optimization)    #
+#           optimizer       "lbfgsb", "scg" or "adam"   #
+# Return:   model or None if missing/not matching       #
+#-------------------------------------------------------#
+def loadBGPLVM(path_model, design, output_dim, input_dim, num_inducing, iterations=10000, compress=False, stochastic=None, optimizer="lbfgsb"):
+    stored = loadCheckpoint(path_model, getCheckpointKey(design, input_dim, num_inducing, iterations, compress, getBatchSize(stochastic), optimizer))
+    if((stored is None) or (stored["status"] == status_running) or stored["status"].startswith("Error")):
+        return None
+    return restoreBGPLVM(design, output_dim, input_dim, num_inducing, compress, stored["params"])
+#-------------------------------------------------------#
+# Function: fitAttempt(...)                             #
+# Desct:    One optimization attempt of fitBGPLVM. The  #
+#           first attempt resumes a checkpoint or uses  #
+#           the warm start, later attempts are perturbed#
+#           cold starts.                                #
+# Param:    design          Scaled (or compressed) data #
+#           args            (output_dim, input_dim,     #
+#                           num_inducing, iterations,   #
+#                           compress, warmStart,        #
+#                           checkpoint, path_checkpoint,#
+#                           key, stochastic, optimizer) #
+#           index           Attempt number              #
+# Return:   [status, log likelihood, model]             #
+#-------------------------------------------------------#
+def fitAttempt(design, args, index):
+    output_dim, input_dim, num_inducing, iterations, compress, warmStart, checkpoint, path_checkpoint, key, stochastic, optimizer = args
+    model_LVM = buildBGPLVM(design, output_dim, input_dim, num_inducing, compress)
+    info = {"fit": os.path.splitext(os.path.basename(path_checkpoint))[0], "attempt": index, "max_iters": iterations, "batch_size": getBatchSize(stochastic), "optimizer": optimizer}
+    if(index != 0):
+        perturbModel(model_LVM, index)
+        checkpoint, path_checkpoint = None, ""                                      #Checkpoints of the first attempt only
+    elif(checkpoint is not None):
+        model_LVM[:] = checkpoint["params"]                                         #Stored state
+        print("          Resume fit %s after %d iterations" % (path_checkpoint, checkpoint["iterations"]))
+    elif(warmStart is not None):
+        applyWarmStart(model_LVM, warmStart)
+    model_return = optimizeWatched(model_LVM, lambda: optimizeCheckpointed(model_LVM, iterations, path_checkpoint, key, checkpoint, stochastic=stochastic, optimizer=optimizer), info)   #Do modelling
+    return [model_return.status, model_LVM.log_likelihood()[0,0], model_LVM]
+#-------------------------------------------------------#
+# Function: fitBGPLVM(...)                              #
+# Desct:    Trains a Bayesian GP-LVM till convergency.  #
+#           Attempts with line search failures are      #
+#           repeated (bounded multi-start).             #
+# Param:    design          Scaled (or compressed) data #
+#           output_dim      Output dimension of the data#
+#           input_dim       Latent dimension            #
+#           num_inducing    Number of inducing points   #
+#           iterations      Maximum iterations          #
+#           compress        design is compressed        #
+#           warmStart       Initial state of a neighbour#
+#                           model (None: cold start)    #
+#           path_checkpoint Checkpoint file, a stored   #
+#                           fit is resumed or reused    #
+#                           ("" = no checkpoints)       #
+#           maxAttempts     Maximum number of attempts  #
+#           nrStarts        Parallel attempts (not      #
+#                           inside of a worker process) #
+#           stochastic      Mini-batch settings (None:  #
+#                           full batch optimization)    #
+#           optimizer       "lbfgsb", "scg" or "adam"   #
+# Return:   trained model                               #
+#-------------------------------------------------------#
+def fitBGPLVM(design, output_dim, input_dim, num_inducing, iterations=10000, compress=False, warmStart=None, path_checkpoint="", maxAttempts=10, nrStarts=1, stochastic=None, optimizer="lbfgsb"):
+    key = getCheckpointKey(design, input_dim, num_inducing, iterations, compress, getBatchSize(stochastic), optimizer) if(path_checkpoint != "") else ""
+    checkpoint = loadCheckpoint(path_checkpoint, key)
+    if((checkpoint is not None) and checkpoint["status"].startswith("Error")):
+        checkpoint = None                                                           #Failed fit, start again
+    if((checkpoint is not None) and (checkpoint["status"] != status_running)):
+        print("          Use finished fit %s" % path_checkpoint)
+        return restoreBGPLVM(design, output_dim, input_dim, num_inducing, compress, checkpoint["params"])
+    args = (output_dim, input_dim, num_inducing, iterations, compress, warmStart, checkpoint, path_checkpoint, key, stochastic, optimizer)
+    result = multiStart(fitAttempt, design, args, maxAttempts, nrStarts)
+    model_LVM = result.get("model")
+    if(model_LVM is None):
+        model_LVM = restoreBGPLVM(design, output_dim, input_dim, num_inducing, compress, result["params"])   #Attempt of a worker process
+    if((path_checkpoint != "") and (result["index"] != 0)):
+        run = model_LVM.optimization_runs[-1] if(len(model_LVM.optimization_runs) != 0) else None
+        evaluations, nit = (run.funct_eval, run.nit) if(run is not None) else (0, 0)
+        saveCheckpoint(path_checkpoint, key, model_LVM, result["status"], result["seconds"], evaluations, nit)
+    return model_LVM
+#-------------------------------------------------------#
+# Function: fitWorker(...)                              #
+# Desct:    Worker function, trains a model on the      #
+#           shared design.                              #
+# Param:    task            (index, output_dim,         #
+#                           input_dim, num_inducing,    #
+#                           iterations, compress,       #
+#                           path_checkpoint, stochastic,#
+#                           optimizer)                  #
+# Return:   (index, log likelihood, param_array)        #
+#-------------------------------------------------------#
+def fitWorker(task):
+    index, output_dim, input_dim, num_inducing, iterations, compress, path_checkpoint, stochastic, optimizer = task
+    model_LVM = fitBGPLVM(getWorkerDesign(), output_dim, input_dim, num_inducing, iterations, compress, path_checkpoint=path_checkpoint, stochastic=stochastic, optimizer=optimizer)
+    return index, float(model_LVM.log_likelihood()[0,0]), model_LVM.param_array.copy()
+#--------------------------#
+#--- Successive halving ---#
+#--------------------------#
+#-------------------------------------------------------#
+# Function: resumeBGPLVM(...)                           #
+# Desct:    Trains a Bayesian GP-LVM for a number of    #
+#           iterations, starting from stored parameters.#
+# Param:    design          Scaled (or compressed) data #
+#           output_dim      Output dimension of the data#
+#           input_dim       Latent dimension            #
+#           num_inducing    Number of inducing points   #
+#           iterations      Iterations of this run      #
+#           compress        design is compressed        #
+#           params          param_array (None: new model#
+#                           trained as fitBGPLVM)       #
+#           stochastic      Mini-batch settings (None:  #
+#                           full batch optimization)    #
+#           optimizer       "lbfgsb", "scg" or "adam"   #
+# Return:   [log likelihood, param_array, converged]    #
+#-------------------------------------------------------#
+def resumeBGPLVM(design, output_dim, input_dim, num_inducing, iterations, compress=False, params=None, stochastic=None, optimizer="lbfgsb"):
+    if(params is None):
+        model_LVM = fitBGPLVM(design, output_dim, input_dim, num_inducing, iterations, compress, stochastic=stochastic, optimizer=optimizer)
+    else:
+        model_LVM = buildBGPLVM(design, output_dim, input_dim, num_inducing, compress)
+        model_LVM[:] = params                           #Resume stored model
+        optimizeWatched(model_LVM, lambda: optimizeCheckpointed(model_LVM, iterations, stochastic=stochastic, optimizer=optimizer),
+                        {"fit": "halving", "max_iters": iterations, "batch_size": getBatchSize(stochastic), "optimizer": optimizer})
+    converged = isConverged(model_LVM.optimization_runs[-1].status)
+    return [float(model_LVM.log_likelihood()[0,0]), model_LVM.param_array.copy(), converged]
+#-------------------------------------------------------#
+# Function: resumeWorker(...)                           #
+# Desct:    Worker function of resumeBGPLVM on the      #
+#           shared design.                              #
+# Param:    task            (index, output_dim,         #
+#                           input_dim, num_inducing,    #
+#                           iterations, compress,params,#
+#                           stochastic, optimizer)      #
+# Return:   (index, log likelihood, params, converged)  #
+#-------------------------------------------------------#
+def resumeWorker(task):
+    index, output_dim, input_dim, num_inducing, iterations, compress, params, stochastic, optimizer = task
+    return (index,)+tuple(resumeBGPLVM(getWorkerDesign(), output_dim, input_dim, num_inducing, iterations, compress, params, stochastic, optimizer))
+#-------------------------------------------------------#
+# Function: pruneLowerHalf(...)                         #
+# Desct:    Pruning rule of the successive halving,     #
+#           keeps the better half (by bound).           #
+# Param:    logLik          Bounds of all candidates    #
+#           alive           Indices of the survivors    #
+#           minSurvivors    Minimum number of survivors #
+# Return:   indices of the kept candidates              #
+#-------------------------------------------------------#
+def pruneLowerHalf(logLik, alive, minSurvivors):
+    ranked = alive[np.argsort(logLik[alive])[::-1]]     #Best bound first
+    return ranked[:max(minSurvivors, int(np.ceil(len(alive)/2.)))]
+#-------------------------------------------------------#
+# Function: normalizeBounds(...)                        #
+# Desct:    Normalizes bounds to [0,1]. Equal bounds are#
+#           all 1 (each candidate reaches a threshold). #
+# Param:    logLik          Bounds                      #
+# Return:   normalized bounds                           #
+#-------------------------------------------------------#
+def normalizeBounds(logLik):
+    span = np.max(logLik)-np.min(logLik)
+    if(span == 0):
+        return np.ones(len(logLik))
+    return (logLik-np.min(logLik))/span
+#-------------------------------------------------------#
+# Function: getThresholdPruning(...)                    #
+# Desct:    Pruning rule of the IDP sweep. The bounds   #
+#           are normalized over all candidates (pruned  #
+#           ones with their last bound), candidates     #
+#           above the first one reaching the threshold  #
+#           are dropped (range order).                  #
+# Param:    threshold       Normalized bound threshold  #
+# Return:   pruning rule (see pruneLowerHalf)           #
+#-------------------------------------------------------#
+def getThresholdPruning(threshold):
+    def pruneThreshold(logLik, alive, minSurvivors):
+        reached = np.where(normalizeBounds(logLik) > threshold)[0]
+        if(len(reached) == 0):
+            return alive
+        return alive[alive <= max(reached[0], alive[min(minSurvivors, len(alive))-1])]
+    return pruneThreshold
+#-------------------------------------------------------#
+# Function: successiveHalving(...)                      #
+# Desct:    Trains all candidates for a short budget and#
+#           drops the lower half (by bound, or by the   #
+#           given rule). Survivors resume with doubled  #
+#           budget till minSurvivors are left, which are#
+#           trained to the maximum iterations.          #
+# Param:    design          Scaled (or compressed) data #
+#           output_dim      Output dimension of the data#
+#           candidates      List of (input_dim, IDP)    #
+#           iterations      Maximum iterations          #
+#           budget          Iterations of the 1st round #
+#           minSurvivors    Final number of candidates  #
+#           nrWorkers       Parallel processes          #
+#           nrThreads       BLAS threads per worker     #
+#           path_history    Pruning history (*.csv)     #
+#           stochastic      Mini-batch settings (None:  #
+#                           full batch optimization)    #
+#           optimizer       "lbfgsb", "scg" or "adam"   #
+#           prune           Pruning rule (logLik, alive,#
+#                           minSurvivors) -> kept ones  #
+# Return:   [log likelihood (last bound of pruned       #
+#           candidates), survivor mask, params]         #
+#-------------------------------------------------------#
+def successiveHalving(design, output_dim, candidates, iterations=10000, compress=False, budget=250, minSurvivors=2, nrWorkers=1, nrThreads=None, path_history="./halving_history.csv", stochastic=None, optimizer="lbfgsb", prune=pruneLowerHalf):
+    logLik      = np.full(len(candidates), -np.inf)
+    params      = [None]*len(candidates)
+    converged   = np.zeros(len(candidates), dtype=bool)
+    survivors   = np.ones(len(candidates), dtype=bool)
+    spent       = 0         #Iterations per survivor so far
+    history     = []        #round, input_dim, IDP, iterations, log likelihood, survived
+    halvingRound= 0
+    while(True):
+        #--- Last survivors get the remaining iterations ---#
+        final = (np.sum(survivors) <= minSurvivors) or (spent+budget >= iterations)
+        steps = (iterations-spent) if(final) else budget
+        alive = np.where(survivors)[0]
+        tasks = [(looper, output_dim, candidates[looper][0], candidates[looper][1], steps, compress, params[looper], stochastic, optimizer)
+                    for looper in alive if(not converged[looper])]
+        if(nrWorkers > 1):
+            tasks = sorted(tasks, key=lambda task: task[2]*task[3], reverse=True)
+            results = runPool(resumeWorker, tasks, design, nrWorkers, getThreads(nrWorkers, nrThreads))
+        else:
+            results = ((task[0],)+tuple(resumeBGPLVM(design, *task[1:])) for task in tasks)
+        for looper, logLik_looper, params_looper, converged_looper in results:
+            logLik[looper], params[looper], converged[looper] = logLik_looper, params_looper, converged_looper
+        spent = spent+steps
+        #--- Drop the lower half ---#
+        if(not final):
+            survivors[:] = False
+            survivors[prune(logLik, alive, minSurvivors)] = True
+        print("          Halving round %d: %d iterations, %d of %d candidates kept" % (halvingRound, spent, np.sum(survivors), len(alive)))
+        history += [[halvingRound, candidates[looper][0], candidates[looper][1], spent, logLik[looper], survivors[looper]] for looper in alive]
+        if(final):
+            break
+        budget = 2*budget   #Survivors get twice the budget
+        halvingRound = halvingRound+1
+    np.savetxt( path_history, np.array(history, dtype=float),
+                header="round,latentDim,IDP,iterations,loglik,survived",
+                delimiter=',')
+    return [logLik, survivors, params]
 #-------------------------#
 #--- Step 1: PCA elbow ---#
 #-------------------------#
@@ -27,30 +325,44 @@ import GPy                              #GPy python library
 #           a latent dimension.                         #
 # Param:    design_raw      Raw design matrix           #
 #           plotResults     Flag for plot creation      #
+#           design          Scaled design (None: scale  #
+#                           with the stored scaler)     #
+#           mask            Pixel mask used if design is#
+#                           None (None: all pixels)     #
+#           dtype           Type of the scaled design   #
+#           gram            PCA from the [N x N] Gram   #
+#                           matrix (False: sklearn PCA) #
+#           path_svd        Stored Gram matrix and SVD, #
+#                           reused by step 2, step 3 and#
+#                           the compression ("" = none) #
 # Return:   nr_latent dimesions                         #
 #-------------------------------------------------------#
-def step1_PCA(design_raw, explanationTH=0.9, doPlot=True):
+def step1_PCA(design_raw, explanationTH=0.9, doPlot=True, design=None, mask=None, dtype=np.float64, gram=True, path_svd="./step1_PCA_svd.npz"):
     #-------------------------#
     #--- Plot system infos ---#
     #-------------------------#
     print("- Step 1: PCA based latent dimension definition")
     print("          design: [%d x %d]" % (design_raw.shape[0],design_raw.shape[1]))
     print("          Explanation threshold: %f" % (explanationTH*100))
+    print("          Gram matrix PCA: %d" % gram)
     print("          Plot results: %d" % doPlot)
     #------------------------#
     #--- Standartize data ---#
     #------------------------#
-    print("          Standartize data...")
-    scaler = preprocessing.StandardScaler().fit(design_raw)     #Create and train scaler
-    design = scaler.transform(design_raw)                       #Scale data
+    if(design is None):
+        print("          Standartize data...")
+        design = getScaledDesign(design_raw, mask=mask, dtype=dtype)   #Scale data with stored scaler
     #--------------#
     #--- Do PCA ---#
     #--------------#
     print("          Do PCA...")
-    pca_model = PCA()       #Create PCA instance
-    pca_model.fit(design)   #Do PCA
-    explainedVariance = pca_model.explained_variance_ratio_ #Percent of variance explained per component
-    latentDim = np.where(np.cumsum(pca_model.explained_variance_ratio_)>explanationTH)[0][0] #Get first element above expl. TH
+    if(gram):
+        _, _, explainedVariance = getGramPCA(design, path_svd)  #Same spectrum from the [N x N] Gram matrix
+    else:
+        pca_model = PCA()       #Create PCA instance
+        pca_model.fit(design)   #Do PCA
+        explainedVariance = pca_model.explained_variance_ratio_ #Percent of variance explained per component
+    latentDim = np.where(np.cumsum(explainedVariance)>explanationTH)[0][0] #Get first element above expl. TH
     np.savetxt( "./step1_PCA_latentDim.csv", 
                 np.array((explanationTH,latentDim)).reshape((1,2)),
                 header="varTH,latentDim",
@@ -60,7 +372,7 @@ def step1_PCA(design_raw, explanationTH=0.9, doPlot=True):
     #-------------------#
     if(doPlot):
         plt.figure()
-        plt.plot(pca_model.explained_variance_ratio_, 
+        plt.plot(explainedVariance, 
                     linewidth=2.0, 
                     label="Explained Variance")   #Plot explained ratio
         plt.plot([latentDim,latentDim],[0,np.max(explainedVariance)], 
@@ -79,43 +391,72 @@ def step1_PCA(design_raw, explanationTH=0.9, doPlot=True):
 #----------------------------#
 #--- Step 2: IDP analysis ---#
 #----------------------------#
-def step2_bGPLVM_IDP(design_raw, PCAdim, IDPRange, IDP_LL_TH=0.9, iterations= 10000, doPlot=True):
+def step2_bGPLVM_IDP(design_raw, PCAdim, IDPRange, IDP_LL_TH=0.9, iterations= 10000, doPlot=True, design=None, mask=None, compress=False, dtype=np.float64, nrWorkers=1, nrThreads=None, warmStart=False, halving=False, halvingBudget=250, path_checkpoints="", path_svd="./step1_PCA_svd.npz", growth="", stochastic=None, optimizer="lbfgsb"):
     print("- Step 2: Bayes GP-LVM IDP analysis")
     print("          Use PCA dim %d" % PCAdim)
     print("          IDP values to try: %d " % len(IDPRange))
     print("          IDP normalization TH: %f " % IDP_LL_TH)
+    print("          Compressed training: %d" % compress)
+    print("          Workers: %d" % nrWorkers)
+    print("          Warm start: %d" % warmStart)
+    print("          Successive halving: %d" % halving)
+    print("          Checkpoints: %s" % path_checkpoints)
+    print("          Inducing point growth: %s" % growth)
+    print("          Mini-batch size: %d" % getBatchSize(stochastic))
+    print("          Optimizer: %s" % optimizer)
     print("          Plot results: %d" % doPlot)
+    if((warmStart or (growth != "")) and halving):
+        print("          Successive halving resumes each candidate, no warm start or growth")
+        warmStart, growth = False, ""
+    if((warmStart or (growth != "")) and (nrWorkers > 1)):
+        print("          Warm start needs the sequential sweep, use 1 worker")
+        nrWorkers = 1
     #------------------------#
     #--- Standartize data ---#
     #------------------------#
-    print("          Standartize data...")
-    scaler = preprocessing.StandardScaler().fit(design_raw)     #Create and train scaler
-    design = scaler.transform(design_raw)                       #Scale data
+    if(design is None):
+        print("          Standartize data...")
+        design = getScaledDesign(design_raw, mask=mask, dtype=dtype)   #Scale data with stored scaler
+    output_dim = design.shape[1]
+    if(compress):
+        design, _ = compressDesign(design, path_svd=path_svd)   #Same bound on N instead of D outputs
     #---------------------------#
     #--- Do GP-LVM modelling ---#
     #---------------------------#
     logLikMemory = np.zeros(len(IDPRange))  #Memory for estimated marginal log likelihood values
-    looper=0    #Looping variable
-    for idp in IDPRange:
-        print("          Do bgplvm with %d IDP" % idp)
-        #--------------------#
-        #--- Train bGPLVM ---#
-        #--------------------#
-        while(True):
-            model_LVM = GPy.models.BayesianGPLVM(Y              = design,           #Dataset - the original dimension
-                                                input_dim       = PCAdim,           #Latent dimension
-                                                num_inducing    = idp)              #Number of induction points
-            model_return = model_LVM.optimize(messages=False, max_iters   = iterations)  #Do modelling 
-            #--- We do this till convergency ---#
-            if(model_return.status!="Errorb'ABNORMAL_TERMINATION_IN_LNSRCH'"):
-                break
-        #--- We now have a valid model ---#
-        logLikMemory[looper]=model_LVM.log_likelihood()[0,:]    #Get log likelihood
-        looper = looper +1
+    survivors = np.ones(len(IDPRange), dtype=bool)  #Candidates used for the selection
+    if(halving):
+        logLikMemory, survivors, _ = successiveHalving(design, output_dim, [(PCAdim, idp) for idp in IDPRange],
+                                                    iterations, compress, halvingBudget, nrWorkers=nrWorkers, nrThreads=nrThreads,
+                                                    path_history="./step2_bGPLVM_halving.csv", stochastic=stochastic, optimizer=optimizer,
+                                                    prune=getThresholdPruning(IDP_LL_TH))     #Keep the candidates up to the first one above the threshold
+    elif(nrWorkers > 1):
+        #--- Largest IDP first (most expensive) for load balance ---#
+        tasks = [(looper, output_dim, PCAdim, idp, iterations, compress, getCheckpointPath(path_checkpoints, "step2_IDP%d" % idp), stochastic, optimizer) for looper, idp in enumerate(IDPRange)]
+        tasks = sorted(tasks, key=lambda task: task[3], reverse=True)
+        for looper, logLik, _ in runPool(fitWorker, tasks, design, nrWorkers, getThreads(nrWorkers, nrThreads)):
+            print("          Finished bgplvm with %d IDP" % IDPRange[looper])
+            logLikMemory[looper]=logLik
+    else:
+        looper=0    #Looping variable
+        warm=None   #State of the previous model
+        for idp in IDPRange:
+            print("          Do bgplvm with %d IDP" % idp)
+            if((growth != "") and (looper != 0)):
+                warm = getGrowthStart(model_LVM, idp, growth)   #Previous model with added inducing inputs
+            #--------------------#
+            #--- Train bGPLVM ---#
+            #--------------------#
+            model_LVM = fitBGPLVM(design, output_dim, PCAdim, idp, iterations, compress, warm, getCheckpointPath(path_checkpoints, "step2_IDP%d" % idp), stochastic=stochastic, optimizer=optimizer)
+            if(warmStart):
+                warm = getWarmStart(model_LVM)                  #Initializes the next sweep point
+            #--- We now have a valid model ---#
+            logLikMemory[looper]=model_LVM.log_likelihood()[0,0]    #Get log likelihood
+            looper = looper +1
     #-----------------------------#
     #--- Calculate optimal IDP ---#
     #-----------------------------#
-    normalized_LL = (logLikMemory - np.min(logLikMemory))/(np.max(logLikMemory)-np.min(logLikMemory)) #Normalize log L memory
+    normalized_LL = normalizeBounds(logLikMemory)   #Normalize log L memory (pruned candidates: last bound)
     IDP_index = np.where(normalized_LL > IDP_LL_TH)[0][0]
     IDP_chosen=IDPRange[IDP_index]
     print("Chosen IDP %d " % IDP_chosen)
@@ -127,6 +468,8 @@ def step2_bGPLVM_IDP(design_raw, PCAdim, IDPRange, IDP_LL_TH=0.9, iterations= 10
                                     logLikMemory.reshape(1,len(IDPRange)),
                                     normalized_LL.reshape(1,len(IDPRange)))
                                 )
+    if(halving):
+        memory_store = np.concatenate((memory_store, survivors.reshape(1,len(IDPRange))))   #0: pruned (last bound)
     np.savetxt( "./step2_bGPLVM_mLL_memory.csv",    #Store marginal log likelihood memory
                 memory_store,
                 delimiter=',')
@@ -138,6 +481,10 @@ def step2_bGPLVM_IDP(design_raw, PCAdim, IDPRange, IDP_LL_TH=0.9, iterations= 10
         plt.plot(   IDPRange,normalized_LL, 
                     linewidth=2.0,
                     label="Normalized Marginal log. Likelihood")
+        if(not np.all(survivors)):
+            plt.scatter(np.array(IDPRange)[~survivors], normalized_LL[~survivors],
+                        marker='x', c='k',
+                        label="Pruned (last bound)")
         plt.plot([IDP_chosen,IDP_chosen],[0,1], 
                     linewidth=2.0, c='r',
                     label="Chosen Inducing Points")
@@ -156,44 +503,74 @@ def step2_bGPLVM_IDP(design_raw, PCAdim, IDPRange, IDP_LL_TH=0.9, iterations= 10
 #---------------------------------------#
 #--- Step 3: latent Dim optimization ---#
 #---------------------------------------#
-def step3_bGPLVM_latentDim(design_raw, IDP, lDimRange,  iterations= 10000, doPlot=True):
+def step3_bGPLVM_latentDim(design_raw, IDP, lDimRange,  iterations= 10000, doPlot=True, design=None, mask=None, compress=False, dtype=np.float64, nrWorkers=1, nrThreads=None, warmStart=False, halving=False, halvingBudget=250, path_checkpoints="", path_svd="./step1_PCA_svd.npz", path_model="./step3_bGPLVM_model.npz", stochastic=None, optimizer="lbfgsb"):
     print("- Step 3: Bayes GP-LVM latent dimension analysis")
     print("          Use IDP: %d" % IDP)
     print("          Latent Dim values to try: %d " % len(lDimRange))
+    print("          Compressed training: %d" % compress)
+    print("          Workers: %d" % nrWorkers)
+    print("          Warm start: %d" % warmStart)
+    print("          Successive halving: %d" % halving)
+    print("          Checkpoints: %s" % path_checkpoints)
+    print("          Mini-batch size: %d" % getBatchSize(stochastic))
+    print("          Optimizer: %s" % optimizer)
     print("          Plot results: %d" % doPlot)
+    if(warmStart and halving):
+        print("          Successive halving resumes each candidate, no warm start")
+        warmStart = False
+    if(warmStart and (nrWorkers > 1)):
+        print("          Warm start needs the sequential sweep, use 1 worker")
+        nrWorkers = 1
     #------------------------#
     #--- Standartize data ---#
     #------------------------#
-    print("          Standartize data...")
-    scaler = preprocessing.StandardScaler().fit(design_raw)     #Create and train scaler
-    design = scaler.transform(design_raw)                       #Scale dat 
+    if(design is None):
+        print("          Standartize data...")
+        design = getScaledDesign(design_raw, mask=mask, dtype=dtype)   #Scale data with stored scaler
+    output_dim = design.shape[1]
+    if(compress):
+        design, _ = compressDesign(design, path_svd=path_svd)   #Same bound on N instead of D outputs
     #---------------------------#
     #--- Do GP-LVM modelling ---#
     #---------------------------#
     logLikMemory = np.zeros(len(lDimRange))  #Memory for estimated marginal log likelihood values
-    looper=0    #Looping variable
-    for latentDim in lDimRange:
-        print("          Do bgplvm with %d latent Dimesions" % latentDim)
-        #--------------------#
-        #--- Train bGPLVM ---#
-        #--------------------#
-        while(True):
-            model_LVM = GPy.models.BayesianGPLVM(Y              = design,           #Dataset - the original dimension
-                                                input_dim       = latentDim,        #Latent dimension
-                                                num_inducing    = IDP)              #Number of induction points
-            model_return = model_LVM.optimize(messages=False, max_iters   = iterations)  #Do modelling 
-            #--- We do this till convergency ---#
-            if(model_return.status!="Errorb'ABNORMAL_TERMINATION_IN_LNSRCH'"):
-                break
-        #--- We now have a valid model ---#
-        logLikMemory[looper]=model_LVM.log_likelihood()[0,:]    #Get log likelihood
-        looper = looper +1
+    survivors = np.ones(len(lDimRange), dtype=bool)  #Candidates used for the selection
+    params = [None]*len(lDimRange)          #param_array of each candidate
+    if(halving):
+        logLikMemory, survivors, params = successiveHalving(design, output_dim, [(latentDim, IDP) for latentDim in lDimRange],
+                                                    iterations, compress, halvingBudget, nrWorkers=nrWorkers, nrThreads=nrThreads,
+                                                    path_history="./step3_bGPLVM_halving.csv", stochastic=stochastic, optimizer=optimizer)
+    elif(nrWorkers > 1):
+        #--- Largest latent dimension first (most expensive) for load balance ---#
+        tasks = [(looper, output_dim, latentDim, IDP, iterations, compress, getCheckpointPath(path_checkpoints, "step3_lDim%d" % latentDim), stochastic, optimizer) for looper, latentDim in enumerate(lDimRange)]
+        tasks = sorted(tasks, key=lambda task: task[2], reverse=True)
+        for looper, logLik, params[looper] in runPool(fitWorker, tasks, design, nrWorkers, getThreads(nrWorkers, nrThreads)):
+            print("          Finished bgplvm with %d latent Dimesions" % lDimRange[looper])
+            logLikMemory[looper]=logLik     #Stored in range order
+    else:
+        looper=0    #Looping variable
+        warm=None   #State of the previous model
+        for latentDim in lDimRange:
+            print("          Do bgplvm with %d latent Dimesions" % latentDim)
+            #--------------------#
+            #--- Train bGPLVM ---#
+            #--------------------#
+            model_LVM = fitBGPLVM(design, output_dim, latentDim, IDP, iterations, compress, warm, getCheckpointPath(path_checkpoints, "step3_lDim%d" % latentDim), stochastic=stochastic, optimizer=optimizer)
+            if(warmStart):
+                warm = getWarmStart(model_LVM)                  #Initializes the next sweep point
+            #--- We now have a valid model ---#
+            logLikMemory[looper]=model_LVM.log_likelihood()[0,0]    #Get log likelihood
+            params[looper]=model_LVM.param_array.copy()
+            looper = looper +1
     #-------------------------#
     #--- Get optimal model ---#
     #-------------------------#
-    index_optimal_model = np.argmax(logLikMemory)
+    index_optimal_model = np.argmax(np.where(survivors, logLikMemory, -np.inf))  #First maximum of the survivors in range order (independent of completion order)
     optimal_model_dimension = int(lDimRange[index_optimal_model])
     print("Maximum model marginal log. likelihood found at %d" % optimal_model_dimension)
+    if(path_model != ""):   #Reused as final model by getGPLVM.py
+        model_LVM = restoreBGPLVM(design, output_dim, optimal_model_dimension, IDP, compress, params[index_optimal_model])
+        saveCheckpoint(path_model, getCheckpointKey(design, optimal_model_dimension, IDP, iterations, compress, getBatchSize(stochastic), optimizer), model_LVM, status_selected, 0.0, 0)
     #---------------------#
     #--- Store results ---#
     #---------------------##
@@ -0,0 +1,239 @@
+# The checkpoint.py script implements checkpoints of the GP-LVM
+# optimizations. The state of a model (param_array, log likelihood,
+# optimizer status, wall time, function evaluations and iterations) is
+# stored as *.npz file after each fit and periodically while the
+# optimizer runs. Files are written to a temporary file and renamed,
+# thus a killed process leaves the last complete checkpoint. A key of
+# the design and the model settings is stored with the state;
+# checkpoints of other data or settings are ignored. Iterations are
+# the optimizer iterations (scipy nit of L-BFGS-B, SCG steps), a resumed
+# fit continues with the remaining iterations (GPy limits the function
+# evaluations by the same number). Mini-batch trainings are
+# checkpointed the same way (evaluations and iterations are the
+# mini-batch steps). The optimizer of the full batch fits is selectable
+# (L-BFGS-B, SCG); "adam" selects the mini-batch training. SCG
+# evaluations are routed through the combined objective and gradient
+# function, which is wrapped by the checkpoints.
+#
+# This code is available under a GPL v3.0 license and comes without
+# any explicit or implicit warranty.
+#
+# (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
+import os                               #File handling
+import time                             #Wall time
+import numpy as np                      #You should know that
+from scipy.optimize import fmin_l_bfgs_b    #L-BFGS-B with iteration callback
+from paramz.optimization.optimization import opt_lbfgsb    #GPy optimizer interface
+from designScaler import getDesignKey   #Design fingerprint
+from stochasticGPLVM import optimizeStochastic, getStochasticSettings   #Mini-batch training
+checkpoint_interval = 600               #Seconds between checkpoints of a running optimization
+status_running = "Running"              #Status of periodic checkpoints
+optimizers = ("lbfgsb", "scg", "adam")  #L-BFGS-B, scaled conjugate gradient (GPy), Adam (mini-batch)
+#---------------------------------------#
+#--- L-BFGS-B with iteration count ---#
+#---------------------------------------#
+class LBFGSBCounted(opt_lbfgsb):
+    #---------------------------------------------------#
+    # Name: Constructor                                 #
+    # Descr: L-BFGS-B of GPy, which counts the          #
+    #       iterations (nit) while it runs.             #
+    # Param: state          dict, "iterations" is       #
+    #                       increased each iteration    #
+    #        max_iters      Maximum iterations          #
+    # Return: -                                         #
+    #---------------------------------------------------#
+    def __init__(self, state, max_iters):
+        opt_lbfgsb.__init__(self, max_iters=max_iters)
+        self.state  = state
+        self.nit    = 0
+    #---------------------------------------------------#
+    # Name: opt                                         #
+    # Descr: Runs L-BFGS-B (see paramz opt_lbfgsb).     #
+    # Param: x_init         Initial parameters          #
+    #        f_fp           Objective and gradient      #
+    # Return: -                                         #
+    #---------------------------------------------------#
+    def opt(self, x_init, f_fp=None, f=None, fp=None):
+        rcstrings = ['Converged', 'Maximum number of f evaluations reached', 'Error']
+        opt_dict = {}
+        if(self.gtol is not None):
+            opt_dict['pgtol'] = self.gtol
+        if(self.bfgs_factor is not None):
+            opt_dict['factr'] = self.bfgs_factor
+        def iteration(x):
+            self.state["iterations"] += 1
+        x_opt, f_opt, info = fmin_l_bfgs_b(f_fp, x_init, maxfun=self.max_iters, maxiter=self.max_iters, callback=iteration, **opt_dict)
+        self.x_opt      = x_opt
+        self.f_opt      = f_fp(self.x_opt)[0]
+        self.funct_eval = info['funcalls']
+        self.nit        = info['nit']
+        self.status     = rcstrings[info['warnflag']]
+        if(info['warnflag'] == 2):
+            self.status = 'Error'+str(info['task'])
+#-------------------------------------------------------#
+# Function: getCheckpointKey(...)                       #
+# Desct:    Creates the key of a model checkpoint.      #
+# Param:    design          Training data               #
+#           input_dim       Latent dimension            #
+#           num_inducing    Number of inducing points   #
+#           iterations      Maximum iterations          #
+#           compress        design is compressed        #
+#           batchSize       Mini-batch size (0: full    #
+#                           batch optimization)         #
+#           optimizer       Optimizer (see optimizers)  #
+# Return:   key string                                  #
+#-------------------------------------------------------#
+def getCheckpointKey(design, input_dim, num_inducing, iterations, compress=False, batchSize=0, optimizer="lbfgsb"):
+    key = "%s_q%d_m%d_it%d_c%d" % (getDesignKey(design), input_dim, num_inducing, iterations, compress)
+    if(batchSize != 0):
+        key = key+"_b%d" % batchSize
+    if(optimizer != "lbfgsb"):
+        key = key+"_%s" % optimizer
+    return key
+#-------------------------------------------------------#
+# Function: getCheckpointPath(...)                      #
+# Desct:    Returns the checkpoint file of a fit.       #
+# Param:    path_checkpoints Checkpoint folder          #
+#                           ("" = no checkpoints)       #
+#           name            Name of the fit             #
+# Return:   path ("" = no checkpoints)                  #
+#-------------------------------------------------------#
+def getCheckpointPath(path_checkpoints, name):
+    if(path_checkpoints == ""):
+        return ""
+    return os.path.join(path_checkpoints, name+".npz")
+#-------------------------------------------------------#
+# Function: saveCheckpoint(...)                         #
+# Desct:    Stores a model state atomically.            #
+# Param:    path_checkpoint Path to the *.npz file      #
+#           key             Checkpoint key              #
+#           model           GPy model                   #
+#           status          Optimizer status            #
+#           wallTime        Optimization time [s]       #
+#           evaluations     Function evaluations        #
+#           iterations      Optimizer iterations        #
+#                           (None: evaluations)         #
+# Return:   -                                           #
+#-------------------------------------------------------#
+def saveCheckpoint(path_checkpoint, key, model, status, wallTime, evaluations, iterations=None):
+    folder = os.path.dirname(path_checkpoint)
+    if((folder != "") and (not os.path.isdir(folder))):
+        os.makedirs(folder)
+    path_tmp = path_checkpoint+".tmp.npz"
+    np.savez(path_tmp,
+             params=model.param_array, loglik=float(np.ravel(model.log_likelihood())[0]),
+             status=np.array(status), wallTime=wallTime, evaluations=evaluations,
+             iterations=evaluations if(iterations is None) else iterations, key=np.array(key))
+    os.replace(path_tmp, path_checkpoint)
+#-------------------------------------------------------#
+# Function: loadCheckpoint(...)                         #
+# Desct:    Restores a model state.                     #
+# Param:    path_checkpoint Path to the *.npz file      #
+#           key             Expected checkpoint key     #
+# Return:   dict or None if missing/not matching        #
+#-------------------------------------------------------#
+def loadCheckpoint(path_checkpoint, key):
+    if((path_checkpoint == "") or (not os.path.isfile(path_checkpoint))):
+        return None
+    data = np.load(path_checkpoint)
+    if(str(data['key']) != key):
+        return None
+    return {"params":       data['params'],
+            "loglik":       float(data['loglik']),
+            "status":       str(data['status']),
+            "wallTime":     float(data['wallTime']),
+            "evaluations":  int(data['evaluations']),
+            "iterations":   int(data['iterations'] if('iterations' in data) else data['evaluations'])}
+#-------------------------------------------------------#
+# Function: optimizeModel(...)                          #
+# Desct:    Runs a GPy optimizer. SCG evaluates the     #
+#           objective and the gradient separately, both #
+#           are taken from _objective_grads (thus its   #
+#           wrappers see all evaluations). The returned #
+#           run has the iteration count nit.            #
+# Param:    model           GPy model                   #
+#           iterations      Maximum iterations          #
+#           optimizer       "lbfgsb" or "scg"           #
+#           state           dict, "iterations" counts   #
+#                           the iterations while the    #
+#                           optimizer runs (or None)    #
+# Return:   optimizer run                               #
+#-------------------------------------------------------#
+def optimizeModel(model, iterations, optimizer="lbfgsb", state=None):
+    if(state is None):
+        state = {"iterations": 0}
+    if(optimizer == "lbfgsb"):
+        return model.optimize(optimizer=LBFGSBCounted(state, iterations), messages=False, max_iters = iterations)
+    start = state["iterations"]
+    state["iterations"] -= 1                    #The initial objective value is no step
+    def objective(x):
+        state["iterations"] += 1                #One objective value per SCG step
+        return model._objective_grads(x)[0]
+    model._objective = objective
+    model._grads     = lambda x: model._objective_grads(x)[1]
+    try:
+        model_return = model.optimize(optimizer=optimizer, messages=False, max_iters = iterations)
+    finally:
+        del model._objective, model._grads     #Restore the class methods
+    state["iterations"] = start+len(model_return.trace)-1
+    model_return.nit = len(model_return.trace)-1    #Objective values of the steps (without the initial one)
+    return model_return
+#-------------------------------------------------------#
+# Function: optimizeCheckpointed(...)                   #
+# Desct:    Optimizes a model and stores checkpoints    #
+#           periodically and after the optimization.    #
+# Param:    model           GPy model                   #
+#           iterations      Maximum iterations          #
+#           path_checkpoint Path to the *.npz file      #
+#                           ("" = no checkpoints)       #
+#           key             Checkpoint key              #
+#           checkpoint      Resumed checkpoint (or None)#
+#           interval        Seconds between checkpoints #
+#           stochastic      Mini-batch settings (None:  #
+#                           full batch optimization)    #
+#           optimizer       Optimizer (see optimizers), #
+#                           "adam" with stochastic None #
+#                           uses the default settings   #
+# Return:   optimizer run                               #
+#-------------------------------------------------------#
+def optimizeCheckpointed(model, iterations, path_checkpoint="", key="", checkpoint=None, interval=checkpoint_interval, stochastic=None, optimizer="lbfgsb"):
+    if(optimizer not in optimizers):
+        raise Exception("optimizeCheckpointed: unknown optimizer %s" % optimizer)
+    if((optimizer == "adam") and (stochastic is None)):
+        stochastic = getStochasticSettings()
+    if((path_checkpoint == "") and (stochastic is not None)):
+        return optimizeStochastic(model, iterations, stochastic)
+    if(path_checkpoint == ""):
+        return optimizeModel(model, iterations, optimizer)
+    wallTime    = checkpoint["wallTime"] if(checkpoint is not None) else 0.0
+    evaluations = checkpoint["evaluations"] if(checkpoint is not None) else 0
+    nit         = checkpoint["iterations"] if(checkpoint is not None) else 0
+    if(stochastic is not None):
+        #--- Mini-batch steps continue the step count (rate schedule) ---#
+        def saveRunning(model, steps, seconds):
+            saveCheckpoint(path_checkpoint, key, model, status_running, wallTime+seconds, steps)
+        model_return = optimizeStochastic(model, iterations, stochastic, evaluations, saveRunning, interval)
+        saveCheckpoint(path_checkpoint, key, model, model_return.status, wallTime+model_return.time, model_return.funct_eval)
+        return model_return
+    start       = time.time()
+    state       = {"evaluations": 0, "iterations": 0, "saved": start}
+    wrapped     = "_objective_grads" in model.__dict__     #Objective of an outer wrapper (telemetry)
+    objective   = model._objective_grads
+    #--- Store the state every interval seconds ---#
+    def objectiveCheckpointed(x):
+        result = objective(x)
+        state["evaluations"] += 1
+        if(time.time()-state["saved"] > interval):
+            saveCheckpoint(path_checkpoint, key, model, status_running, wallTime+time.time()-start, evaluations+state["evaluations"], nit+state["iterations"])
+            state["saved"] = time.time()
+        return result
+    model._objective_grads = objectiveCheckpointed
+    try:
+        model_return = optimizeModel(model, max(1, iterations-nit), optimizer, state)   #Remaining iterations
+    finally:
+        if(wrapped):
+            model._objective_grads = objective
+        else:
+            del model._objective_grads  #Restore the class method
+    saveCheckpoint(path_checkpoint, key, model, model_return.status, wallTime+time.time()-start, evaluations+state["evaluations"], nit+model_return.nit)
+    return model_return
@@ -0,0 +1,175 @@
+# The compressedGPLVM.py script implements the row-space compression of
+# the scaled design for the Bayesian GP-LVM. The variational bound uses
+# the data only through YY^T and psi1^T Y. Thus, the [N x D] design can
+# be replaced by its projection Y_c = U S onto the (at most N) right
+# singular directions, where YY^T = Y_c Y_c^T. The remaining D-r output
+# dimensions behave like all-zero columns. The CompressedVarDTC inference
+# adds their contribution analytically, thus the bound and its gradients
+# are the ones of the uncompressed model, while each iteration costs
+# O(N r) instead of O(N D) in the outputs. Predictive means are mapped
+# back to pixel space using V^T.
+#
+# This code is available under a GPL v3.0 license and comes without
+# any explicit or implicit warranty.
+#
+# (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
+import numpy as np                      #You should know that
+import GPy                              #GPy python library
+from GPy.inference.latent_function_inference.var_dtc import VarDTC
+from GPy.inference.latent_function_inference.inferenceX import InferenceX
+from GPy.util.linalg import tdot
+from gramPCA import getGram, getGramSVD, chunk_cols     #Gram matrix of the design
+#-------------------------------------------------------#
+# Function: compressDesign(...)                         #
+# Desct:    Projects the design onto its row space using#
+#           the [N x N] Gram matrix.                    #
+# Param:    design          Scaled design [N x D]       #
+#           tol             Relative eigenvalue limit   #
+#           dtype           Type of V^T (pixel space)   #
+#           path_svd        Stored Gram matrix of step 1#
+#                           ("" = compute), recomputed  #
+#                           if U^T Y does not reproduce #
+#                           S (unit rows of V^T)        #
+# Return:   [Y_c [N x r], V^T [r x D]]                  #
+#-------------------------------------------------------#
+def compressDesign(design, tol=1e-10, chunkCols=chunk_cols, dtype=np.float64, path_svd=""):
+    N, D = design.shape
+    U, S = getGramSVD(getGram(design, path_svd, chunkCols))
+    rank = int(np.sum(S**2 > tol*S[0]**2))
+    S = S[:rank]
+    U = U[:,:rank]
+    Vt = np.zeros((rank,D), dtype=dtype)
+    norms = np.zeros(rank)                              #Squared row norms of V^T (1 if G matches the design)
+    for start in range(0, D, chunkCols):                #V^T = S^-1 U^T Y
+        chunk = np.asarray(design[:,start:(start+chunkCols)], dtype=np.float64)
+        Vt_chunk = U.T.dot(chunk)/S[:,None]
+        norms += np.sum(Vt_chunk**2, axis=1)
+        Vt[:,start:(start+chunkCols)] = Vt_chunk
+    if((path_svd != "") and (np.max(np.abs(norms-1)) > 1e-6)):
+        print("          Stored Gram matrix %s does not match the design, recompute" % path_svd)
+        return compressDesign(design, tol, chunkCols, dtype, path_svd="")
+    print("          Compressed design: [%d x %d] -> [%d x %d]" % (N, D, N, rank))
+    return [U*S, Vt]
+#-------------------------------------------------------#
+# Function: expandMean(...)                             #
+# Desct:    Maps compressed predictions to pixel space. #
+# Param:    mean_c          [... x r] compressed mean   #
+#           Vt              [r x D] row space basis     #
+# Return:   [... x D] mean                              #
+#-------------------------------------------------------#
+def expandMean(mean_c, Vt):
+    return np.dot(np.asarray(mean_c, dtype=Vt.dtype), Vt)
+#-----------------------------------#
+#--- Compressed VarDTC inference ---#
+#-----------------------------------#
+class CompressedVarDTC(VarDTC):
+    #---------------------------------------------------#
+    # Name: Constructor                                 #
+    # Descr: Inits the inference for compressed data.   #
+    # Param: output_dim     Uncompressed output dim. D  #
+    # Return: -                                         #
+    #---------------------------------------------------#
+    def __init__(self, output_dim, limit=3):
+        super(CompressedVarDTC, self).__init__(limit)
+        self.output_dim = output_dim
+    def __getstate__(self):
+        return (self.limit, self.output_dim)
+    def __setstate__(self, state):
+        super(CompressedVarDTC, self).__setstate__(state[0])
+        self.output_dim = state[1]
+    #---------------------------------------------------#
+    # Name: inference(...)                              #
+    # Descr: Bound of the uncompressed data. The bound  #
+    #       of Y_c is corrected by D-r zero columns.    #
+    # Return: posterior (compressed), log marginal, grad#
+    #---------------------------------------------------#
+    def inference(self, kern, X, Z, likelihood, Y, Y_metadata=None, mean_function=None, **kwargs):
+        nrZero = self.output_dim - Y.shape[1]               #Number of missing (zero) columns
+        if(nrZero < 0):
+            raise Exception("CompressedVarDTC: data has more than %d columns" % self.output_dim)
+        kwargs['psi0'] = kern.psi0(Z, X)                    #psi statistics are shared by both bounds
+        kwargs['psi1'] = kern.psi1(Z, X)
+        kwargs['psi2'] = kern.psi2(Z, X)
+        post, log_marginal, grad_dict = super(CompressedVarDTC, self).inference(kern, X, Z, likelihood, Y, Y_metadata, mean_function, **kwargs)
+        if(nrZero == 0):
+            return post, log_marginal, grad_dict
+        _, log_zero, grad_zero = super(CompressedVarDTC, self).inference(kern, X, Z, likelihood, np.zeros((Y.shape[0],1)), Y_metadata, mean_function, **kwargs)
+        log_marginal = log_marginal + nrZero*log_zero
+        for key in grad_dict:
+            if(grad_dict[key] is not None):
+                grad_dict[key] = grad_dict[key] + nrZero*grad_zero[key]
+        return post, log_marginal, grad_dict
+#-----------------------------------#
+#--- Compressed latent inference ---#
+#-----------------------------------#
+class CompressedInferenceX(InferenceX):
+    #---------------------------------------------------#
+    # Name: Constructor                                 #
+    # Descr: Inits the latent inference of compressed   #
+    #       data (see GPy infer_newX).                  #
+    # Param: model          Compressed BGPLVM model     #
+    #        Y              Compressed data [n x r]     #
+    #        output_dim     Uncompressed output dim. D  #
+    # Return: -                                         #
+    #---------------------------------------------------#
+    def __init__(self, model, Y, output_dim, name='inferenceX', init='L2'):
+        self.output_dim = output_dim        #Needed by compute_dL() in the constructor
+        super(CompressedInferenceX, self).__init__(model, Y, name=name, init=init)
+    def compute_dL(self):
+        beta = 1./np.fmax(self.likelihood.variance, 1e-6)
+        wv = self.posterior.woodbury_vector
+        self.dL_dpsi2 = beta*(self.output_dim*self.posterior.woodbury_inv - tdot(wv))/2.
+        self.dL_dpsi1 = beta*np.dot(self.Y, wv.T)
+        self.dL_dpsi0 = -beta/2.*self.output_dim*np.ones(self.Y.shape[0])
+#-------------------------------------------------------#
+# Function: inferCompressedX(...)                       #
+# Desct:    Infers the latent distribution of compressed#
+#           data, equal to infer_newX of the full model.#
+# Param:    model           Compressed BGPLVM model     #
+#           Y_new           Compressed data [n x r]     #
+#           output_dim      Uncompressed output dim. D  #
+# Return:   [latent posterior, inference model]         #
+#-------------------------------------------------------#
+def inferCompressedX(model, Y_new, output_dim, optimize=True):
+    infr_m = CompressedInferenceX(model, Y_new, output_dim)
+    if(optimize):
+        infr_m.optimize()
+    return [infr_m.X, infr_m]
+#-------------------------------------------------------#
+# Function: getLatentInit(...)                          #
+# Desct:    PCA initialization of the latent space (as  #
+#           GPy does for the uncompressed data).        #
+# Param:    Y_c             Compressed design           #
+#           input_dim       Latent dimension            #
+# Return:   [X init, ARD lengthscale init]              #
+#-------------------------------------------------------#
+def getLatentInit(Y_c, input_dim):
+    X = np.asfortranarray(np.random.normal(0, 1, (Y_c.shape[0], input_dim)))
+    q = min(input_dim, Y_c.shape[1])
+    X[:,:q] = Y_c[:,:q]                                 #Y V_q = U_q S_q
+    X -= X.mean(0)
+    X /= X.std(0)
+    eigvals = np.sum(Y_c**2, axis=0)
+    fracs = np.full(input_dim, eigvals[q-1])            #Unused directions get the smallest value
+    fracs[:q] = eigvals[:q]
+    return [X, fracs.max()/fracs]
+#-------------------------------------------------------#
+# Function: getCompressedBGPLVM(...)                    #
+# Desct:    Creates a Bayesian GP-LVM on compressed data#
+#           with the bound of the uncompressed data. The#
+#           parameters have the layout of the full model#
+# Param:    Y_c             Compressed design           #
+#           output_dim      Uncompressed output dim. D  #
+#           input_dim       Latent dimension            #
+#           num_inducing    Number of inducing points   #
+# Return:   BayesianGPLVM model                         #
+#-------------------------------------------------------#
+def getCompressedBGPLVM(Y_c, output_dim, input_dim, num_inducing, **kwargs):
+    X, lengthscale = getLatentInit(Y_c, input_dim)
+    return GPy.models.BayesianGPLVM(Y                   = Y_c,
+                                    input_dim           = input_dim,
+                                    X                   = X,
+                                    num_inducing        = num_inducing,
+                                    kernel              = GPy.kern.RBF(input_dim, lengthscale=lengthscale, ARD=True),
+                                    inference_method    = CompressedVarDTC(output_dim),
+                                    **kwargs)
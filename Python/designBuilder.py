@@ -0,0 +1,143 @@
+# The designBuilder.py script creates the GP-LVM design matrix from
+# the specimen images. The images are decoded, converted to grayscale
+# and resized in worker processes. Each worker writes its flattened
+# image directly into a preallocated memory mapped *.npy design file.
+# The rows follow the order of the target ID file, which keeps the
+# design aligned with targetID.csv and labels.csv. A manifest stores
+# size, modification time and hash of each source image, thus only
+# rows of changed images are rebuilt.
+#
+# This code is available under a GPL v3.0 license and comes without
+# any explicit or implicit warranty.
+#
+# (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
+import os                               #File handling
+import multiprocessing                  #Parallel image processing
+import numpy as np                      #You should know that
+import cv2                              #Image handling
+from designIO import hashFile           #Source image hashing
+#-------------------------------------------------------#
+# Function: loadImage(...)                              #
+# Desct:    Loads an image as flattened grayscale vector#
+# Param:    path            Path to the image           #
+#           imgDim          Image dimension (rows, cols)#
+# Return:   flattened image                             #
+#-------------------------------------------------------#
+def loadImage(path, imgDim=(224,224)):
+    img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)            #Decode and convert to grayscale
+    if(img is None):
+        raise Exception("designBuilder: cannot read image %s" % path)
+    if(img.shape != tuple(imgDim)):
+        img = cv2.resize(img, (imgDim[1], imgDim[0]), interpolation=cv2.INTER_AREA)
+    return img.reshape((-1,))
+#-------------------------------------------------------#
+# Function: readManifest(...)                           #
+# Desct:    Reads the manifest of a design file.        #
+# Param:    path_manifest   Path to the manifest        #
+# Return:   list of [ID, size, mtime, hash] per row     #
+#-------------------------------------------------------#
+def readManifest(path_manifest):
+    if(not os.path.isfile(path_manifest)):
+        return []
+    with open(path_manifest, 'r') as fid:
+        rows = [line.strip().split(',') for line in fid if line.strip() != ""]
+    return [[row[0], int(row[1]), int(row[2]), row[3]] for row in rows]
+#-------------------------------------------------------#
+# Function: writeManifest(...)                          #
+# Desct:    Writes the manifest of a design atomically. #
+# Param:    path_manifest   Path to the manifest        #
+#           manifest        list of [ID,size,mtime,hash]#
+# Return:   -                                           #
+#-------------------------------------------------------#
+def writeManifest(path_manifest, manifest):
+    with open(path_manifest+".tmp", 'w') as fid:
+        for row in manifest:
+            fid.write("%s,%d,%d,%s\n" % (row[0], row[1], row[2], row[3]))
+    os.replace(path_manifest+".tmp", path_manifest)
+#-------------------------------------------------------#
+# Function: buildRow(...)                               #
+# Desct:    Worker function. Loads one image and writes #
+#           it into its row of the design file.         #
+# Param:    task            (row, path_image,           #
+#                           path_design, imgDim)        #
+# Return:   (row, size, mtime, hash)                    #
+#-------------------------------------------------------#
+def buildRow(task):
+    row, path_image, path_design, imgDim = task
+    stat = os.stat(path_image)
+    design = np.load(path_design, mmap_mode='r+')           #Attach to the design file
+    design[row,:] = loadImage(path_image, imgDim)
+    design.flush()
+    del design
+    return row, stat.st_size, stat.st_mtime_ns, hashFile(path_image)
+#-------------------------------------------------------#
+# Function: buildDesign(...)                            #
+# Desct:    Creates or updates the design file from the #
+#           images in target ID order.                  #
+# Param:    path_images     Image folder                #
+#           path_targetID   Target ID file (one ID/row) #
+#           path_design     Design file (*.npy)         #
+#           imgDim          Image dimension (rows, cols)#
+#           nrWorkers       Number of processes         #
+#           dtype           Design data type            #
+# Return:   number of rebuilt rows                      #
+#-------------------------------------------------------#
+def buildDesign(path_images, path_targetID, path_design, imgDim=(224,224), nrWorkers=None, dtype=np.float64):
+    IDs = np.genfromtxt(path_targetID, dtype=str).reshape((-1,))
+    shape = (IDs.shape[0], int(np.prod(imgDim)))
+    path_manifest = path_design+".manifest.csv"
+    print("designBuilder: %d images, design [%d x %d]" % (shape[0], shape[0], shape[1]))
+    #------------------------------------------#
+    #--- Check existing design and manifest ---#
+    #------------------------------------------#
+    manifest = readManifest(path_manifest)
+    design_ok = False
+    if(os.path.isfile(path_design)):
+        design = np.load(path_design, mmap_mode='r')
+        design_ok = (design.shape == shape) and (design.dtype == np.dtype(dtype))
+        del design
+    if(not design_ok):
+        np.lib.format.open_memmap(path_design, mode='w+', dtype=dtype, shape=shape).flush()    #Preallocate design file
+        manifest = []
+    old_rows = dict([(row[0], (i, row)) for i, row in enumerate(manifest)])
+    #---------------------------------#
+    #--- Find rows to be (re)built ---#
+    #---------------------------------#
+    new_manifest = [None]*shape[0]
+    tasks = []
+    for row, ID in enumerate(IDs):
+        path_image = os.path.join(path_images, ID+".jpg")
+        stat = os.stat(path_image)
+        if(ID in old_rows):
+            old_index, entry = old_rows[ID]
+            if((old_index == row) and (entry[1] == stat.st_size)):
+                if(entry[2] == stat.st_mtime_ns):
+                    new_manifest[row] = entry               #Unchanged image
+                    continue
+                if(entry[3] == hashFile(path_image)):       #Image was touched only
+                    new_manifest[row] = [ID, stat.st_size, stat.st_mtime_ns, entry[3]]
+                    continue
+        tasks.append((row, path_image, path_design, imgDim))
+    print("designBuilder: rebuild %d rows" % len(tasks))
+    #----------------------#
+    #--- Build the rows ---#
+    #----------------------#
+    if(len(tasks) != 0):
+        if(nrWorkers is None):
+            nrWorkers = multiprocessing.cpu_count()
+        nrWorkers = max(1,min(nrWorkers, len(tasks)))
+        if(nrWorkers > 1):
+            pool = multiprocessing.Pool(nrWorkers)
+            results = pool.imap_unordered(buildRow, tasks, chunksize=max(1,len(tasks)//(4*nrWorkers)))
+        else:
+            pool = None
+            results = map(buildRow, tasks)
+        try:
+            for row, size, mtime, sha in results:
+                new_manifest[row] = [IDs[row], size, mtime, sha]
+        finally:
+            if(pool is not None):
+                pool.close()
+                pool.join()
+    writeManifest(path_manifest, new_manifest)
+    return len(tasks)
@@ -0,0 +1,264 @@
+# The designIO.py script implements the loading of the (large) design
+# matrices used in this project. Parsing the flattened image CSV
+# files takes most of the startup time of the GP-LVM scripts. Thus,
+# the parsed matrix is stored as a binary *.npy sidecar next to the
+# CSV file. The sidecar is keyed by the size, modification time and
+# hash of the CSV file and is opened memory mapped on later loads.
+# CSV files are parsed in parallel: the file is split into byte
+# ranges at line breaks and each range is parsed in a worker process.
+# The rows are written into a preallocated (memory mapped) array, so
+# memory is bounded by the number of chunks in flight.
+#
+# This code is available under a GPL v3.0 license and comes without
+# any explicit or implicit warranty.
+#
+# (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
+import os                               #File handling
+import io                               #Parse byte ranges
+import hashlib                          #CSV file hashing
+import multiprocessing                  #Parallel parsing
+import numpy as np                      #You should know that
+chunk_bytes = 64<<20                    #Default byte range per worker task
+#-------------------------#
+#--- Cache key helpers ---#
+#-------------------------#
+#-------------------------------------------------------#
+# Function: hashFile(...)                               #
+# Desct:    Estimates the sha1 hash of a file blockwise.#
+# Param:    path            Path to the file            #
+# Return:   hex digest                                  #
+#-------------------------------------------------------#
+def hashFile(path, blockSize=1<<20):
+    sha = hashlib.sha1()
+    with open(path, 'rb') as fid:
+        while(True):
+            block = fid.read(blockSize)
+            if(len(block) == 0):
+                break
+            sha.update(block)
+    return sha.hexdigest()
+#-------------------------------------------------------#
+# Function: readCacheKey(...)                           #
+# Desct:    Reads the key file of a sidecar.            #
+# Param:    path_key        Path to the key file        #
+# Return:   [size, mtime, hash] or None                 #
+#-------------------------------------------------------#
+def readCacheKey(path_key):
+    if(not os.path.isfile(path_key)):
+        return None
+    with open(path_key, 'r') as fid:
+        key = fid.read().strip().split(',')
+    if(len(key) != 3):
+        return None
+    return [int(key[0]), int(key[1]), key[2]]
+#-------------------------------------------------------#
+# Function: writeCacheKey(...)                          #
+# Desct:    Writes the key file of a sidecar atomically.#
+# Param:    path_key        Path to the key file        #
+#           key             [size, mtime, hash]         #
+# Return:   -                                           #
+#-------------------------------------------------------#
+def writeCacheKey(path_key, key):
+    with open(path_key+".tmp", 'w') as fid:
+        fid.write("%d,%d,%s\n" % (key[0], key[1], key[2]))
+    os.replace(path_key+".tmp", path_key)
+#-------------------------------------------------------#
+# Function: getSidecarPath(...)                         #
+# Desct:    Returns the path of the binary sidecar of a #
+#           CSV file for a given data type.             #
+# Param:    path            Path to the CSV file        #
+#           dtype           Data type of the sidecar    #
+# Return:   sidecar path                                #
+#-------------------------------------------------------#
+def getSidecarPath(path, dtype=np.float64):
+    if(np.dtype(dtype) == np.float64):
+        return path+".npy"
+    return path+"."+np.dtype(dtype).name+".npy"
+#----------------------------#
+#--- Parallel CSV parsing ---#
+#----------------------------#
+#-------------------------------------------------------#
+# Function: getByteRanges(...)                          #
+# Desct:    Splits a file into byte ranges, which start #
+#           and end at line breaks.                     #
+# Param:    path            Path to the CSV file        #
+#           chunkBytes      Approx. bytes per range     #
+# Return:   list of (start, end) tuples                 #
+#-------------------------------------------------------#
+def getByteRanges(path, chunkBytes=chunk_bytes):
+    size = os.path.getsize(path)
+    ranges = []
+    start = 0
+    with open(path, 'rb') as fid:
+        while(start < size):
+            end = start + chunkBytes
+            if(end >= size):
+                end = size
+            else:
+                fid.seek(end)
+                fid.readline()          #Move to the end of the current line
+                end = fid.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+#-------------------------------------------------------#
+# Function: readByteRange(...)                          #
+# Desct:    Reads the non empty lines of a byte range.  #
+# Param:    path            Path to the CSV file        #
+#           byteRange       (start, end) tuple          #
+# Return:   list of lines                               #
+#-------------------------------------------------------#
+def readByteRange(path, byteRange):
+    with open(path, 'rb') as fid:
+        fid.seek(byteRange[0])
+        block = fid.read(byteRange[1]-byteRange[0])
+    return [line for line in block.split(b'\n') if line.strip() != b'']
+#-------------------------------------------------------#
+# Function: countRows(...)                              #
+# Desct:    Worker function, counts rows of a range.    #
+# Param:    task            (path, byteRange)           #
+# Return:   number of rows                              #
+#-------------------------------------------------------#
+def countRows(task):
+    return len(readByteRange(task[0], task[1]))
+#-------------------------------------------------------#
+# Function: parseRows(...)                              #
+# Desct:    Worker function, parses rows of a range.    #
+# Param:    task            (path, byteRange, delimiter,#
+#                           dtype, nrIdColumns)         #
+# Return:   (ids, values) of the range                  #
+#-------------------------------------------------------#
+def parseRows(task):
+    path, byteRange, delimiter, dtype, nrIdColumns = task
+    lines = readByteRange(path, byteRange)
+    if(len(lines) == 0):
+        return [], np.zeros((0,0), dtype=dtype)
+    ids = []
+    if(nrIdColumns > 0):
+        sep = delimiter.encode()
+        fields = [line.split(sep, nrIdColumns) for line in lines]
+        ids = [[ID.decode().strip() for ID in row[0:nrIdColumns]] for row in fields]
+        lines = [row[nrIdColumns] for row in fields]
+    values = np.loadtxt(io.BytesIO(b'\n'.join(lines)), delimiter=delimiter, dtype=dtype, ndmin=2)
+    return ids, values
+#-------------------------------------------------------#
+# Function: readCSV(...)                                #
+# Desct:    Parses a numeric CSV file in parallel. The  #
+#           rows are copied into a preallocated array.  #
+# Param:    path            Path to the CSV file        #
+#           delimiter       CSV delimiter               #
+#           dtype           Output data type            #
+#           nrIdColumns     Leading non numeric columns #
+#           nrWorkers       Number of processes (None:  #
+#                           all cores)                  #
+#           chunkBytes      Approx. bytes per task      #
+#           allocate        Function shape->array used  #
+#                           to create the output (e.g.  #
+#                           a memmap)                   #
+# Return:   values or [ids, values] if nrIdColumns > 0  #
+#-------------------------------------------------------#
+def readCSV(path, delimiter=",", dtype=np.float64, nrIdColumns=0, nrWorkers=None, chunkBytes=chunk_bytes, allocate=None):
+    ranges = getByteRanges(path, chunkBytes)
+    if(nrWorkers is None):
+        nrWorkers = multiprocessing.cpu_count()
+    nrWorkers = max(1,min(nrWorkers, len(ranges)))
+    pool = multiprocessing.Pool(nrWorkers) if(nrWorkers > 1) else None
+    try:
+        mapper = pool.imap if(pool is not None) else map
+        #--- Pass 1: count rows to preallocate memory ---#
+        rowCounts = list(mapper(countRows, [(path, r) for r in ranges]))
+        rowStarts = np.concatenate(([0], np.cumsum(rowCounts))).astype(int)
+        nrCols = 0
+        for r in ranges:                #Get number of columns from first row
+            lines = readByteRange(path, r)
+            if(len(lines) != 0):
+                nrCols = len(lines[0].split(delimiter.encode())) - nrIdColumns
+                break
+        shape = (int(rowStarts[-1]), nrCols)
+        values = allocate(shape) if(allocate is not None) else np.empty(shape, dtype=dtype)
+        ids = []
+        #--- Pass 2: parse ranges and copy rows ---#
+        tasks = [(path, r, delimiter, dtype, nrIdColumns) for r in ranges]
+        for i, (chunk_ids, chunk_values) in enumerate(mapper(parseRows, tasks)):
+            if(chunk_values.shape[0] == 0):
+                continue
+            if(chunk_values.shape[1] != nrCols):
+                raise Exception("designIO: inconsistent number of columns in %s" % path)
+            values[rowStarts[i]:rowStarts[i+1],:] = chunk_values
+            ids.extend(chunk_ids)
+    finally:
+        if(pool is not None):
+            pool.close()
+            pool.join()
+    if(nrIdColumns > 0):
+        ids = np.array(ids, dtype=str)
+        if(nrIdColumns == 1):
+            ids = ids.reshape((-1,))
+        return [ids, values]
+    return values
+#-------------------------------------------------------#
+# Function: loadLabelledDesign(...)                     #
+# Desct:    Loads a CSV file with leading ID columns    #
+#           (e.g. BGPLVM_DATA.csv) in parallel.         #
+# Param:    path            Path to the CSV file        #
+#           nrIdColumns     Number of ID columns        #
+#           dtype           Data type of numeric part   #
+# Return:   [ids, values]                               #
+#-------------------------------------------------------#
+def loadLabelledDesign(path, nrIdColumns=1, delimiter=",", dtype=np.float64, nrWorkers=None):
+    return readCSV(path, delimiter=delimiter, dtype=dtype, nrIdColumns=nrIdColumns, nrWorkers=nrWorkers)
+#--------------------#
+#--- Design cache ---#
+#--------------------#
+#-------------------------------------------------------#
+# Function: loadDesign(...)                             #
+# Desct:    Loads a numeric design matrix. CSV files are#
+#           parsed once (in parallel) and stored as     #
+#           *.npy sidecar, which is memory mapped on    #
+#           later loads. *.npy files are memory mapped  #
+#           directly.                                   #
+# Param:    path            Path to the design data     #
+#           delimiter       CSV delimiter               #
+#           useCache        Flag for sidecar usage      #
+#           dtype           np.float64 or np.float32    #
+#                           (halves the footprint)      #
+#           nrWorkers       Number of parsing processes #
+# Return:   design matrix (read only if cached)         #
+#-------------------------------------------------------#
+def loadDesign(path, delimiter=",", useCache=True, dtype=np.float64, nrWorkers=None):
+    if(path.endswith(".npy")):
+        design = np.load(path, mmap_mode='r')               #Binary design, no parsing needed
+        if(design.dtype != np.dtype(dtype)):
+            design = design.astype(dtype)
+        return design
+    if(not useCache):
+        return readCSV(path, delimiter=delimiter, dtype=dtype, nrWorkers=nrWorkers)
+    #---------------------#
+    #--- Check sidecar ---#
+    #---------------------#
+    path_sidecar = getSidecarPath(path, dtype)
+    path_key = path_sidecar+".key"
+    stat = os.stat(path)
+    key = readCacheKey(path_key)
+    if((key is not None) and os.path.isfile(path_sidecar)):
+        if((key[0] == stat.st_size) and (key[1] == stat.st_mtime_ns)):
+            return np.load(path_sidecar, mmap_mode='r')     #Unchanged file
+        if(key[0] == stat.st_size):
+            csv_hash = hashFile(path)
+            if(key[2] == csv_hash):                         #File was touched only
+                writeCacheKey(path_key, [stat.st_size, stat.st_mtime_ns, csv_hash])
+                return np.load(path_sidecar, mmap_mode='r')
+    #-----------------------#
+    #--- Parse and store ---#
+    #-----------------------#
+    csv_hash = hashFile(path)
+    path_tmp = path_sidecar+".tmp.npy"
+    try:
+        readCSV(path, delimiter=delimiter, dtype=dtype, nrWorkers=nrWorkers,   #Parse straight into the sidecar
+                allocate=lambda shape: np.lib.format.open_memmap(path_tmp, mode='w+', dtype=dtype, shape=shape)).flush()
+        os.replace(path_tmp, path_sidecar)
+        writeCacheKey(path_key, [stat.st_size, stat.st_mtime_ns, csv_hash])
+    except (IOError, OSError):
+        print("designIO: cannot write sidecar for %s" % path)
+        return readCSV(path, delimiter=delimiter, dtype=dtype, nrWorkers=nrWorkers)
+    return np.load(path_sidecar, mmap_mode='r')
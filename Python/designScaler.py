@@ -0,0 +1,159 @@
+# The designScaler.py script implements the standardization of the
+# design matrices. The StandardScaler is trained once in row chunks,
+# stored next to the model files and reloaded by all later processing
+# steps. The design is transformed chunkwise into a single output
+# array (or in place), which avoids temporary full-size copies.
+#
+# This code is available under a GPL v3.0 license and comes without
+# any explicit or implicit warranty.
+#
+# (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
+import os                               #File handling
+import hashlib                          #Design fingerprint
+import numpy as np                      #You should know that
+from sklearn import preprocessing       #Data preprocessing
+chunk_rows = 256                        #Rows per chunk for fitting and scaling
+#-------------------------------------------------------#
+# Function: getDesignKey(...)                           #
+# Desct:    Creates the fingerprint of a design based on#
+#           its shape and the content of all rows (as   #
+#           float32, thus float32 and float64 loads of a#
+#           design match). Hashed in row chunks.        #
+# Param:    design_raw      Raw design matrix           #
+# Return:   key string                                  #
+#-------------------------------------------------------#
+def getDesignKey(design_raw, chunkRows=chunk_rows):
+    sha = hashlib.sha1()
+    for start in range(0, design_raw.shape[0], chunkRows):
+        sha.update(np.ascontiguousarray(design_raw[start:(start+chunkRows)], dtype=np.float32).tobytes())
+    return "%dx%d_%s" % (design_raw.shape[0], design_raw.shape[1], sha.hexdigest())
+#-------------------------------------------------------#
+# Function: getScalerPath(...)                          #
+# Desct:    Returns the scaler file of a resolution, the#
+#           factor is added to the file name (factor 1: #
+#           unchanged).                                 #
+# Param:    path_scaler     Scaler of the full res.     #
+#           factor          Downsampling factor         #
+# Return:   path ("" = not stored)                      #
+#-------------------------------------------------------#
+def getScalerPath(path_scaler, factor=1):
+    if((path_scaler == "") or (factor == 1)):
+        return path_scaler
+    root, ext = os.path.splitext(path_scaler)
+    return "%s_f%d%s" % (root, factor, ext)
+#-------------------------------------------------------#
+# Function: fitScaler(...)                              #
+# Desct:    Trains a StandardScaler in row chunks.      #
+# Param:    design_raw      Raw design matrix           #
+#           chunkRows       Rows per chunk              #
+# Return:   trained scaler                              #
+#-------------------------------------------------------#
+def fitScaler(design_raw, chunkRows=chunk_rows):
+    scaler = preprocessing.StandardScaler()
+    for start in range(0, design_raw.shape[0], chunkRows):
+        scaler.partial_fit(np.asarray(design_raw[start:(start+chunkRows),:], dtype=np.float64))
+    return scaler
+#-------------------------------------------------------#
+# Function: saveScaler(...)                             #
+# Desct:    Stores a trained scaler as *.npz file.      #
+# Param:    scaler          Trained scaler              #
+#           path_scaler     Path to the *.npz file      #
+#           key             Design fingerprint          #
+# Return:   -                                           #
+#-------------------------------------------------------#
+def saveScaler(scaler, path_scaler, key=""):
+    path_tmp = path_scaler+".tmp.npz"
+    np.savez(path_tmp,
+             mean=scaler.mean_, var=scaler.var_, scale=scaler.scale_,
+             n_samples_seen=scaler.n_samples_seen_, key=np.array(key))
+    os.replace(path_tmp, path_scaler)
+#-------------------------------------------------------#
+# Function: loadScaler(...)                             #
+# Desct:    Restores a scaler from a *.npz file.        #
+# Param:    path_scaler     Path to the *.npz file      #
+#           key             Expected design fingerprint #
+#                           ("" = do not check)         #
+# Return:   scaler or None if missing/not matching      #
+#-------------------------------------------------------#
+def loadScaler(path_scaler, key=""):
+    if(not os.path.isfile(path_scaler)):
+        return None
+    data = np.load(path_scaler)
+    if((key != "") and (str(data['key']) != key)):
+        return None
+    scaler = preprocessing.StandardScaler()
+    scaler.mean_ = data['mean']
+    scaler.var_ = data['var']
+    scaler.scale_ = data['scale']
+    scaler.n_samples_seen_ = data['n_samples_seen']
+    scaler.n_features_in_ = scaler.mean_.shape[0]
+    return scaler
+#-------------------------------------------------------#
+# Function: getScaler(...)                              #
+# Desct:    Loads the stored scaler of a design or      #
+#           trains and stores a new one.                #
+# Param:    design_raw      Raw design matrix           #
+#           path_scaler     Path to the *.npz file      #
+#                           ("" = do not store)         #
+# Return:   trained scaler                              #
+#-------------------------------------------------------#
+def getScaler(design_raw, path_scaler="./optModel_bgp_scaler.npz"):
+    if(path_scaler == ""):
+        return fitScaler(design_raw)
+    key = getDesignKey(design_raw)
+    scaler = loadScaler(path_scaler, key)
+    if(scaler is None):
+        print("          Train scaler...")
+        scaler = fitScaler(design_raw)
+        saveScaler(scaler, path_scaler, key)
+    else:
+        print("          Use stored scaler %s" % path_scaler)
+    return scaler
+#-------------------------------------------------------#
+# Function: scaleDesign(...)                            #
+# Desct:    Transforms the design chunkwise.            #
+# Param:    design_raw      Raw design matrix           #
+#           scaler          Trained scaler              #
+#           inPlace         Overwrite design_raw        #
+#           dtype           Output type (None = float   #
+#                           type of design_raw)         #
+#           mask            Boolean pixel mask, only the#
+#                           masked columns are returned #
+# Return:   scaled design                               #
+#-------------------------------------------------------#
+def scaleDesign(design_raw, scaler, inPlace=False, dtype=None, chunkRows=chunk_rows, mask=None):
+    if(dtype is None):
+        dtype = design_raw.dtype if(np.issubdtype(design_raw.dtype, np.floating)) else np.float64
+    mean = scaler.mean_
+    scale = scaler.scale_
+    if(mask is not None):
+        inPlace = False                 #Masked design has a different shape
+        mean = mean[mask]
+        scale = scale[mask]
+    if(inPlace):
+        design = design_raw
+    else:
+        design = np.empty((design_raw.shape[0], mean.shape[0]), dtype=dtype)
+    mean = mean.astype(design.dtype)
+    scale = scale.astype(design.dtype)
+    for start in range(0, design_raw.shape[0], chunkRows):
+        chunk = design[start:(start+chunkRows),:]
+        if(mask is not None):
+            chunk[:] = design_raw[start:(start+chunkRows),:][:,mask]
+        else:
+            chunk[:] = design_raw[start:(start+chunkRows),:]
+        chunk -= mean
+        chunk /= scale
+    return design
+#-------------------------------------------------------#
+# Function: getScaledDesign(...)                        #
+# Desct:    Returns the standardized design using the   #
+#           stored (or newly trained) scaler.           #
+# Param:    design_raw      Raw design matrix           #
+#           path_scaler     Path to the *.npz file      #
+#           mask            Boolean pixel mask          #
+# Return:   scaled design                               #
+#-------------------------------------------------------#
+def getScaledDesign(design_raw, path_scaler="./optModel_bgp_scaler.npz", inPlace=False, dtype=None, mask=None):
+    scaler = getScaler(design_raw, path_scaler)
+    return scaleDesign(design_raw, scaler, inPlace=inPlace, dtype=dtype, mask=mask)
@@ -0,0 +1,357 @@
+# The fingerprint.py script implements content-hash fingerprints for
+# the processing stages of run.bash. The key of a stage is created from
+# the hashes of its input files, its parameters and its code. Python
+# code is hashed without comments and formatting, thus only changes of
+# the program itself create a new key. Stage outputs are stored in a
+# cache folder under this key and restored instead of recomputing the
+# stage. File hashes are stored with size and modification time, thus
+# unchanged (large) inputs are not hashed again.
+#
+# This script is called using:
+#
+# python fingerprint.py check|store|key <cache-folder> <stage> -i <inputs>
+#                       -c <code> -p <parameters> -o <outputs>
+#
+# Inputs, code and outputs are files, folders or glob patterns relative
+# to the working directory. Python code files are extended by their
+# import closure: modules imported from the folder of the script or
+# from folders added with sys.path.append('...') (e.g. ../Python/) are
+# hashed as well, thus only the entry scripts of a stage are listed.
+# Parameters are given as name=value or as script:name, which reads the
+# top level assignment 'name = ...' from a Python script. 'check'
+# restores cached outputs and returns 0 on a hit (1 otherwise), 'store'
+# copies the outputs into the cache and 'key' prints the fingerprint
+# (e.g. to invalidate intermediate results).
+#
+# This code is available under a GPL v3.0 license and comes without
+# any explicit or implicit warranty.
+#
+# (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
+import os                               #File handling
+import sys                              #Command line arguments
+import ast                              #Code and parameter parsing
+import glob                             #Output patterns
+import json                             #Fingerprint description
+import shutil                           #Copy outputs
+import hashlib                          #Content hashes
+from designIO import hashFile           #File hashing
+#-------------------------------------------------------#
+# Function: readHashes(...)                             #
+# Desct:    Reads the stored file hashes.               #
+# Param:    path_hashes     Path to the hash file       #
+# Return:   dict path -> [size, mtime, hash]            #
+#-------------------------------------------------------#
+def readHashes(path_hashes):
+    hashes = {}
+    if(os.path.isfile(path_hashes)):
+        with open(path_hashes, 'r') as fid:
+            for line in fid:
+                row = line.strip().rsplit(',', 3)
+                if(len(row) == 4):
+                    hashes[row[0]] = [int(row[1]), int(row[2]), row[3]]
+    return hashes
+#-------------------------------------------------------#
+# Function: writeHashes(...)                            #
+# Desct:    Writes the stored file hashes atomically.   #
+# Param:    path_hashes     Path to the hash file       #
+#           hashes          dict path -> [size,mtime,h] #
+# Return:   -                                           #
+#-------------------------------------------------------#
+def writeHashes(path_hashes, hashes):
+    with open(path_hashes+".tmp", 'w') as fid:
+        for path in sorted(hashes):
+            fid.write("%s,%d,%d,%s\n" % (path, hashes[path][0], hashes[path][1], hashes[path][2]))
+    os.replace(path_hashes+".tmp", path_hashes)
+#-------------------------------------------------------#
+# Function: hashCode(...)                               #
+# Desct:    Hashes a code file. Python code is hashed   #
+#           without comments and formatting.            #
+# Param:    path            Path to the code file       #
+# Return:   hash string                                 #
+#-------------------------------------------------------#
+def hashCode(path):
+    if(path.endswith(".py")):
+        with open(path, 'rb') as fid:                  #Source encoding (PEP 263) independent of the locale
+            tree = ast.parse(fid.read(), path)
+        return hashlib.sha1(ast.dump(tree).encode()).hexdigest()
+    return hashFile(path)
+#-------------------------------------------------------#
+# Function: hashPath(...)                               #
+# Desct:    Hashes a file or all files of a folder.     #
+#           Hashes of unchanged files are reused.       #
+# Param:    path            File or folder              #
+#           hashes          Stored hashes (updated)     #
+#           code            Hash as code file           #
+# Return:   hash string ("missing" if not existing)     #
+#-------------------------------------------------------#
+def hashPath(path, hashes, code=False):
+    if(os.path.isdir(path)):
+        sha = hashlib.sha1()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                path_file = os.path.join(root, name)
+                sha.update(os.path.relpath(path_file, path).encode())
+                sha.update(hashPath(path_file, hashes, code).encode())
+        return sha.hexdigest()
+    if(not os.path.isfile(path)):
+        return "missing"
+    stat = os.stat(path)
+    path_key = ("code:" if(code) else "")+os.path.abspath(path)
+    entry = hashes.get(path_key)
+    if((entry is not None) and (entry[0] == stat.st_size) and (entry[1] == stat.st_mtime_ns)):
+        return entry[2]                                 #Unchanged file
+    hashes[path_key] = [stat.st_size, stat.st_mtime_ns, hashCode(path) if(code) else hashFile(path)]
+    return hashes[path_key][2]
+#-------------------------------------------------------#
+# Function: expandPaths(...)                            #
+# Desct:    Expands glob patterns. Patterns without a   #
+#           match are kept (e.g. missing inputs).       #
+# Param:    patterns        List of paths/patterns      #
+# Return:   sorted list of paths                        #
+#-------------------------------------------------------#
+def expandPaths(patterns):
+    paths = []
+    for pattern in patterns:
+        matches = glob.glob(pattern)
+        paths += matches if(len(matches) != 0) else [pattern]
+    return sorted(set(paths))
+#-------------------------------------------------------#
+# Function: getString(...)                              #
+# Desct:    Returns the value of a string literal node  #
+#           (ast.Constant, ast.Str before Python 3.8).  #
+# Param:    node            AST node                    #
+# Return:   string (None: no string literal)            #
+#-------------------------------------------------------#
+def getString(node):
+    if(hasattr(ast, "Constant") and isinstance(node, ast.Constant)):
+        return node.value if(isinstance(node.value, str)) else None
+    if(hasattr(ast, "Str") and isinstance(node, ast.Str)):
+        return node.s
+    return None
+#-------------------------------------------------------#
+# Function: isPathAppend(...)                           #
+# Desct:    Checks if a node calls sys.path.append with #
+#           one string literal.                         #
+# Param:    node            AST node                    #
+# Return:   bool                                        #
+#-------------------------------------------------------#
+def isPathAppend(node):
+    if((not isinstance(node, ast.Call)) or (len(node.args) != 1) or (getString(node.args[0]) is None)):
+        return False
+    func = node.func
+    return (isinstance(func, ast.Attribute) and (func.attr == "append") and
+            isinstance(func.value, ast.Attribute) and (func.value.attr == "path") and
+            isinstance(func.value.value, ast.Name) and (func.value.value.id == "sys"))
+#-------------------------------------------------------#
+# Function: getImports(...)                             #
+# Desct:    Finds the project modules imported by a     #
+#           Python script. Modules are searched in the  #
+#           folder of the script and in folders added   #
+#           with sys.path.append('...') (relative to    #
+#           the script folder).                         #
+# Param:    path_script     Path to the script          #
+# Return:   list of module paths                        #
+#-------------------------------------------------------#
+def getImports(path_script):
+    with open(path_script, 'rb') as fid:
+        tree = ast.parse(fid.read(), path_script)
+    folder = os.path.dirname(path_script)
+    folders = [folder]
+    names = []
+    for node in ast.walk(tree):
+        if(isinstance(node, ast.Import)):
+            names += [alias.name for alias in node.names]
+        elif(isinstance(node, ast.ImportFrom) and (node.level == 0) and (node.module is not None)):
+            names.append(node.module)
+        elif(isPathAppend(node)):
+            folders.append(os.path.normpath(os.path.join(folder, getString(node.args[0]))))
+    imports = []
+    for name in names:
+        for path_folder in folders:
+            path_module = os.path.join(path_folder, name.split(".")[0]+".py")
+            if(os.path.isfile(path_module)):
+                imports.append(path_module)
+                break
+    return imports
+#-------------------------------------------------------#
+# Function: expandCode(...)                             #
+# Desct:    Expands the code files by the import        #
+#           closure of the Python scripts.              #
+# Param:    patterns        List of paths/patterns      #
+# Return:   sorted list of paths                        #
+#-------------------------------------------------------#
+def expandCode(patterns):
+    paths = set()
+    todo = expandPaths(patterns)
+    while(len(todo) != 0):
+        path = os.path.normpath(todo.pop())
+        if(path in paths):
+            continue
+        paths.add(path)
+        if(path.endswith(".py") and os.path.isfile(path)):
+            todo += getImports(path)
+    return sorted(paths)
+#-------------------------------------------------------#
+# Function: readParam(...)                              #
+# Desct:    Reads the value of a top level assignment   #
+#           (name = value) of a Python script.          #
+# Param:    path_script     Path to the script          #
+#           name            Variable name               #
+# Return:   value as string                             #
+#-------------------------------------------------------#
+def readParam(path_script, name):
+    with open(path_script, 'rb') as fid:
+        tree = ast.parse(fid.read(), path_script)
+    value = None
+    for node in tree.body:
+        if(isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and (t.id == name) for t in node.targets)):
+            try:
+                value = repr(ast.literal_eval(node.value))  #Last assignment wins
+            except ValueError:
+                value = ast.dump(node.value)                #Expressions (e.g. np.float32)
+    if(value is None):
+        raise Exception("fingerprint: no parameter %s in %s" % (name, path_script))
+    return value
+#-------------------------------------------------------#
+# Function: getParams(...)                              #
+# Desct:    Resolves parameters given as name=value or  #
+#           script:name.                                #
+# Param:    specs           List of parameter specs     #
+# Return:   dict name -> value                          #
+#-------------------------------------------------------#
+def getParams(specs):
+    params = {}
+    for spec in specs:
+        if("=" in spec):
+            name, value = spec.split("=", 1)
+            params[name] = value
+        elif(":" in spec):
+            path_script, name = spec.rsplit(":", 1)
+            params[spec] = readParam(path_script, name)
+        else:
+            raise Exception("fingerprint: invalid parameter %s" % spec)
+    return params
+#-------------------------------------------------------#
+# Function: getKey(...)                                 #
+# Desct:    Creates the fingerprint of a stage.         #
+# Param:    stage           Stage name                  #
+#           inputs          Input files/folders         #
+#           code            Code files (and imports)    #
+#           params          dict name -> value          #
+#           path_cache      Cache folder (hash storage) #
+# Return:   [key, description]                          #
+#-------------------------------------------------------#
+def getKey(stage, inputs, code, params, path_cache):
+    path_hashes = os.path.join(path_cache, "hashes.csv")
+    hashes = readHashes(path_hashes)
+    description = { "stage":    stage,
+                    "inputs":   dict([(path, hashPath(path, hashes)) for path in expandPaths(inputs)]),
+                    "code":     dict([(path, hashPath(path, hashes, code=True)) for path in expandCode(code)]),
+                    "params":   params}
+    if(not os.path.isdir(path_cache)):
+        os.makedirs(path_cache)
+    writeHashes(path_hashes, hashes)
+    key = hashlib.sha1(json.dumps(description, sort_keys=True).encode()).hexdigest()
+    return [key, description]
+#-------------------------------------------------------#
+# Function: copyPath(...)                               #
+# Desct:    Copies a file or folder (replaces target).  #
+# Param:    source          Source path                 #
+#           target          Target path                 #
+# Return:   -                                           #
+#-------------------------------------------------------#
+def copyPath(source, target):
+    if(os.path.isdir(target)):
+        shutil.rmtree(target)
+    folder = os.path.dirname(target)
+    if((folder != "") and (not os.path.isdir(folder))):
+        os.makedirs(folder)
+    if(os.path.isdir(source)):
+        shutil.copytree(source, target)
+    else:
+        shutil.copy2(source, target)
+#-------------------------------------------------------#
+# Function: storeOutputs(...)                           #
+# Desct:    Copies the stage outputs into the cache.    #
+# Param:    path_cache      Cache folder                #
+#           key             Stage fingerprint           #
+#           description     Fingerprint description     #
+#           outputs         Output files/folders        #
+# Return:   number of stored outputs                    #
+#-------------------------------------------------------#
+def storeOutputs(path_cache, key, description, outputs):
+    path_stage = os.path.join(path_cache, description["stage"])
+    path_key = os.path.join(path_stage, key)
+    path_tmp = path_key+".tmp"
+    if(os.path.isdir(path_tmp)):
+        shutil.rmtree(path_tmp)
+    os.makedirs(path_tmp)
+    stored = [path for path in expandPaths(outputs) if(os.path.exists(path))]
+    for looper, path in enumerate(stored):
+        copyPath(path, os.path.join(path_tmp, str(looper)))
+    description = dict(description)
+    description["outputs"] = stored
+    with open(os.path.join(path_tmp, "fingerprint.json"), 'w') as fid:
+        json.dump(description, fid, indent=1, sort_keys=True)
+    if(os.path.isdir(path_key)):
+        shutil.rmtree(path_key)
+    os.replace(path_tmp, path_key)                      #Complete entries only
+    return len(stored)
+#-------------------------------------------------------#
+# Function: restoreOutputs(...)                         #
+# Desct:    Restores cached stage outputs.              #
+# Param:    path_cache      Cache folder                #
+#           stage           Stage name                  #
+#           key             Stage fingerprint           #
+# Return:   number of restored outputs (None: no entry) #
+#-------------------------------------------------------#
+def restoreOutputs(path_cache, stage, key):
+    path_key = os.path.join(path_cache, stage, key)
+    if(not os.path.isfile(os.path.join(path_key, "fingerprint.json"))):
+        return None
+    with open(os.path.join(path_key, "fingerprint.json"), 'r') as fid:
+        description = json.load(fid)
+    for looper, path in enumerate(description["outputs"]):
+        copyPath(os.path.join(path_key, str(looper)), path)
+    return len(description["outputs"])
+#-------------------------------------------------------#
+# Function: parseArguments(...)                         #
+# Desct:    Splits the command line into the lists of   #
+#           inputs, code, parameters and outputs.       #
+# Param:    args            Arguments after the stage   #
+# Return:   dict flag -> list                           #
+#-------------------------------------------------------#
+def parseArguments(args):
+    lists = {"-i": [], "-c": [], "-p": [], "-o": []}
+    current = None
+    for arg in args:
+        if(arg in lists):
+            current = arg
+        elif(current is None):
+            raise Exception("fingerprint: unexpected argument %s" % arg)
+        else:
+            lists[current].append(arg)
+    return lists
+#-------------------------#
+#--- Run main programm ---#
+#-------------------------#
+if __name__ == "__main__":
+    if((len(sys.argv) < 4) or (sys.argv[1] not in ["check", "store", "key"])):
+        print("Please call fingerprint script with: check|store|key <cache-folder> <stage> -i <inputs> -c <code> -p <parameters> -o <outputs>")
+        sys.exit(2)
+    mode, path_cache, stage = sys.argv[1:4]
+    lists = parseArguments(sys.argv[4:])
+    key, description = getKey(stage, lists["-i"], lists["-c"], getParams(lists["-p"]), path_cache)
+    if(mode == "key"):
+        print(key)
+        sys.exit(0)
+    if(mode == "check"):
+        restored = restoreOutputs(path_cache, stage, key)
+        if(restored is None):
+            print("fingerprint [%s]: no cached results for %s" % (stage, key))
+            sys.exit(1)
+        print("fingerprint [%s]: restored %d cached outputs of %s" % (stage, restored, key))
+        sys.exit(0)
+    stored = storeOutputs(path_cache, key, description, lists["-o"])
+    print("fingerprint [%s]: stored %d outputs as %s" % (stage, stored, key))
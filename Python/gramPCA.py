@@ -0,0 +1,107 @@
+# The gramPCA.py script implements the PCA of wide designs (N << D)
+# using the [N x N] Gram matrix YY^T. The Gram matrix is computed in
+# column chunks, its eigenvalues are the squared singular values of the
+# design and its eigenvectors are the left singular vectors. Thus, the
+# PCA spectrum costs one pass over the design and an [N x N] eigen
+# decomposition instead of the SVD of the full design. The Gram matrix
+# and the SVD are stored with a design fingerprint, which allows later
+# stages (e.g. the row space compression) to reuse them.
+#
+# This code is available under a GPL v3.0 license and comes without
+# any explicit or implicit warranty.
+#
+# (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
+import os                               #File handling
+import numpy as np                      #You should know that
+from designScaler import getDesignKey   #Design fingerprint
+chunk_cols = 4096                       #Columns per Gram matrix step
+#-------------------------------------------------------#
+# Function: computeGram(...)                            #
+# Desct:    Computes YY^T in column chunks.             #
+# Param:    design          Design [N x D]              #
+#           chunkCols       Columns per chunk           #
+# Return:   Gram matrix [N x N]                         #
+#-------------------------------------------------------#
+def computeGram(design, chunkCols=chunk_cols):
+    G = np.zeros((design.shape[0],design.shape[0]))
+    for start in range(0, design.shape[1], chunkCols):
+        chunk = np.asarray(design[:,start:(start+chunkCols)], dtype=np.float64)
+        G += chunk.dot(chunk.T)
+    return G
+#-------------------------------------------------------#
+# Function: getGramSVD(...)                             #
+# Desct:    Returns the singular values and left        #
+#           singular vectors from the Gram matrix.      #
+# Param:    G               Gram matrix [N x N]         #
+#           center          Center the columns of the   #
+#                           design (PCA)                #
+# Return:   [U [N x N], S [N]] in descending order      #
+#-------------------------------------------------------#
+def getGramSVD(G, center=False):
+    if(center):
+        G = G - G.mean(0)[None,:] - G.mean(1)[:,None] + G.mean()   #HGH, H = I - 11^T/N
+    eigvals, U = np.linalg.eigh(G)
+    order = np.argsort(eigvals)[::-1]                   #Descending singular values
+    return [U[:,order], np.sqrt(np.fmax(eigvals[order], 0.0))]
+#-------------------------------------------------------#
+# Function: saveGramPCA(...)                            #
+# Desct:    Stores the Gram matrix and the PCA.         #
+# Param:    path_svd        Path to the *.npz file      #
+#           key             Design content hash         #
+#           G               Gram matrix                 #
+#           U, S            PCA (centered SVD)          #
+# Return:   -                                           #
+#-------------------------------------------------------#
+def saveGramPCA(path_svd, key, G, U, S):
+    path_tmp = path_svd+".tmp.npz"
+    np.savez(path_tmp, G=G, U=U, S=S, key=np.array(key))
+    os.replace(path_tmp, path_svd)
+#-------------------------------------------------------#
+# Function: loadGramPCA(...)                            #
+# Desct:    Loads the stored Gram matrix and PCA of a   #
+#           design.                                     #
+# Param:    path_svd        Path to the *.npz file      #
+#           design          Design (content hash check) #
+# Return:   [G, U, S] or None if missing/not matching   #
+#-------------------------------------------------------#
+def loadGramPCA(path_svd, design):
+    if((path_svd == "") or (not os.path.isfile(path_svd))):
+        return None
+    data = np.load(path_svd)
+    if(str(data['key']) != getDesignKey(design)):
+        return None
+    return [data['G'], data['U'], data['S']]
+#-------------------------------------------------------#
+# Function: getGramPCA(...)                             #
+# Desct:    PCA of a wide design using the Gram matrix. #
+#           Stored results of the design are reused.    #
+# Param:    design          Scaled design [N x D]       #
+#           path_svd        Path to the *.npz file      #
+#                           ("" = do not store)         #
+# Return:   [U, S, explained variance ratio]            #
+#-------------------------------------------------------#
+def getGramPCA(design, path_svd=""):
+    stored = loadGramPCA(path_svd, design)
+    if(stored is not None):
+        G, U, S = stored
+    else:
+        G = computeGram(design)
+        U, S = getGramSVD(G, center=True)
+        if(path_svd != ""):
+            saveGramPCA(path_svd, getDesignKey(design), G, U, S)
+    return [U, S, S**2/np.sum(S**2)]
+#-------------------------------------------------------#
+# Function: getGram(...)                                #
+# Desct:    Returns the (uncentered) Gram matrix, the   #
+#           stored one if it matches the design.        #
+# Param:    design          Design [N x D]              #
+#           path_svd        Path to the *.npz file      #
+#                           ("" = compute)              #
+# Return:   Gram matrix [N x N]                         #
+#-------------------------------------------------------#
+def getGram(design, path_svd="", chunkCols=chunk_cols):
+    stored = loadGramPCA(path_svd, design)
+    if(stored is not None):
+        print("          Use stored Gram matrix %s" % path_svd)
+        return stored[0]
+    return computeGram(design, chunkCols)
@@ -0,0 +1,108 @@
+# The multiStart.py script implements a bounded multi-start of GPy
+# optimizations. The first attempt uses the model initialization as it
+# is, further attempts perturb the initial parameters. Attempts run one
+# after the other or in batches of parallel processes. The first attempt
+# without line search failure is taken and running attempts of its batch
+# are stopped. If all attempts fail, the best bound is taken. The status,
+# bound and runtime of each attempt are printed.
+#
+# This code is available under a GPL v3.0 license and comes without
+# any explicit or implicit warranty.
+#
+# (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
+import time                             #Runtime of the attempts
+import numpy as np                      #You should know that
+from sharedDesign import runPool, getWorkerDesign, getThreads   #Parallel attempts on a shared design
+#-------------------------------------------------------#
+# Function: isFailed(...)                               #
+# Desct:    Checks for a line search failure of L-BFGS-B#
+#           (older SciPy: ABNORMAL_TERMINATION_IN_LNSRCH#
+#           newer SciPy: ABNORMAL).                     #
+# Param:    status          Optimizer status            #
+# Return:   bool                                        #
+#-------------------------------------------------------#
+def isFailed(status):
+    return status.startswith("Error") and ("ABNORMAL" in status)
+#-------------------------------------------------------#
+# Function: isConverged(...)                            #
+# Desct:    Checks for convergence (L-BFGS-B and        #
+#           mini-batch: "Converged", SCG: "converged -  #
+#           relative ...").                             #
+# Param:    status          Optimizer status            #
+# Return:   bool                                        #
+#-------------------------------------------------------#
+def isConverged(status):
+    return status.lower().startswith("converged")
+#-------------------------------------------------------#
+# Function: perturbModel(...)                           #
+# Desct:    Perturbs the initial parameters of a model  #
+#           in the optimizer (transformed) space.       #
+# Param:    model           GPy model                   #
+#           seed            Seed of the perturbation    #
+#           scale           Standard deviation          #
+# Return:   -                                           #
+#-------------------------------------------------------#
+def perturbModel(model, seed, scale=0.1):
+    rng = np.random.RandomState(seed)
+    model.optimizer_array = model.optimizer_array + scale*rng.randn(model.optimizer_array.size)
+#-------------------------------------------------------#
+# Function: runAttempt(...)                             #
+# Desct:    Runs and times one attempt.                 #
+# Param:    attempt         Module level function       #
+#                           attempt(design, args, index)#
+#                           returning [status, bound,   #
+#                           model]                      #
+#           design          Data of the attempt         #
+#           args            Arguments of the attempt    #
+#           index           Attempt number              #
+# Return:   dict of the attempt                         #
+#-------------------------------------------------------#
+def runAttempt(attempt, design, args, index):
+    start = time.time()
+    status, bound, model = attempt(design, args, index)
+    return {"index": index, "status": status, "loglik": float(bound), "seconds": time.time()-start, "model": model}
+#-------------------------------------------------------#
+# Function: attemptWorker(...)                          #
+# Desct:    Worker function, runs an attempt on the     #
+#           shared design. The model is returned as     #
+#           param_array.                                #
+# Param:    task            (attempt, args, index)      #
+# Return:   dict of the attempt                         #
+#-------------------------------------------------------#
+def attemptWorker(task):
+    attempt, args, index = task
+    result = runAttempt(attempt, getWorkerDesign(), args, index)
+    result["params"] = result.pop("model").param_array.copy()
+    return result
+#-------------------------------------------------------#
+# Function: multiStart(...)                             #
+# Desct:    Runs attempts till one does not fail or the #
+#           maximum number of attempts is reached.      #
+# Param:    attempt         Module level function       #
+#           design          Data (shared with workers)  #
+#           args            Arguments of the attempts   #
+#           maxAttempts     Maximum number of attempts  #
+#           nrWorkers       Parallel attempts (1: one   #
+#                           after the other)            #
+#           nrThreads       BLAS threads per worker     #
+# Return:   dict of the taken attempt (model or params) #
+#-------------------------------------------------------#
+def multiStart(attempt, design, args, maxAttempts=10, nrWorkers=1, nrThreads=None):
+    best = None
+    for first in range(0, maxAttempts, nrWorkers):
+        indices = range(first, min(first+nrWorkers, maxAttempts))
+        if(nrWorkers > 1):
+            results = runPool(attemptWorker, [(attempt, args, index) for index in indices], design, nrWorkers, getThreads(nrWorkers, nrThreads))
+        else:
+            results = (runAttempt(attempt, design, args, index) for index in indices)
+        for result in results:
+            print("          Attempt %d: %s, log lik. %f, %.1f s" % (result["index"], result["status"], result["loglik"], result["seconds"]))
+            if((best is None) or (isFailed(best["status"]) and ((not isFailed(result["status"])) or (result["loglik"] > best["loglik"])))):
+                best = result
+            if(not isFailed(best["status"])):
+                break
+        results.close()                             #Stops the remaining attempts of the batch
+        if(not isFailed(best["status"])):
+            return best
+    print("          All %d attempts failed, use attempt %d" % (maxAttempts, best["index"]))
+    return best
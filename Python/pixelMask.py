@@ -0,0 +1,95 @@
+# The pixelMask.py script implements the optional pixel mask for the
+# GP-LVM. Many pixel columns of the design are near-constant background.
+# Those columns are removed before training, which reduces the output
+# dimension and the cost of each BGPLVM iteration. The mask is either
+# estimated from the per-column variance of the raw design or loaded
+# from a mask image (white = foreground). Predictions of the masked
+# model are scattered back into full images for the heatmaps.
+#
+# This code is available under a GPL v3.0 license and comes without
+# any explicit or implicit warranty.
+#
+# (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
+import os                               #File handling
+import numpy as np                      #You should know that
+#-------------------------------------------------------#
+# Function: getVarianceMask(...)                        #
+# Desct:    Masks columns with a raw variance above a   #
+#           given threshold.                            #
+# Param:    var_raw         Per-column raw variance     #
+#                           (e.g. scaler.var_)          #
+#           varTH           Variance threshold          #
+# Return:   boolean mask (True = used pixel)            #
+#-------------------------------------------------------#
+def getVarianceMask(var_raw, varTH):
+    return np.asarray(var_raw) > varTH
+#-------------------------------------------------------#
+# Function: getImageMask(...)                           #
+# Desct:    Loads a mask image (white = used pixel).    #
+# Param:    path_maskImage  Path to the mask image      #
+#           imgDim          Image dimension (rows, cols)#
+# Return:   boolean mask (True = used pixel)            #
+#-------------------------------------------------------#
+def getImageMask(path_maskImage, imgDim=(224,224)):
+    import cv2                          #Only needed for mask images
+    img = cv2.imread(path_maskImage, cv2.IMREAD_GRAYSCALE)
+    if(img is None):
+        raise Exception("pixelMask: cannot read mask image %s" % path_maskImage)
+    if(img.shape != tuple(imgDim)):
+        img = cv2.resize(img, (imgDim[1], imgDim[0]), interpolation=cv2.INTER_NEAREST)
+    return img.reshape((-1,)) > 127
+#-------------------------------------------------------#
+# Function: getPixelMask(...)                           #
+# Desct:    Combines variance and image based masks.    #
+# Param:    var_raw         Per-column raw variance     #
+#           varTH           Variance threshold (None:   #
+#                           no variance mask)           #
+#           path_maskImage  Mask image ("" = none)      #
+#           imgDim          Image dimension (rows, cols)#
+# Return:   boolean mask or None if no mask is used     #
+#-------------------------------------------------------#
+def getPixelMask(var_raw, varTH=None, path_maskImage="", imgDim=(224,224)):
+    mask = None
+    if(varTH is not None):
+        mask = getVarianceMask(var_raw, varTH)
+    if(path_maskImage != ""):
+        img_mask = getImageMask(path_maskImage, imgDim)
+        mask = img_mask if(mask is None) else (mask & img_mask)
+    if(mask is not None):
+        print("          Pixel mask: use %d of %d pixels" % (np.sum(mask), mask.shape[0]))
+    return mask
+#-------------------------------------------------------#
+# Function: saveMask(...)                               #
+# Desct:    Stores a pixel mask as *.npy file.          #
+# Param:    mask            Boolean mask                #
+#           path_mask       Path to the mask file       #
+# Return:   -                                           #
+#-------------------------------------------------------#
+def saveMask(mask, path_mask):
+    np.save(path_mask, np.asarray(mask, dtype=bool))
+#-------------------------------------------------------#
+# Function: loadMask(...)                               #
+# Desct:    Loads a pixel mask.                         #
+# Param:    path_mask       Path to the mask file       #
+#                           ("" or missing: no mask)    #
+# Return:   boolean mask or None                        #
+#-------------------------------------------------------#
+def loadMask(path_mask):
+    if((path_mask == "") or (not os.path.isfile(path_mask))):
+        return None
+    return np.load(path_mask).astype(bool)
+#-------------------------------------------------------#
+# Function: unmask(...)                                 #
+# Desct:    Scatters masked values back into full       #
+#           pixel vectors.                              #
+# Param:    values          [... x nr masked pixels]    #
+#           mask            Boolean mask (None: no mask)#
+#           fill            Value of masked out pixels  #
+# Return:   [... x nr pixels]                           #
+#-------------------------------------------------------#
+def unmask(values, mask, fill=0.0):
+    if(mask is None):
+        return values
+    full = np.full(values.shape[:-1]+(mask.shape[0],), fill, dtype=values.dtype)
+    full[..., mask] = values
+    return full
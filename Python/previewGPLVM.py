@@ -0,0 +1,151 @@
+# The previewGPLVM.py script implements a fast draft of the GP-LVM. The
+# ARD RBF kernel is replaced by random Fourier features,
+# k(x,x') ~ phi(x)^T phi(x') with phi(x) = sqrt(s^2/R) [cos(Wx/l),
+# sin(Wx/l)] for R fixed frequencies W ~ N(0,I). The marginal likelihood
+# of the (compressed) design is evaluated in the [2R x 2R] feature space
+# (Woodbury identity), the latent points (standard normal prior), the
+# lengthscales, the kernel variance and the noise variance are optimized
+# with L-BFGS-B. The result has the layout of getWarmStart(), thus it
+# initializes an exact Bayesian GP-LVM (draft model of getGPLVM.py or
+# warm start of the final fit).
+#
+# This code is available under a GPL v3.0 license and comes without
+# any explicit or implicit warranty.
+#
+# (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
+import os                               #File handling
+import time                             #Runtime
+import numpy as np                      #You should know that
+from scipy.optimize import minimize     #L-BFGS-B
+from designScaler import getDesignKey   #Design fingerprint
+from compressedGPLVM import getLatentInit   #PCA initialization
+from warmStart import applyWarmStart    #Initialization of the exact model
+from bGPLVMOptimizer import buildBGPLVM #Exact model
+#-------------------------------------------------------#
+# Function: unpackParams(...)                           #
+# Desct:    Splits the parameter vector of the preview. #
+# Param:    params          Parameter vector            #
+#           N               Number of specimens         #
+#           input_dim       Latent dimension            #
+# Return:   [X, lengthscale, kernel variance, noise]    #
+#-------------------------------------------------------#
+def unpackParams(params, N, input_dim):
+    X = params[:N*input_dim].reshape(N, input_dim)
+    lengthscale, variance, noise = np.exp(params[N*input_dim:N*input_dim+input_dim]), np.exp(params[-2]), np.exp(params[-1])
+    return [X, lengthscale, variance, noise]
+#-------------------------------------------------------#
+# Function: previewObjective(...)                       #
+# Desct:    Negative log marginal likelihood of the     #
+#           random feature model and the latent prior.  #
+# Param:    params          Parameter vector (X, log    #
+#                           lengthscale, log variance,  #
+#                           log noise)                  #
+#           Y_c             Compressed design [N x r]   #
+#           output_dim      Uncompressed output dim. D  #
+#           W               Frequencies [R x Q]         #
+# Return:   [objective, gradient]                       #
+#-------------------------------------------------------#
+def previewObjective(params, Y_c, output_dim, W):
+    N, R = Y_c.shape[0], W.shape[0]
+    X, lengthscale, variance, noise = unpackParams(params, N, W.shape[1])
+    #--- Features and feature space posterior ---#
+    Omega = W/lengthscale
+    P = X.dot(Omega.T)
+    scale = np.sqrt(variance/R)
+    Phi = scale*np.hstack((np.cos(P), np.sin(P)))           #[N x 2R]
+    A = Phi.T.dot(Phi)+noise*np.eye(2*R)
+    L = np.linalg.cholesky(A)
+    A_inv = np.linalg.solve(L.T, np.linalg.solve(L, np.eye(2*R)))
+    G = Phi.T.dot(Y_c)                                      #[2R x r]
+    AG = A_inv.dot(G)
+    B = (Y_c-Phi.dot(AG))/noise                             #K^-1 Y
+    #--- Bound: log|K| = (N-2R) log noise + log|A| ---#
+    logDet = (N-2*R)*np.log(noise)+2*np.sum(np.log(np.diag(L)))
+    fit = (np.sum(Y_c**2)-np.sum(G*AG))/noise               #tr(K^-1 YY^T)
+    logLik = -0.5*output_dim*(N*np.log(2*np.pi)+logDet)-0.5*fit
+    #--- Gradients (K^-1 Phi = Phi A^-1) ---#
+    dPhi = B.dot(AG.T)-output_dim*Phi.dot(A_inv)            #dL/dPhi
+    dNoise = 0.5*np.sum(B**2)-0.5*output_dim*(N-2*R+noise*np.trace(A_inv))/noise
+    dVariance = np.sum(dPhi*Phi)/(2*variance)
+    dP = scale*(-np.sin(P)*dPhi[:,:R]+np.cos(P)*dPhi[:,R:])
+    dX = dP.dot(Omega)-X                                    #Standard normal prior
+    dLengthscale = -np.sum(dP.T.dot(X)*Omega, axis=0)       #dOmega/dlog(l) = -Omega
+    objective = -logLik+0.5*np.sum(X**2)
+    gradient = -np.concatenate((dX.ravel(), dLengthscale, [dVariance*variance, dNoise*noise]))
+    return [objective, gradient]
+#-------------------------------------------------------#
+# Function: fitPreview(...)                             #
+# Desct:    Fits the random feature GP-LVM.             #
+# Param:    Y_c             Compressed design [N x r]   #
+#           output_dim      Uncompressed output dim. D  #
+#           input_dim       Latent dimension            #
+#           nrFeatures      Random frequencies R        #
+#           iterations      Maximum iterations          #
+#           seed            Seed of the frequencies     #
+# Return:   dict of parameters (see getWarmStart) and   #
+#           log likelihood                              #
+#-------------------------------------------------------#
+def fitPreview(Y_c, output_dim, input_dim, nrFeatures=100, iterations=300, seed=0):
+    start = time.time()
+    random = np.random.RandomState(seed)
+    W = random.normal(0, 1, (nrFeatures, input_dim))
+    X, lengthscale = getLatentInit(Y_c, input_dim)
+    params = np.concatenate((X.ravel(), np.log(lengthscale), [0.0, 0.0]))  #Kernel and noise variance 1 (GPy defaults)
+    result = minimize(previewObjective, params, args=(Y_c, output_dim, W), jac=True, method="L-BFGS-B", options={"maxiter": iterations})
+    X, lengthscale, variance, noise = unpackParams(result.x, Y_c.shape[0], input_dim)
+    order = np.argsort(lengthscale)                         #Most relevant dimension first
+    print("          Preview: %d features, %d iterations, log lik. %f, %.1f s (%s)" % (nrFeatures, result.nit, -result.fun, time.time()-start, result.message))
+    return {"mean":         X[:,order],
+            "variance":     random.uniform(0, .1, X.shape),  #Initial latent variance of GPy
+            "Z":            np.zeros((0, input_dim)),       #Inducing inputs are drawn from the latent means
+            "lengthscale":  lengthscale[order],
+            "kern_variance":float(variance),
+            "noise":        float(noise),
+            "loglik":       float(-result.fun)}
+#-------------------------------------------------------#
+# Function: getPreviewModel(...)                        #
+# Desct:    Creates an exact Bayesian GP-LVM from the   #
+#           preview (not optimized).                    #
+# Param:    design          Scaled (or compressed) data #
+#           output_dim      Output dimension of the data#
+#           num_inducing    Number of inducing points   #
+#           preview         Preview (fitPreview)        #
+#           compress        design is compressed        #
+# Return:   model                                       #
+#-------------------------------------------------------#
+def getPreviewModel(design, output_dim, num_inducing, preview, compress=False):
+    model_LVM = buildBGPLVM(design, output_dim, preview["mean"].shape[1], num_inducing, compress)
+    applyWarmStart(model_LVM, preview)
+    return model_LVM
+#-------------------------------------------------------#
+# Function: savePreview(...)                            #
+# Desct:    Stores a preview with the design key.       #
+# Param:    path_preview    Path to the *.npz file      #
+#                           ("" = not stored)           #
+#           design          Scaled design (key)         #
+#           preview         Preview (fitPreview)        #
+# Return:   -                                           #
+#-------------------------------------------------------#
+def savePreview(path_preview, design, preview):
+    if(path_preview == ""):
+        return
+    folder = os.path.dirname(path_preview)
+    if((folder != "") and (not os.path.isdir(folder))):
+        os.makedirs(folder)
+    np.savez(path_preview, key=np.array(getDesignKey(design)), **preview)
+#-------------------------------------------------------#
+# Function: loadPreview(...)                            #
+# Desct:    Loads a stored preview of the design.       #
+# Param:    path_preview    Path to the *.npz file      #
+#           design          Scaled design (key)         #
+# Return:   dict or None if missing/not matching        #
+#-------------------------------------------------------#
+def loadPreview(path_preview, design):
+    if((path_preview == "") or (not os.path.isfile(path_preview))):
+        return None
+    data = np.load(path_preview)
+    if(str(data['key']) != getDesignKey(design)):
+        return None
+    preview = {key: data[key] for key in ["mean", "variance", "Z", "lengthscale"]}
+    preview.update({key: float(data[key]) for key in ["kern_variance", "noise", "loglik"]})
+    return preview
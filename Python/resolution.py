@@ -0,0 +1,92 @@
+# The resolution.py script implements the multi-resolution handling of
+# the flattened image design. Images are downsampled by block averaging
+# (factor 2: 112x112, factor 4: 56x56), which reduces the number of
+# GP-LVM outputs by factor^2. The model sweeps can run on the reduced
+# design, while the final model uses the full resolution. Heatmaps of
+# reduced models are upsampled to the full image size for comparison.
+#
+# This code is available under a GPL v3.0 license and comes without
+# any explicit or implicit warranty.
+#
+# (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
+import numpy as np                      #You should know that
+from designScaler import getScaler, scaleDesign     #Standardization per resolution
+chunk_rows = 256                        #Rows per downsampling step
+#-------------------------------------------------------#
+# Function: getResolutionDim(...)                       #
+# Desct:    Returns the image dimension of a factor.    #
+# Param:    imgDim          Full image dim. (rows, cols)#
+#           factor          Downsampling factor         #
+# Return:   (rows, cols)                                #
+#-------------------------------------------------------#
+def getResolutionDim(imgDim, factor):
+    if((imgDim[0] % factor != 0) or (imgDim[1] % factor != 0)):
+        raise Exception("resolution: factor %d does not divide image dimension %s" % (factor, str(imgDim)))
+    return (imgDim[0]//factor, imgDim[1]//factor)
+#-------------------------------------------------------#
+# Function: downsampleDesign(...)                       #
+# Desct:    Downsamples each flattened image by block   #
+#           averaging.                                  #
+# Param:    design          [N x rows*cols] design      #
+#           imgDim          Full image dim. (rows, cols)#
+#           factor          Downsampling factor         #
+# Return:   [N x rows*cols/factor^2] design             #
+#-------------------------------------------------------#
+def downsampleDesign(design, imgDim, factor, chunkRows=chunk_rows):
+    if(factor == 1):
+        return design
+    lowDim = getResolutionDim(imgDim, factor)
+    dtype = design.dtype if(np.issubdtype(design.dtype, np.floating)) else np.float64
+    design_low = np.empty((design.shape[0], lowDim[0]*lowDim[1]), dtype=dtype)
+    for start in range(0, design.shape[0], chunkRows):
+        chunk = np.asarray(design[start:(start+chunkRows),:], dtype=dtype)
+        chunk = chunk.reshape((-1, lowDim[0], factor, lowDim[1], factor))
+        design_low[start:(start+chunkRows),:] = chunk.mean(axis=(2,4)).reshape((-1, lowDim[0]*lowDim[1]))
+    return design_low
+#-------------------------------------------------------#
+# Function: downsampleMask(...)                         #
+# Desct:    Downsamples a pixel mask. A block is used if#
+#           any of its pixels is used.                  #
+# Param:    mask            Boolean pixel mask (or None)#
+#           imgDim          Full image dim. (rows, cols)#
+#           factor          Downsampling factor         #
+# Return:   boolean mask (or None)                      #
+#-------------------------------------------------------#
+def downsampleMask(mask, imgDim, factor):
+    if((mask is None) or (factor == 1)):
+        return mask
+    lowDim = getResolutionDim(imgDim, factor)
+    return mask.reshape((lowDim[0], factor, lowDim[1], factor)).any(axis=(1,3)).reshape((-1,))
+#-------------------------------------------------------#
+# Function: upsampleImage(...)                          #
+# Desct:    Upsamples a (flattened) image to the full   #
+#           image dimension by block replication.       #
+# Param:    img             Image or flattened image    #
+#           imgDim          Full image dim. (rows, cols)#
+#           factor          Downsampling factor of img  #
+# Return:   image [rows x cols]                         #
+#-------------------------------------------------------#
+def upsampleImage(img, imgDim, factor):
+    lowDim = getResolutionDim(imgDim, factor)
+    img = np.reshape(img, lowDim)
+    if(factor == 1):
+        return img
+    return np.repeat(np.repeat(img, factor, axis=0), factor, axis=1)
+#-------------------------------------------------------#
+# Function: getResolutionDesign(...)                    #
+# Desct:    Returns the scaled (and masked) design of a #
+#           reduced resolution. The low resolution data #
+#           is standardized with its own scaler.        #
+# Param:    design_raw      Raw full resolution design  #
+#           imgDim          Full image dim. (rows, cols)#
+#           factor          Downsampling factor         #
+#           mask            Full resolution pixel mask  #
+#           path_scaler     Stored scaler of this       #
+#                           resolution ("" = not stored)#
+# Return:   [scaled design, low resolution mask]        #
+#-------------------------------------------------------#
+def getResolutionDesign(design_raw, imgDim, factor, mask=None, path_scaler=""):
+    design_low = downsampleDesign(design_raw, imgDim, factor)
+    mask_low = downsampleMask(mask, imgDim, factor)
+    scaler = getScaler(design_low, path_scaler)
+    return [scaleDesign(design_low, scaler, inPlace=(factor != 1) and (mask_low is None), mask=mask_low), mask_low]
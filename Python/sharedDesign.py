@@ -0,0 +1,175 @@
+# The sharedDesign.py script implements a small dataset server for
+# multi-process GP-LVM workloads. The (scaled) design matrix is copied
+# once into a multiprocessing shared memory block. Worker processes
+# attach to this block by name, thus memory stays flat with the number
+# of workers and workers start without re-reading or re-scaling files.
+# The runPool function distributes tasks over such workers and limits
+# the number of BLAS threads per worker.
+# Note: multiprocessing.shared_memory requires Python >= 3.8. It is
+# imported when a pool starts; older Python versions share the design
+# as read-only np.memmap of a temporary file instead.
+#
+# This code is available under a GPL v3.0 license and comes without
+# any explicit or implicit warranty.
+#
+# (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
+import os                               #Environment variables
+import multiprocessing                  #Worker processes
+import tempfile                         #Memmap fallback (Python < 3.8)
+import numpy as np                      #You should know that
+chunk_rows = 256                        #Rows per copy step
+#---------------------------------#
+#--- Shared design data server ---#
+#---------------------------------#
+class SharedDesign:
+    #---------------------------------------------------#
+    # Name: Constructor                                 #
+    # Descr: Copies the design into shared memory (or a #
+    #       temporary memmap file, Python < 3.8).       #
+    # Param: design         Design matrix               #
+    # Return: -                                         #
+    #---------------------------------------------------#
+    def __init__(self, design):
+        self.shape = tuple(design.shape)
+        self.dtype = np.dtype(design.dtype)
+        self.shm, self.path = None, None
+        try:
+            from multiprocessing import shared_memory  #Python >= 3.8
+            self.shm = shared_memory.SharedMemory(create=True, size=max(1,int(np.prod(self.shape))*self.dtype.itemsize))
+            self.design = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+            self.name = self.shm.name
+        except ImportError:
+            fd, self.path = tempfile.mkstemp(suffix=".design")
+            os.close(fd)
+            self.design = np.memmap(self.path, dtype=self.dtype, mode='w+', shape=self.shape)
+            self.name = self.path
+        for start in range(0, self.shape[0], chunk_rows):                          #Copy chunkwise (memmap friendly)
+            self.design[start:(start+chunk_rows)] = design[start:(start+chunk_rows)]
+        if(self.path is not None):
+            self.design.flush()
+    #---------------------------------------------------#
+    # Name: spec()                                      #
+    # Descr: Returns the data needed to attach to the   #
+    #       shared design.                              #
+    # Return: (kind, name, shape, dtype string)         #
+    #---------------------------------------------------#
+    def spec(self):
+        return ("memmap" if(self.path is not None) else "shm", self.name, self.shape, self.dtype.str)
+    #---------------------------------------------------#
+    # Name: close()                                     #
+    # Descr: Releases and removes the shared memory (or #
+    #       the memmap file).                           #
+    # Return: -                                         #
+    #---------------------------------------------------#
+    def close(self):
+        self.design = None
+        if(self.shm is not None):
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+        if(self.path is not None):
+            os.remove(self.path)
+            self.path = None
+    def __enter__(self):
+        return self
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+#-------------------------------------------------------#
+# Function: attachDesign(...)                           #
+# Desct:    Attaches to a shared design by name.        #
+# Param:    spec            (kind, name, shape, dtype   #
+#                           string)                     #
+# Return:   [shared memory handle (None: memmap), view] #
+#-------------------------------------------------------#
+def attachDesign(spec):
+    kind, name, shape, dtype = spec
+    if(kind == "memmap"):
+        return [None, np.memmap(name, dtype=np.dtype(dtype), mode='r', shape=shape)]
+    from multiprocessing import shared_memory      #Python >= 3.8
+    shm = shared_memory.SharedMemory(name=name)
+    design = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    design.flags.writeable = False          #Workers must not change the shared data
+    return [shm, design]
+#--------------------#
+#--- Worker pools ---#
+#--------------------#
+worker_shm      = None                  #Shared memory handle of this worker
+worker_design   = None                  #Shared design of this worker
+worker_threads  = None                  #Thread pool limiter of this worker
+#-------------------------------------------------------#
+# Function: limitThreads(...)                           #
+# Desct:    Limits the number of BLAS/OpenMP threads of #
+#           the current process.                        #
+# Param:    nrThreads       Number of threads           #
+# Return:   limiter (or None)                           #
+#-------------------------------------------------------#
+def limitThreads(nrThreads):
+    for var in ["OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS"]:
+        os.environ[var] = str(nrThreads)    #Used by libraries loaded after this call
+    try:
+        from threadpoolctl import threadpool_limits     #Already loaded libraries (optional)
+        return threadpool_limits(limits=nrThreads)
+    except ImportError:
+        return None
+#-------------------------------------------------------#
+# Function: getThreads(...)                             #
+# Desct:    Returns the BLAS threads per worker.        #
+# Param:    nrWorkers       Number of processes         #
+#           nrThreads       Threads (None: CPUs/workers)#
+# Return:   threads per worker                          #
+#-------------------------------------------------------#
+def getThreads(nrWorkers, nrThreads=None):
+    if(nrThreads is None):
+        nrThreads = max(1, multiprocessing.cpu_count()//nrWorkers)
+    return nrThreads
+#-------------------------------------------------------#
+# Function: initWorker(...)                             #
+# Desct:    Pool initializer, attaches the worker to the#
+#           shared design and limits its threads.       #
+# Param:    spec            Shared design spec (or None)#
+#           nrThreads       BLAS threads per worker     #
+# Return:   -                                           #
+#-------------------------------------------------------#
+def initWorker(spec, nrThreads):
+    global worker_shm, worker_design, worker_threads
+    if(nrThreads is not None):
+        worker_threads = limitThreads(nrThreads)
+    if(spec is not None):
+        worker_shm, worker_design = attachDesign(spec)
+#-------------------------------------------------------#
+# Function: getWorkerDesign()                           #
+# Desct:    Returns the shared design of a worker.      #
+# Return:   design view                                 #
+#-------------------------------------------------------#
+def getWorkerDesign():
+    return worker_design
+#-------------------------------------------------------#
+# Function: runPool(...)                                #
+# Desct:    Runs function(task) for all tasks in worker #
+#           processes attached to the shared design.    #
+#           The results are yielded in completion order.#
+# Param:    function        Module level worker function#
+#           tasks           List of task arguments      #
+#           design          Design matrix to be shared  #
+#                           (None: no shared design)    #
+#           nrWorkers       Number of processes         #
+#           nrThreads       BLAS threads per worker     #
+# Return:   generator of results                        #
+#-------------------------------------------------------#
+def runPool(function, tasks, design=None, nrWorkers=None, nrThreads=1):
+    if(nrWorkers is None):
+        nrWorkers = multiprocessing.cpu_count()
+    nrWorkers = max(1,min(nrWorkers, len(tasks)))
+    shared = SharedDesign(design) if(design is not None) else None
+    try:
+        pool = multiprocessing.Pool(nrWorkers, initializer=initWorker,
+                                    initargs=(shared.spec() if(shared is not None) else None, nrThreads))
+        try:
+            for result in pool.imap_unordered(function, tasks):
+                yield result
+        finally:
+            pool.terminate()
+            pool.join()
+    finally:
+        if(shared is not None):
+            shared.close()
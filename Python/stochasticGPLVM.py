@@ -0,0 +1,363 @@
+# The stochasticGPLVM.py script implements the mini-batch (stochastic
+# variational) training of the Bayesian GP-LVM. The collapsed bound of
+# GPy needs all specimens in each iteration. Here, the inducing outputs
+# get an explicit Gaussian q(U) (mean [M x D], shared covariance [M x M])
+# and the bound becomes a sum over the specimens. Each step uses a batch
+# of specimens only:
+#   - q(U) is updated by a natural gradient step (closed form for the
+#     Gaussian likelihood),
+#   - the latent distributions of the batch and the global parameters
+#     (inducing inputs, RBF kernel and noise variance) by Adam steps.
+# The step sizes follow the schedule rate*(1+step/delay)^-forgetting.
+# The memory of a step is O(B M^2 + B D) for a batch of B specimens and
+# the runtime of a step does not depend on the number of specimens. The
+# model is a GPy BayesianGPLVM before and after the training, thus the
+# trained parameters are used as the ones of the full-batch optimization
+# (collapsed bound, infer_newX, checkpoints).
+#
+# This code is available under a GPL v3.0 license and comes without
+# any explicit or implicit warranty.
+#
+# (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
+import time                             #Throughput
+import numpy as np                      #You should know that
+from scipy.linalg import cho_factor, cho_solve  #Kernel matrix inverse
+from GPy.kern.src.psi_comp import rbf_psi_comp  #psi statistics of the RBF kernel
+jitter = 1e-6                           #Added to the diagonal of K_uu
+#-------------------------------------------------------#
+# Function: getStochasticSettings(...)                  #
+# Desct:    Settings of the mini-batch training.        #
+# Param:    batchSize       Specimens per step          #
+#           learningRate    Initial Adam step size      #
+#           naturalRate     Initial natural gradient    #
+#                           step of q(U)                #
+#           delay           Steps till the rates are    #
+#                           halved (forgetting = 1)     #
+#           forgetting      Decay exponent of the rates #
+#           tolerance       Relative change of the epoch#
+#                           bound for convergence       #
+#           seed            Seed of the batch order     #
+# Return:   dict of settings                            #
+#-------------------------------------------------------#
+def getStochasticSettings(batchSize=256, learningRate=0.05, naturalRate=0.5, delay=1000, forgetting=0.6, tolerance=1e-5, seed=0):
+    return {"batchSize":    batchSize,
+            "learningRate": learningRate,
+            "naturalRate":  naturalRate,
+            "delay":        delay,
+            "forgetting":   forgetting,
+            "tolerance":    tolerance,
+            "seed":         seed}
+#-------------------------------------------------------#
+# Function: getBatchSize(...)                           #
+# Desct:    Batch size of the settings (0: full batch). #
+# Param:    stochastic      Settings or None            #
+# Return:   batch size                                  #
+#-------------------------------------------------------#
+def getBatchSize(stochastic):
+    return 0 if(stochastic is None) else int(stochastic["batchSize"])
+#-------------------------------------------------------#
+# Function: getRate(...)                                #
+# Desct:    Step size schedule (Robbins-Monro).         #
+# Param:    rate            Initial step size           #
+#           step            Step number                 #
+#           stochastic      Settings                    #
+# Return:   step size                                   #
+#-------------------------------------------------------#
+def getRate(rate, step, stochastic):
+    return rate*(1.+step/float(stochastic["delay"]))**(-stochastic["forgetting"])
+#-------------------------------#
+#--- Optimizer run (GPy API) ---#
+#-------------------------------#
+class StochasticRun(object):
+    #---------------------------------------------------#
+    # Name: Constructor                                 #
+    # Descr: Result of a mini-batch training, used like #
+    #       the optimizer runs of GPy.                  #
+    # Param: status         Optimizer status            #
+    #        funct_eval     Number of steps             #
+    #        f_opt          Negative bound (estimate)   #
+    #        time           Runtime [s]                 #
+    # Return: -                                         #
+    #---------------------------------------------------#
+    def __init__(self, status, funct_eval, f_opt, time):
+        self.status     = status
+        self.funct_eval = funct_eval
+        self.nit        = funct_eval        #Iterations are the steps
+        self.f_opt      = f_opt
+        self.time       = time
+#--------------------------#
+#--- Parameter handling ---#
+#--------------------------#
+#-------------------------------------------------------#
+# Function: getState(...)                               #
+# Desct:    Copies the parameters of a BayesianGPLVM,   #
+#           positive ones in log space.                 #
+# Param:    model           BayesianGPLVM (RBF kernel)  #
+# Return:   dict of parameters                          #
+#-------------------------------------------------------#
+def getState(model):
+    return {"mean":         model.X.mean.values.copy(),
+            "log_S":        np.log(model.X.variance.values),
+            "Z":            model.Z.values.copy(),
+            "log_variance": np.log(model.kern.variance.values.copy()),
+            "log_lengthscale": np.log(model.kern.lengthscale.values.copy()),
+            "log_noise":    np.log(model.likelihood.variance.values.copy())}
+#-------------------------------------------------------#
+# Function: setState(...)                               #
+# Desct:    Sets the parameters of a BayesianGPLVM (one #
+#           update of the model).                       #
+# Param:    model           BayesianGPLVM (RBF kernel)  #
+#           state           dict of parameters          #
+# Return:   -                                           #
+#-------------------------------------------------------#
+def setState(model, state):
+    model[:] = np.concatenate((state["mean"].ravel(), np.exp(state["log_S"]).ravel(), state["Z"].ravel(),     #Layout of the param_array
+                               np.exp(state["log_variance"]), np.exp(state["log_lengthscale"]), np.exp(state["log_noise"])))
+#-------------------------------------------------------#
+# Function: getOutputDim(...)                           #
+# Desct:    Output dimension of the bound (the one of   #
+#           the uncompressed data for compressed models)#
+# Param:    model           BayesianGPLVM               #
+# Return:   output dimension                            #
+#-------------------------------------------------------#
+def getOutputDim(model):
+    return getattr(model.inference_method, "output_dim", model.Y.shape[1])
+#---------------------------#
+#--- Kernel computations ---#
+#---------------------------#
+#-------------------------------------------------------#
+# Function: getKuu(...)                                 #
+# Desct:    RBF kernel matrix of the inducing inputs.   #
+# Param:    Z               Inducing inputs [M x Q]     #
+#           variance        Kernel variance             #
+#           lengthscale     ARD lengthscales [Q]        #
+# Return:   [K_uu, K_uu without jitter]                 #
+#-------------------------------------------------------#
+def getKuu(Z, variance, lengthscale):
+    Zs = Z/lengthscale
+    dist = np.sum(Zs**2, 1)[:,None] + np.sum(Zs**2, 1)[None,:] - 2*Zs.dot(Zs.T)
+    K = variance*np.exp(-0.5*np.fmax(dist, 0.0))
+    return [K + jitter*np.eye(Z.shape[0]), K]
+#-------------------------------------------------------#
+# Function: gradKuu(...)                                #
+# Desct:    Gradients of the RBF kernel matrix.         #
+# Param:    dL_dK           Gradient w.r.t. K_uu        #
+#           K               K_uu without jitter         #
+#           Z               Inducing inputs [M x Q]     #
+#           variance        Kernel variance             #
+#           lengthscale     ARD lengthscales [Q]        #
+# Return:   [dL_dvariance, dL_dlengthscale, dL_dZ]      #
+#-------------------------------------------------------#
+def gradKuu(dL_dK, K, Z, variance, lengthscale):
+    GK = 0.5*(dL_dK+dL_dK.T)*K
+    dL_dvariance = np.sum(GK)/variance
+    sum_GK = np.sum(GK, 1)
+    dL_dlengthscale = (2*(Z.T**2).dot(sum_GK) - 2*np.sum(Z.T.dot(GK)*Z.T, 1))/lengthscale**3    #sum_ij GK_ij (z_i-z_j)^2 / l^3
+    dL_dZ = -2*(sum_GK[:,None]*Z - GK.dot(Z))/lengthscale**2
+    return [dL_dvariance, dL_dlengthscale, dL_dZ]
+class BatchPosterior(object):
+    #---------------------------------------------------#
+    # Name: Constructor                                 #
+    # Descr: Latent distribution of a batch (interface  #
+    #       of the GPy psi statistics).                 #
+    # Param: mean, variance [B x Q]                     #
+    # Return: -                                         #
+    #---------------------------------------------------#
+    def __init__(self, mean, variance):
+        self.mean       = mean
+        self.variance   = variance
+#-------------------------------------------------------#
+# Function: getPsi(...)                                 #
+# Desct:    psi statistics of a batch.                  #
+# Param:    state           dict of parameters          #
+#           index           Specimens of the batch      #
+# Return:   [psi0 [B], psi1 [B x M], psi2 [M x M], q(X)]#
+#-------------------------------------------------------#
+def getPsi(state, index):
+    qX = BatchPosterior(state["mean"][index], np.exp(state["log_S"][index]))
+    return rbf_psi_comp.psicomputations(np.exp(state["log_variance"]), np.exp(state["log_lengthscale"]), state["Z"], qX)+(qX,)
+#-----------------------------#
+#--- Inducing outputs q(U) ---#
+#-----------------------------#
+#-------------------------------------------------------#
+# Function: getOptimalQU(...)                           #
+# Desct:    Optimal q(U) of all specimens, computed in  #
+#           batches (natural parameters).               #
+# Param:    state           dict of parameters          #
+#           Y               Data [N x r]                #
+#           batchSize       Specimens per batch         #
+# Return:   [precision [M x M], precision*mean [M x r]] #
+#-------------------------------------------------------#
+def getOptimalQU(state, Y, batchSize):
+    Kuu, _ = getKuu(state["Z"], np.exp(state["log_variance"]), np.exp(state["log_lengthscale"]))
+    A = cho_solve(cho_factor(Kuu), np.eye(Kuu.shape[0]))
+    beta = np.exp(-state["log_noise"][0])
+    psi2 = np.zeros(Kuu.shape)
+    psi1Y = np.zeros((Kuu.shape[0], Y.shape[1]))
+    for start in range(0, Y.shape[0], batchSize):
+        index = np.arange(start, min(start+batchSize, Y.shape[0]))
+        _, psi1_b, psi2_b, _ = getPsi(state, index)
+        psi2 += psi2_b
+        psi1Y += psi1_b.T.dot(np.asarray(Y[index], dtype=np.float64))
+    return [A + beta*A.dot(psi2).dot(A), beta*A.dot(psi1Y)]
+#-------------------------------------------------------#
+# Function: getQU(...)                                  #
+# Desct:    Mean and covariance of q(U) from the natural#
+#           parameters.                                 #
+# Param:    precision       [M x M]                     #
+#           theta           precision*mean [M x r]      #
+# Return:   [mean [M x r], covariance [M x M]]          #
+#-------------------------------------------------------#
+def getQU(precision, theta):
+    factor = cho_factor(precision)
+    return [cho_solve(factor, theta), cho_solve(factor, np.eye(precision.shape[0]))]
+#---------------------------#
+#--- Bound and gradients ---#
+#---------------------------#
+#-------------------------------------------------------#
+# Function: batchGradients(...)                         #
+# Desct:    Bound estimate of a batch and its gradients.#
+#           Global gradients are scaled by N/B, local   #
+#           ones are the gradients of the full bound.   #
+# Param:    state           dict of parameters          #
+#           Y_b             Batch data [B x r]          #
+#           index           Specimens of the batch      #
+#           N               Number of specimens         #
+#           D               Output dim. of the bound    #
+#           mean_u, S_u     q(U)                        #
+# Return:   [bound, gradients, natural parameters of the#
+#           batch optimum of q(U)]                      #
+#-------------------------------------------------------#
+def batchGradients(state, Y_b, index, N, D, mean_u, S_u):
+    B = Y_b.shape[0]
+    scale = N/float(B)
+    variance, lengthscale = np.exp(state["log_variance"]), np.exp(state["log_lengthscale"])
+    beta = np.exp(-state["log_noise"][0])
+    Kuu, K = getKuu(state["Z"], variance, lengthscale)
+    factor = cho_factor(Kuu)
+    A = cho_solve(factor, np.eye(Kuu.shape[0]))
+    psi0, psi1, psi2, qX = getPsi(state, index)
+    #--- Expected log likelihood of the batch ---#
+    A_mean = A.dot(mean_u)                                  #K_uu^-1 M_u
+    P = mean_u.dot(mean_u.T) + D*S_u                        #E[U U^T] summed over all D outputs
+    APA = A.dot(P).dot(A)
+    psi1Y = psi1.T.dot(Y_b)
+    error = np.sum(Y_b**2) - 2*np.sum(psi1Y*A_mean) + np.sum(APA*psi2) + D*np.sum(psi0) - D*np.sum(A*psi2)
+    logLik = -0.5*B*D*np.log(2*np.pi/beta) - 0.5*beta*error
+    #--- KL divergences ---#
+    S_x = np.exp(state["log_S"][index])
+    KL_x = 0.5*np.sum(S_x + qX.mean**2 - 1 - np.log(S_x))
+    logdet_Kuu = 2*np.sum(np.log(np.diag(factor[0])))
+    KL_u = 0.5*(np.sum(A*P) - D*Kuu.shape[0] + D*logdet_Kuu - D*np.linalg.slogdet(S_u)[1])
+    bound = scale*(logLik - KL_x) - KL_u
+    #--- psi statistics gradients (one specimen) ---#
+    dL_dpsi0 = -0.5*beta*D*np.ones(B)
+    dL_dpsi1 = beta*Y_b.dot(A_mean.T)
+    dL_dpsi2 = -0.5*beta*(APA - D*A)
+    dvar_psi, dl_psi, dZ_psi, dmu, dS = rbf_psi_comp.psiDerivativecomputations(dL_dpsi0, dL_dpsi1, dL_dpsi2, variance, lengthscale, state["Z"], qX)
+    #--- K_uu gradients ---#
+    dL_dA = scale*beta*(psi1Y.dot(mean_u.T) - 0.5*(psi2.dot(A).dot(P) + P.dot(A).dot(psi2) - D*psi2)) - 0.5*(P - D*Kuu)
+    dL_dA = 0.5*(dL_dA+dL_dA.T)
+    dvar_K, dl_K, dZ_K = gradKuu(-A.dot(dL_dA).dot(A), K, state["Z"], variance, lengthscale)
+    #--- Gradients w.r.t. the (log) parameters ---#
+    dL_dbeta = scale*(0.5*B*D/beta - 0.5*error)
+    gradients = {"mean":            dmu - qX.mean,
+                 "log_S":           S_x*(dS - 0.5*(1 - 1/S_x)),
+                 "Z":               scale*dZ_psi + dZ_K,
+                 "log_variance":    np.atleast_1d(variance*(scale*dvar_psi + dvar_K)),
+                 "log_lengthscale": lengthscale*(scale*dl_psi + dl_K),
+                 "log_noise":       np.atleast_1d(-beta*dL_dbeta)}
+    natural = [A + scale*beta*A.dot(psi2).dot(A), scale*beta*A.dot(psi1Y)]
+    return [bound, gradients, natural]
+#----------------------#
+#--- Adam optimizer ---#
+#----------------------#
+#-------------------------------------------------------#
+# Function: adamStep(...)                               #
+# Desct:    Adam ascent step of (a part of) a parameter.#
+# Param:    values          Parameter values            #
+#           gradient        Gradient (ascent)           #
+#           moments         [1st, 2nd] moments          #
+#           counts          Steps of the values (bias   #
+#                           correction)                 #
+#           rate            Step size                   #
+# Return:   [values, moments]                           #
+#-------------------------------------------------------#
+def adamStep(values, gradient, moments, counts, rate, beta1=0.9, beta2=0.999, eps=1e-8):
+    first   = beta1*moments[0] + (1-beta1)*gradient
+    second  = beta2*moments[1] + (1-beta2)*gradient**2
+    step    = rate*(first/(1-beta1**counts))/(np.sqrt(second/(1-beta2**counts))+eps)
+    return [values+step, [first, second]]
+#-------------------------------------------------------#
+# Function: optimizeStochastic(...)                     #
+# Desct:    Mini-batch training of a BayesianGPLVM. The #
+#           trained parameters are set to the model.    #
+# Param:    model           BayesianGPLVM (RBF kernel,  #
+#                           optional compressed data)   #
+#           iterations      Maximum number of steps     #
+#           stochastic      Settings (see               #
+#                           getStochasticSettings)      #
+#           start           Steps done before (resumed  #
+#                           training, rate schedule)    #
+#           callback        Called as callback(model,   #
+#                           steps, seconds) every       #
+#                           interval seconds            #
+#           interval        Seconds between callbacks   #
+# Return:   optimizer run (StochasticRun)               #
+#-------------------------------------------------------#
+def optimizeStochastic(model, iterations, stochastic, start=0, callback=None, interval=600):
+    startTime = time.time()
+    Y = model.Y_normalized if(hasattr(model, "Y_normalized")) else model.Y
+    N, D = Y.shape[0], getOutputDim(model)
+    batchSize = min(getBatchSize(stochastic), N)
+    rng = np.random.RandomState(stochastic["seed"]+start)
+    state = getState(model)
+    precision, theta = getOptimalQU(state, Y, batchSize)   #q(U) of the initial parameters
+    mean_u, S_u = getQU(precision, theta)
+    moments = dict((name, [np.zeros_like(state[name]), np.zeros_like(state[name])]) for name in state)
+    counts  = np.zeros(N)                                   #Adam steps of each specimen
+    local   = ("mean", "log_S")
+    status  = "Maximum number of iterations reached"
+    epoch, epochBound, lastBound, saved = [], None, None, time.time()
+    order = rng.permutation(N)
+    position, steps = 0, 0
+    for step in range(start, iterations):
+        if(position+batchSize > N):                         #Next epoch
+            epochBound, epoch = np.mean(epoch), []
+            if((lastBound is not None) and (abs(epochBound-lastBound) < stochastic["tolerance"]*abs(lastBound))):
+                status = "Converged"
+                break
+            lastBound = epochBound
+            order, position = rng.permutation(N), 0
+        index = np.sort(order[position:(position+batchSize)])  #Sorted rows (memory mapped designs)
+        position = position+batchSize
+        bound, gradients, natural = batchGradients(state, np.asarray(Y[index], dtype=np.float64), index, N, D, mean_u, S_u)
+        epoch.append(bound)
+        steps = steps+1
+        #--- Natural gradient step of q(U) ---#
+        rho = getRate(stochastic["naturalRate"], step, stochastic)
+        precision = (1-rho)*precision + rho*natural[0]
+        theta = (1-rho)*theta + rho*natural[1]
+        mean_u, S_u = getQU(precision, theta)
+        #--- Adam steps: global parameters and latent distributions of the batch ---#
+        rate = getRate(stochastic["learningRate"], step, stochastic)
+        counts[index] += 1
+        for name in state:
+            if(name in local):
+                values, moments_b = adamStep(state[name][index], gradients[name], [moments[name][0][index], moments[name][1][index]], counts[index][:,None], rate)
+                state[name][index] = values
+                moments[name][0][index], moments[name][1][index] = moments_b
+            else:
+                state[name], moments[name] = adamStep(state[name], gradients[name], moments[name], step-start+1, rate)
+        if((callback is not None) and (time.time()-saved > interval)):
+            setState(model, state)
+            callback(model, step+1, time.time()-startTime)
+            saved = time.time()
+    seconds = time.time()-startTime
+    if(epochBound is None):
+        epochBound = np.mean(epoch) if(steps != 0) else np.nan     #Less than one epoch
+    print("          Mini-batch training: %s, %d steps of %d specimens, %.0f specimens/s, bound estimate %f" % (status, steps, batchSize, steps*batchSize/max(seconds, 1e-9), epochBound))
+    setState(model, state)
+    run = StochasticRun(status, start+steps, -model.log_likelihood()[0,0], seconds)
+    model.optimization_runs.append(run)
+    return run
@@ -0,0 +1,228 @@
+# The telemetry.py script implements the optimization telemetry of the
+# GP-LVM and GPC fits. The objective function of a GPy model is wrapped
+# by a callback, which counts the evaluations and keeps the objective
+# (negative log likelihood) and the gradient norm. Running fits write a
+# progress record periodically, finished fits a fit record with the
+# termination status and the iterations of the optimizer (nit of the
+# optimizer run, evaluations are stored separately). Records are JSON
+# lines, appended to the telemetry file of the experiment (one write per
+# line, thus worker processes can share the file). The file is set by
+# setTelemetry() and inherited by worker processes (environment
+# variable). summarizeTelemetry() lists the slowest fits and the fits
+# which reached the iteration limit.
+#
+# This code is available under a GPL v3.0 license and comes without
+# any explicit or implicit warranty.
+#
+# (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
+import os                               #File handling, environment variables
+import json                             #JSON lines
+import time                             #Wall time
+import numpy as np                      #You should know that
+telemetry_env       = "GPLVM_TELEMETRY" #Environment variable of the telemetry file
+telemetry_interval  = 30                #Seconds between progress records of a running fit
+#-------------------------------------------------------#
+# Function: setTelemetry(...)                           #
+# Desct:    Sets the telemetry file of this process and #
+#           its worker processes.                       #
+# Param:    path_telemetry  Path to the *.jsonl file    #
+#                           ("" = no telemetry)         #
+# Return:   -                                           #
+#-------------------------------------------------------#
+def setTelemetry(path_telemetry):
+    os.environ[telemetry_env] = os.path.abspath(path_telemetry) if(path_telemetry != "") else ""
+#-------------------------------------------------------#
+# Function: getTelemetryPath()                          #
+# Desct:    Returns the telemetry file.                 #
+# Return:   path ("" = no telemetry)                    #
+#-------------------------------------------------------#
+def getTelemetryPath():
+    return os.environ.get(telemetry_env, "")
+#-------------------------------------------------------#
+# Function: isCapped(...)                               #
+# Desct:    Checks if a fit stopped at the iteration    #
+#           limit (L-BFGS-B and mini-batch: "Maximum    #
+#           number ...", SCG: "maxiter exceeded").      #
+# Param:    status          Optimizer status            #
+# Return:   bool                                        #
+#-------------------------------------------------------#
+def isCapped(status):
+    return status.startswith("Maximum number") or (status == "maxiter exceeded")
+#-------------------------------------------------------#
+# Function: writeRecord(...)                            #
+# Desct:    Appends a record as JSON line.              #
+# Param:    path_telemetry  Path to the *.jsonl file    #
+#           record          dict                        #
+# Return:   -                                           #
+#-------------------------------------------------------#
+def writeRecord(path_telemetry, record):
+    fd = os.open(path_telemetry, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, (json.dumps(record)+"\n").encode())
+    finally:
+        os.close(fd)
+#-------------------------------------------------------#
+# Function: getModelInfo(...)                           #
+# Desct:    Size of a GPy model.                        #
+# Param:    model           GPy model                   #
+# Return:   dict                                        #
+#-------------------------------------------------------#
+def getModelInfo(model):
+    info = {"model": model.__class__.__name__, "parameters": int(model.optimizer_array.size)}
+    if(hasattr(model, "Y")):
+        info["samples"] = int(model.Y.shape[0])
+    if(hasattr(model, "Z")):
+        info["input_dim"], info["num_inducing"] = int(model.Z.shape[1]), int(model.Z.shape[0])
+    return info
+#---------------------#
+#--- Fit telemetry ---#
+#---------------------#
+class FitTelemetry:
+    #---------------------------------------------------#
+    # Name: Constructor                                 #
+    # Descr: Inits the telemetry of one fit.            #
+    # Param: path_telemetry Path to the *.jsonl file    #
+    #        info           dict of the fit (name, ...) #
+    #        interval       Seconds between progress    #
+    #                       records                     #
+    # Return: -                                         #
+    #---------------------------------------------------#
+    def __init__(self, path_telemetry, info, interval=telemetry_interval):
+        self.path_telemetry = path_telemetry
+        self.info           = dict(info, pid=os.getpid(), started=time.strftime("%Y-%m-%d %H:%M:%S"))
+        self.interval       = interval
+        self.start          = time.time()
+        self.evaluations    = 0
+        self.iterations     = None              #Known after the fit (optimizer run)
+        self.objective      = None
+        self.gradient_norm  = None
+        self.written        = [self.start, 0]   #Time and evaluations of the last progress record
+    #---------------------------------------------------#
+    # Name: __call__(...)                               #
+    # Descr: Callback of each objective evaluation.     #
+    # Param: objective      Objective value             #
+    #        gradient       Objective gradient          #
+    # Return: -                                         #
+    #---------------------------------------------------#
+    def __call__(self, objective, gradient):
+        self.evaluations    = self.evaluations+1
+        self.objective      = float(objective)
+        self.gradient_norm  = float(np.linalg.norm(gradient))
+        now = time.time()
+        if(now-self.written[0] > self.interval):
+            self.write("progress", seconds_per_evaluation=(now-self.written[0])/(self.evaluations-self.written[1]))
+            self.written = [now, self.evaluations]
+    #---------------------------------------------------#
+    # Name: write(...)                                  #
+    # Descr: Writes a record of the fit.                #
+    # Param: kind           "progress" or "fit"         #
+    #        **fields       Additional fields           #
+    # Return: -                                         #
+    #---------------------------------------------------#
+    def write(self, kind, **fields):
+        record = dict(self.info, record=kind, iterations=self.iterations, evaluations=self.evaluations, objective=self.objective,
+                      gradient_norm=self.gradient_norm, seconds=time.time()-self.start)
+        record.update(fields)
+        writeRecord(self.path_telemetry, record)
+    #---------------------------------------------------#
+    # Name: finish(...)                                 #
+    # Descr: Writes the fit record.                     #
+    # Param: status         Termination status          #
+    #        run            Optimizer run (or None)     #
+    # Return: -                                         #
+    #---------------------------------------------------#
+    def finish(self, status, run=None):
+        if((self.evaluations == 0) and (run is not None)):     #Optimizers without objective callback (mini-batch)
+            self.evaluations, self.objective = int(run.funct_eval), float(run.f_opt)
+        if((run is not None) and hasattr(run, "nit")):
+            self.iterations = int(run.nit)
+        seconds = time.time()-self.start
+        self.write("fit", status=status, capped=isCapped(status),
+                   seconds_per_iteration=seconds/max(1, self.iterations) if(self.iterations is not None) else None,
+                   seconds_per_evaluation=seconds/max(1, self.evaluations))
+#-------------------------------------------------------#
+# Function: optimizeWatched(...)                        #
+# Desct:    Runs an optimization with telemetry. The    #
+#           objective of the model is wrapped while the #
+#           optimization runs.                          #
+# Param:    model           GPy model                   #
+#           optimize        Function running the        #
+#                           optimization, returns the   #
+#                           optimizer run               #
+#           info            dict of the fit (name, ...) #
+#                           (None: model size only)     #
+# Return:   optimizer run                               #
+#-------------------------------------------------------#
+def optimizeWatched(model, optimize, info=None):
+    path_telemetry = getTelemetryPath()
+    if(path_telemetry == ""):
+        return optimize()
+    telemetry = FitTelemetry(path_telemetry, dict(getModelInfo(model), **(info if(info is not None) else {})))
+    wrapped = "_objective_grads" in model.__dict__     #Objective of an outer wrapper
+    objective = model._objective_grads
+    def objectiveWatched(x):
+        result = objective(x)
+        telemetry(result[0], result[1])
+        return result
+    model._objective_grads = objectiveWatched
+    try:
+        model_return = optimize()
+    except BaseException as error:
+        telemetry.finish("Exception %s" % type(error).__name__)
+        raise
+    finally:
+        if(wrapped):
+            model._objective_grads = objective
+        else:
+            del model._objective_grads      #Restore the class method
+    telemetry.finish(model_return.status, model_return)
+    return model_return
+#---------------#
+#--- Summary ---#
+#---------------#
+#-------------------------------------------------------#
+# Function: loadTelemetry(...)                          #
+# Desct:    Loads the fit records of a telemetry file.  #
+# Param:    path_telemetry  Path to the *.jsonl file    #
+# Return:   list of dicts                               #
+#-------------------------------------------------------#
+def loadTelemetry(path_telemetry):
+    fits = []
+    with open(path_telemetry) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue                    #Line of a killed process
+            if(record.get("record") == "fit"):
+                fits.append(record)
+    return fits
+#-------------------------------------------------------#
+# Function: summarizeTelemetry(...)                     #
+# Desct:    Prints the slowest fits, the fits at the    #
+#           iteration limit and the time per status.    #
+# Param:    path_telemetry  Path to the *.jsonl file    #
+#           nrFits          Number of slowest fits      #
+# Return:   list of fit records                         #
+#-------------------------------------------------------#
+def summarizeTelemetry(path_telemetry, nrFits=10):
+    fits = loadTelemetry(path_telemetry)
+    total = sum(fit["seconds"] for fit in fits)
+    print("%d fits, %.1f s" % (len(fits), total))
+    def describe(fit):
+        name = " ".join("%s=%s" % (key, fit[key]) for key in ["fit", "attempt", "model", "samples", "input_dim", "num_inducing"] if(fit.get(key, "") != ""))
+        if(fit.get("iterations") is None):
+            return "%10.1f s %8s it. %8d ev. %8s s/it. %s (%s)" % (fit["seconds"], "-", fit.get("evaluations", 0), "-", name, fit["status"])
+        return "%10.1f s %8d it. %8d ev. %8.4f s/it. %s (%s)" % (fit["seconds"], fit["iterations"], fit.get("evaluations", 0), fit["seconds_per_iteration"], name, fit["status"])
+    print("Slowest fits:")
+    for fit in sorted(fits, key=lambda fit: fit["seconds"], reverse=True)[:nrFits]:
+        print("   "+describe(fit))
+    capped = [fit for fit in fits if(fit["capped"])]
+    print("Fits at the iteration limit: %d" % len(capped))
+    for fit in sorted(capped, key=lambda fit: fit["seconds"], reverse=True):
+        print("   "+describe(fit))
+    print("Time per status:")
+    for status in sorted(set(fit["status"] for fit in fits)):
+        seconds = [fit["seconds"] for fit in fits if(fit["status"] == status)]
+        print("   %-45s %5d fits %10.1f s (%.1f %%)" % (status, len(seconds), np.sum(seconds), 100*np.sum(seconds)/max(total, 1e-9)))
+    return fits
@@ -0,0 +1,104 @@
+# The warmStart.py script implements warm starts of Bayesian GP-LVM
+# models in the hyperparameter sweeps. The state of a trained model
+# (inducing inputs, kernel variance and lengthscales, noise variance and
+# the latent distribution) initializes the next model of the sweep. The
+# latent dimensions are sorted by relevance (ARD lengthscale), thus a
+# smaller model keeps the most relevant dimensions and a larger model
+# gets its additional dimensions from its own PCA initialization.
+# Additional inducing inputs are drawn from the latent means. For the
+# inducing point growth, the new inducing inputs are selected greedily
+# (latent mean with the largest Nystrom residual variance) or as k-means
+# centres of the latent means.
+#
+# This code is available under a GPL v3.0 license and comes without
+# any explicit or implicit warranty.
+#
+# (C) Wilfried Wöber 2020 <wilfried.woeber@technikum-wien.at>
+import numpy as np                      #You should know that
+from sklearn.cluster import KMeans      #k-means inducing inputs
+#-------------------------------------------------------#
+# Function: getWarmStart(...)                           #
+# Desct:    Stores the state of a trained model, latent #
+#           dimensions sorted by relevance.             #
+# Param:    model           Trained BayesianGPLVM       #
+# Return:   dict of parameters                          #
+#-------------------------------------------------------#
+def getWarmStart(model):
+    order = np.argsort(model.kern.lengthscale.values)   #Most relevant dimension first
+    return {"mean":         model.X.mean.values[:,order].copy(),
+            "variance":     model.X.variance.values[:,order].copy(),
+            "Z":            model.Z.values[:,order].copy(),
+            "lengthscale":  model.kern.lengthscale.values[order].copy(),
+            "kern_variance":float(model.kern.variance.values[0]),
+            "noise":        float(model.likelihood.variance.values[0])}
+#-------------------------------------------------------#
+# Function: resizeColumns(...)                          #
+# Desct:    Truncates or pads the columns of values. The#
+#           padded columns are taken from init.         #
+# Param:    values          Warm start values           #
+#           init            Values of the new model     #
+# Return:   values with the shape of init               #
+#-------------------------------------------------------#
+def resizeColumns(values, init):
+    resized = np.array(init, copy=True)
+    q = min(values.shape[-1], init.shape[-1])
+    resized[...,:q] = values[...,:q]
+    return resized
+#-------------------------------------------------------#
+# Function: applyWarmStart(...)                         #
+# Desct:    Initializes a new model from a warm start.  #
+# Param:    model           New BayesianGPLVM           #
+#           warm            Warm start (getWarmStart)   #
+# Return:   -                                           #
+#-------------------------------------------------------#
+def applyWarmStart(model, warm):
+    mean = resizeColumns(warm["mean"], model.X.mean.values)
+    model.X.mean[:] = mean
+    model.X.variance[:] = resizeColumns(warm["variance"], model.X.variance.values)
+    #--- Inducing inputs: keep old ones, draw new ones from the latent means ---#
+    Z = mean[np.random.permutation(mean.shape[0])[:model.Z.shape[0]]]
+    nrOld = min(warm["Z"].shape[0], Z.shape[0])
+    Z[:nrOld] = resizeColumns(warm["Z"][:nrOld], Z[:nrOld])
+    model.Z[:] = Z
+    #--- Kernel and noise ---#
+    lengthscale = np.full(model.kern.lengthscale.shape, np.max(warm["lengthscale"]))    #New dimensions start irrelevant
+    model.kern.lengthscale[:] = resizeColumns(warm["lengthscale"], lengthscale)
+    model.kern.variance[:] = warm["kern_variance"]
+    model.likelihood.variance[:] = warm["noise"]
+#-------------------------------------------------------#
+# Function: selectInducing(...)                         #
+# Desct:    Selects new inducing inputs in latent space.#
+# Param:    model           Trained BayesianGPLVM       #
+#           nrNew           Number of new inputs        #
+#           method          "greedy" or "kmeans"        #
+# Return:   [nrNew x Q] inducing inputs                 #
+#-------------------------------------------------------#
+def selectInducing(model, nrNew, method="greedy"):
+    mean = model.X.mean.values
+    if(method == "kmeans"):
+        return KMeans(n_clusters=min(nrNew, mean.shape[0]), n_init=10, random_state=0).fit(mean).cluster_centers_
+    if(method != "greedy"):
+        raise Exception("selectInducing: unknown method %s" % method)
+    Z = model.Z.values.copy()
+    for looper in range(0, nrNew):  #Latent mean worst explained by the current inducing inputs
+        K_zz = model.kern.K(Z) + 1e-6*np.eye(Z.shape[0])
+        K_xz = model.kern.K(mean, Z)
+        residual = model.kern.Kdiag(mean) - np.sum(K_xz*np.linalg.solve(K_zz, K_xz.T).T, axis=1)
+        Z = np.vstack((Z, mean[np.argmax(residual)]))
+    return Z[model.Z.shape[0]:]
+#-------------------------------------------------------#
+# Function: getGrowthStart(...)                         #
+# Desct:    Warm start of a model with more inducing    #
+#           inputs, the trained ones are kept.          #
+# Param:    model           Trained BayesianGPLVM       #
+#           num_inducing    New number of inducing pts. #
+#           method          "greedy" or "kmeans"        #
+# Return:   dict of parameters (see getWarmStart)       #
+#-------------------------------------------------------#
+def getGrowthStart(model, num_inducing, method="greedy"):
+    warm = getWarmStart(model)
+    nrNew = num_inducing-model.Z.shape[0]
+    if(nrNew > 0):
+        order = np.argsort(model.kern.lengthscale.values)   #Column order of getWarmStart
+        warm["Z"] = np.vstack((warm["Z"], selectInducing(model, nrNew, method)[:,order]))
+    return warm
@@ -78,6 +78,44 @@ installVE() {
     } >> "$logfile_name"
 }
 #-----------------------------------------------------------#
+# Descr.: Checks the fingerprint of a stage (hashes of the  #
+#           inputs, code and parameters). Code lists the    #
+#           entry scripts, imported project modules are     #
+#           added by the fingerprint. Cached outputs        #
+#           are restored and 0 is returned on a cache hit.  #
+# Param.: stage name and fingerprint arguments (see         #
+#           Python/fingerprint.py)                          #
+#-----------------------------------------------------------#
+checkStage() {
+    ./Python/VE/bin/python ./Python/fingerprint.py check ./Cache "$@"
+}
+#-----------------------------------------------------------#
+# Descr.: Stores the outputs of a stage under its           #
+#           fingerprint.                                    #
+# Param.: stage name and fingerprint arguments              #
+#-----------------------------------------------------------#
+storeStage() {
+    ./Python/VE/bin/python ./Python/fingerprint.py store ./Cache "$@"
+}
+#-----------------------------------------------------------#
+# Descr.: Removes a folder of intermediate results (e.g.    #
+#           checkpoints) if the fingerprint of its stage    #
+#           changed. The key is stored in the folder, thus  #
+#           an interrupted run of the same stage resumes.   #
+# Param.: folder, stage name and fingerprint arguments      #
+#-----------------------------------------------------------#
+invalidateStage() {
+    folder="$1"
+    shift
+    stage_key=$(./Python/VE/bin/python ./Python/fingerprint.py key ./Cache "$@")
+    if [ "$(cat "$folder/stage.key" 2> /dev/null)" != "$stage_key" ]
+    then
+        rm -rf "$folder"
+        mkdir -p "$folder"
+        echo "$stage_key" > "$folder/stage.key"
+    fi
+}
+#-----------------------------------------------------------#
 # Descr.: Estimate the Bayesian GP-LVM.                     #
 # Param.: -                                                 #
 #-----------------------------------------------------------#
@@ -94,34 +132,31 @@ getGPLVM() {
     #------------------------------#
     #--- Check previous results ---#
     #------------------------------#
-    process=1   #Processing flag
-    if [ -f "./GPLVM/optModel_bgp_features_train.csv" ] && [ -f "./GPLVM/optModel_bgp_lDim.csv" ] && [ -f "./GPLVM/optModel_bgp_model.npy" ] && \
-       [ -f "./GPLVM/optModel_bgp_nrInd.csv" ] && [ -f "./GPLVM/optModel_bgp_loglik.csv" ]
-    then
-        echo -e "\033[0;31mFound previous results.\nPress 'r' to remove those files and calculate a new model.\nPress any other key to process with existing files \033[0m"
-        read deleteResults
-        #---------------------#
-        #--- Delete or not ---#
-        #---------------------#
-        if [ "$deleteResults" == 'r' ]; then
-           echo "Remove old files..." 
-           rm ./GPLVM/*csv
-           rm ./GPLVM/*.npy
-        else 
-            echo "Use previous results"
-            process=0
-        fi
-    fi
-    #-------------------------#
-    #--- GP-LVM processing ---#
-    #-------------------------#
-    if [ "$process" == "1" ]
+    gplvm_fp=(GPLVM -i ./Data/design.csv ./Data/targetID.csv ./Data/images \
+              -c ./GPLVM/getGPLVM.py ./GPLVM/getDesign.py \
+              -p ./GPLVM/getGPLVM.py:IDPRange ./GPLVM/getGPLVM.py:lDimRange \
+              -o "./GPLVM/optModel_*" "./GPLVM/step*")
+    if checkStage "${gplvm_fp[@]}"
     then
+        echo "Use cached results"
+    else
+        #-------------------------#
+        #--- GP-LVM processing ---#
+        #-------------------------#
+        echo "Remove old files..."
+        rm -f ./GPLVM/*csv ./GPLVM/*.npy ./GPLVM/*.npz ./GPLVM/*.jsonl
+        invalidateStage ./GPLVM/Checkpoints "${gplvm_fp[@]}" #Checkpoints of other code or settings
         echo "Estimate features..."
         logfile_name="./$(date '+%Y%m%d_%H%M_GPLVM.log')"
         cd ./GPLVM/
+        if [ ! -f "../Data/design.csv" ]
+        then
+            echo "Build design from images..."
+            ../Python/VE/bin/python ./getDesign.py >> "$logfile_name" #Create (or update) design.npy
+        fi
         ../Python/VE/bin/python ./getGPLVM.py >> "$logfile_name" #Estimate GP-LVM features from data 
         cd ..
+        storeStage "${gplvm_fp[@]}"
     fi
     #----------------------------#
     #--- Create training data ---#
@@ -133,10 +168,19 @@ getGPLVM() {
 #-----------------------------------------------------------#
 getGPLVM_Maps(){
     echo "Estimate GP-LVM features from data"
+    maps_fp=(GPLVM_Maps -i ./Data/design.csv ./Data/design.npy ./Data/unselectedFeatures.csv "./GPLVM/optModel_*" \
+             -c ./GPLVM/FeatureVariance.py \
+             -o ./GPLVM/Heatmaps)
+    if checkStage "${maps_fp[@]}"
+    then
+        echo "Use cached results"
+        return
+    fi
     logfile_name="./$(date '+%Y%m%d_%H%M_GPLVM_VIS.log')"
     cd ./GPLVM
     ../Python/VE/bin/python ./FeatureVariance.py >> "$logfile_name" #Estimate GP-LVM features from data 
     cd .. 
+    storeStage "${maps_fp[@]}"
 }
 #-----------------------------------------------------------#
 # Descr.: Do classification for GP-LVM featrues and         #
@@ -144,36 +188,66 @@ getGPLVM_Maps(){
 #-----------------------------------------------------------#
 doGPC() {
     echo "Classify data using GPC"
-    cd ./GPC/
+    gpc_code=(-c ./GPC/GPC.py -p ./GPC/GPC.py:k_fold)
     #--------------------------------------------#
     #--- Do GPC with selected GP-LVM features ---#
     #--------------------------------------------#
     echo "Classify GP-LVM features"
-    logfile_name="./GPLVM_$(date '+%Y%m%d_%H%M_GPLVM.log')"
-    mkdir -p GPLVM #Create subfolder for GP-LVM classification results
-    ../Python/VE/bin/python ./GPC.py ../GPLVM/BGPLVM_DATA.csv ../Data/unselectedFeatures.csv  > "$logfile_name"
-    #--- Move reults ---#
-    mv ./*.csv ./GPLVM/.
-    mv ./*.log ./GPLVM/.
+    gpc_fp=(GPC_GPLVM -i ./GPLVM/BGPLVM_DATA.csv ./Data/unselectedFeatures.csv ./Data/NoReplace_20205809_085859.csv "${gpc_code[@]}" -o ./GPC/GPLVM)
+    if checkStage "${gpc_fp[@]}"
+    then
+        echo "Use cached results"
+    else
+        cd ./GPC/
+        logfile_name="./GPLVM_$(date '+%Y%m%d_%H%M_GPLVM.log')"
+        mkdir -p GPLVM #Create subfolder for GP-LVM classification results
+        ../Python/VE/bin/python ./GPC.py ../GPLVM/BGPLVM_DATA.csv ../Data/unselectedFeatures.csv  > "$logfile_name"
+        #--- Move reults ---#
+        mv ./*.csv ./GPLVM/.
+        mv ./*.log ./GPLVM/.
+        mv ./*.jsonl ./GPLVM/.
+        cd ..
+        storeStage "${gpc_fp[@]}"
+    fi
     #-------------------------------------------#
     #--- Do GPC with full 14 GP-LVM features ---#
     #-------------------------------------------#
-    mkdir -p GPLVM_full #Create subfolder for GP-LVM classification results
-    ../Python/VE/bin/python ./GPC.py ../GPLVM/BGPLVM_DATA.csv ../Data/FullFeatures.csv  > "$logfile_name"
-    #--- Move reults ---#
-    mv ./*.csv ./GPLVM_full/.
-    mv ./*.log ./GPLVM_full/.
+    gpc_fp=(GPC_GPLVM_full -i ./GPLVM/BGPLVM_DATA.csv ./Data/FullFeatures.csv ./Data/NoReplace_20205809_085859.csv "${gpc_code[@]}" -o ./GPC/GPLVM_full)
+    if checkStage "${gpc_fp[@]}"
+    then
+        echo "Use cached results"
+    else
+        cd ./GPC/
+        logfile_name="./GPLVM_$(date '+%Y%m%d_%H%M_GPLVM.log')"
+        mkdir -p GPLVM_full #Create subfolder for GP-LVM classification results
+        ../Python/VE/bin/python ./GPC.py ../GPLVM/BGPLVM_DATA.csv ../Data/FullFeatures.csv  > "$logfile_name"
+        #--- Move reults ---#
+        mv ./*.csv ./GPLVM_full/.
+        mv ./*.log ./GPLVM_full/.
+        mv ./*.jsonl ./GPLVM_full/.
+        cd ..
+        storeStage "${gpc_fp[@]}"
+    fi
     #---------------------------------------#
     #--- Do GPC with procrustes features ---#
     #---------------------------------------#
     echo "Classify Procrustes features"
-    logfile_name="./Procrustes_$(date '+%Y%m%d_%H%M_GPLVM.log')"
-    mkdir -p Procrustes #Create subfolder for Procrustes classification results
-    ../Python/VE/bin/python ./GPC.py ../Procrustes/PROCRUSTES_DATA.csv > "$logfile_name"
-    #--- Move reults ---#
-    mv ./*.csv ./Procrustes/.
-    mv ./*.log ./Procrustes/.
-    cd ..
+    gpc_fp=(GPC_Procrustes -i ./Procrustes/PROCRUSTES_DATA.csv ./Data/NoReplace_20205809_085859.csv "${gpc_code[@]}" -o ./GPC/Procrustes)
+    if checkStage "${gpc_fp[@]}"
+    then
+        echo "Use cached results"
+    else
+        cd ./GPC/
+        logfile_name="./Procrustes_$(date '+%Y%m%d_%H%M_GPLVM.log')"
+        mkdir -p Procrustes #Create subfolder for Procrustes classification results
+        ../Python/VE/bin/python ./GPC.py ../Procrustes/PROCRUSTES_DATA.csv > "$logfile_name"
+        #--- Move reults ---#
+        mv ./*.csv ./Procrustes/.
+        mv ./*.log ./Procrustes/.
+        mv ./*.jsonl ./Procrustes/.
+        cd ..
+        storeStage "${gpc_fp[@]}"
+    fi
 }
 #-----------------------------------------------------------#
 # Descr.: Do CNN classification based on the previously     #
@@ -181,9 +255,19 @@ doGPC() {
 #-----------------------------------------------------------#
 doCNN() {
     echo "Do CNN classification"
+    cnn_fp=(CNN -i ./Data/targetID.csv ./Data/labels.csv ./Data/classes.csv ./Data/NoReplace_20205809_085859.csv ./Data/images \
+            -c ./CNN/Classification/CNN.py ./CNN/Classification/trainModel.py \
+            -p augmentation=1 ./CNN/Classification/CNN.py:n_fold ./CNN/Classification/trainModel.py:epochs \
+            -o ./CNN/Classification/Augmented)
+    if checkStage "${cnn_fp[@]}"
+    then
+        echo "Use cached results"
+        return
+    fi
     cd ./CNN/Classification 
     python CNN.py 1
     cd ../..
+    storeStage "${cnn_fp[@]}"
 }
 #-----------------------------------------------------------#
 # Descr.: Do CNN modelling and visualization afterwards.    #
@@ -199,14 +283,39 @@ visCNN() {
 #-----------------------------------------------------------#
 doHMC() {
     echo "Classify data using R. Neals HMC"
-    cd ./HMC/Code
-    source ./setvenv.sh
+    hmc_code=(-c ./HMC/Code/hmc_mlp_4_tilapia.py ./HMC/Code/runardnet.sh ./HMC/Code/prepdata.py \
+              -p ./HMC/Code/hmc_mlp_4_tilapia.py:hmciter ./HMC/Code/hmc_mlp_4_tilapia.py:nohidden \
+                 ./HMC/Code/hmc_mlp_4_tilapia.py:ardlevel ./HMC/Code/hmc_mlp_4_tilapia.py:nofolds)
+    hmc_data=(./Data/unselectedFeatures.csv ./Data/NoReplace_20205809_085859.csv)
     #--- Now we run the code for each experiment ---#
     logfile_name="_$(date '+%Y%m%d_%H%M_HMC.log')"
-    ../../Python/VE/bin/python hmc_mlp_4_tilapia.py "procrustes" &> "procrustes""$logfile_name" 
-    ../../Python/VE/bin/python hmc_mlp_4_tilapia.py "gplvm_all" &> "GPAll""$logfile_name"
-    ../../Python/VE/bin/python hmc_mlp_4_tilapia.py "gplvm_red" &> "GPReduced""$logfile_name"
-    cd ../..
+    hmc_fp=(HMC_procrustes -i ./Procrustes/PROCRUSTES_DATA.csv "${hmc_data[@]}" "${hmc_code[@]}" -o "./HMC/Code/Data/resdata/rshfl_prc_it*")
+    if ! checkStage "${hmc_fp[@]}"
+    then
+        cd ./HMC/Code
+        source ./setvenv.sh
+        ../../Python/VE/bin/python hmc_mlp_4_tilapia.py "procrustes" &> "procrustes""$logfile_name" 
+        cd ../..
+        storeStage "${hmc_fp[@]}"
+    fi
+    hmc_fp=(HMC_gplvm_all -i ./GPLVM/BGPLVM_DATA.csv "${hmc_data[@]}" "${hmc_code[@]}" -o "./HMC/Code/Data/resdata/rshfl_gpall_it*")
+    if ! checkStage "${hmc_fp[@]}"
+    then
+        cd ./HMC/Code
+        source ./setvenv.sh
+        ../../Python/VE/bin/python hmc_mlp_4_tilapia.py "gplvm_all" &> "GPAll""$logfile_name"
+        cd ../..
+        storeStage "${hmc_fp[@]}"
+    fi
+    hmc_fp=(HMC_gplvm_red -i ./GPLVM/BGPLVM_DATA.csv "${hmc_data[@]}" "${hmc_code[@]}" -o "./HMC/Code/Data/resdata/rshfl_gpred_it*")
+    if ! checkStage "${hmc_fp[@]}"
+    then
+        cd ./HMC/Code
+        source ./setvenv.sh
+        ../../Python/VE/bin/python hmc_mlp_4_tilapia.py "gplvm_red" &> "GPReduced""$logfile_name"
+        cd ../..
+        storeStage "${hmc_fp[@]}"
+    fi
 }
 #------------------------------------------------------------#
 # Descr: Calculates the procrustes based on the landmarks ---#
@@ -248,12 +357,19 @@ removeData() {
     cd ..
     rm -rf fbm *.log
     cd ..
+    #--------------------------#
+    #--- Design data caches ---#
+    #--------------------------#
+    rm -f ./Data/*.csv.npy ./Data/*.csv.npy.key
+    rm -f ./Data/design.npy ./Data/design.npy.manifest.csv
+    rm -rf ./Cache      #Fingerprinted stage results
     #-------------------#
     #--- GP-LVM data ---#
     #-------------------#
     cd ./GPLVM 
-    rm -rf *.csv *.log *.npy *.pdf
+    rm -rf *.csv *.log *.npy *.npz *.pdf *.jsonl
     rm -rf ./Heatmaps
+    rm -rf ./Checkpoints    #Resumable GP-LVM fits
     cd ..
     #-------------------#
     #--- GPC results ---#